@@ -7,12 +7,55 @@ FastAPI for Compose to JSON conversion
 
 import os
 import sys
+import asyncio
+import hmac
+import ipaddress
+import json
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from functools import partial
+from urllib.parse import urlparse
 sys.path.append('..')
 
-from fastapi import FastAPI, HTTPException, Form
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Form, File, UploadFile, BackgroundTasks, Header, WebSocket, WebSocketDisconnect, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
-from llm_converter import ComposeToJsonConverter
+from llm_converter import (
+    ComposeToJsonConverter,
+    ConverterPool,
+    ModelCascade,
+    ComposeFileConverter,
+    SubtreeMemoizer,
+    IncrementalConverter,
+    TraceStore,
+    ShadowRunner,
+    SpeculativeRunner,
+    LLMProvider,
+    ConversionScheduler,
+    RequestPriority,
+    JobManager,
+    TenantRegistry,
+    Tenant,
+    QuotaExceeded,
+    CallControl,
+    configure_tracing,
+    tracing_enabled,
+    start_span,
+    parse_traceparent,
+    ProfileSession,
+    start_profiling,
+    stop_profiling,
+    get_profiling_session,
+    set_request_session,
+    reset_request_session
+)
+from typing import Optional
 
 # Load environment variables
 load_dotenv()
@@ -24,16 +67,188 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Tracing: TRACING_EXPORTER=console, file (TRACING_FILE) or otel; off by default
+configure_tracing(os.getenv('TRACING_EXPORTER') or None, os.getenv('TRACING_FILE', 'spans.jsonl'))
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    Wrap each request in a span, continuing the caller's trace
+    
+    The span's traceparent is returned in the response headers. Streamed
+    responses are timed until their headers are sent.
+    """
+    if not tracing_enabled():
+        return await call_next(request)
+    
+    with start_span(
+        f"{request.method} {request.url.path}",
+        {"http.method": request.method, "http.target": request.url.path},
+        parent=parse_traceparent(request.headers.get('traceparent'))
+    ) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        response.headers['traceparent'] = span.traceparent
+        return response
+
+# Profiles of single requests (X-Profile header), newest last
+request_profiles = OrderedDict()
+MAX_REQUEST_PROFILES = 20
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    Profile requests while a profiling session runs, or one request on demand
+    
+    A request with "X-Profile: cprofile" or "X-Profile: sampling" and a
+    valid X-Admin-Key is profiled on its own; the response carries an
+    X-Profile-Id for GET /admin/profile/{id}. Work on the event loop
+    thread is shared by concurrent requests, so profiles include it.
+    """
+    mode = request.headers.get('x-profile')
+    session = get_profiling_session()
+    if mode is None and (session is None or not session.active):
+        return await call_next(request)
+    
+    token = None
+    if mode is not None:
+        if not _is_admin(request.headers.get('x-admin-key')):
+            return JSONResponse(status_code=403, content={"detail": "X-Profile requires a valid X-Admin-Key"})
+        try:
+            session = ProfileSession(mode)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+        # Conversions of this request, on any thread, join its session
+        token = set_request_session(session)
+    
+    try:
+        with session.section():
+            response = await call_next(request)
+    finally:
+        if token is not None:
+            reset_request_session(token)
+    
+    if token is not None:
+        session.stop()
+        profile_id = uuid.uuid4().hex[:12]
+        request_profiles[profile_id] = session
+        while len(request_profiles) > MAX_REQUEST_PROFILES:
+            request_profiles.popitem(last=False)
+        response.headers['X-Profile-Id'] = profile_id
+    elif not request.url.path.startswith('/admin'):
+        session.count_request()
+    return response
+
 # Initialize converter
 API_KEY = os.getenv('GEMINI_API_KEY')
 if not API_KEY:
     raise ValueError("GEMINI_API_KEY not found in environment variables")
 
-converter = ComposeToJsonConverter(API_KEY)
+# Converters per (provider, model, API key, few-shot config), sharing one
+# scheduler so model calls are queued by priority and deadline process-wide
+TRACE_DIR = os.getenv('TRACE_DIR')
+converter_pool = ConverterPool(
+    scheduler=ConversionScheduler(
+        max_concurrent=int(os.getenv('MAX_CONCURRENT_CONVERSIONS', '4')),
+        max_queue=int(os.getenv('MAX_QUEUED_CONVERSIONS', '1000'))
+    ),
+    # Record model calls for replay when TRACE_DIR is set, and every
+    # request (cache hits included) under requests/ for cache warm-up
+    trace_store=TraceStore(TRACE_DIR) if TRACE_DIR else None,
+    request_log=TraceStore(os.path.join(TRACE_DIR, 'requests'), store_prompts=False) if TRACE_DIR else None,
+    max_converters=int(os.getenv('MAX_POOLED_CONVERTERS', '32')),
+    # "compact" asks models for short arrays expanded locally to SDUI JSON
+    output_format=os.getenv('OUTPUT_FORMAT', 'json'),
+    # Warm caches written by `python -m llm_converter warmup`
+    snapshot_dir=os.getenv('CACHE_SNAPSHOT_DIR')
+)
+
+# Default converter; per-request few-shot count from input complexity if enabled
+ADAPTIVE_FEW_SHOT = os.getenv('ADAPTIVE_FEW_SHOT', '').lower() in ('1', 'true', 'yes')
+converter = converter_pool.get(API_KEY, adaptive_few_shot=ADAPTIVE_FEW_SHOT)
+
+subtree_memoizer = SubtreeMemoizer(converter)
+incremental_converter = IncrementalConverter(subtree_memoizer)
+file_converter = ComposeFileConverter(converter, max_workers=int(os.getenv('FILE_CONVERT_WORKERS', '4')))
+
+# Tenants: callers identify with X-API-Key when TENANTS_FILE is set, and get
+# their own quotas, usage counters and cache namespace
+tenant_registry = None
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+if TENANTS_FILE:
+    tenant_registry = TenantRegistry(TENANTS_FILE, os.getenv('USAGE_DB', 'usage.sqlite3'))
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+tenant_memoizers = {}
+tenant_memoizers_lock = threading.Lock()
+
+# Model cascade: CASCADE_MODELS="gemini-1.5-flash,gemini-1.5-pro" converts
+# with the first model and escalates failures to the next ones
+CASCADE_MODELS = [m.strip() for m in os.getenv('CASCADE_MODELS', '').split(',') if m.strip()]
+CASCADE_COSTS = [float(c) for c in os.getenv('CASCADE_COSTS', '').split(',') if c.strip()]
+cascades = {}
+
+# Bulk jobs run in the background at bulk priority, behind interactive traffic
+job_manager = JobManager(
+    os.getenv('JOBS_DB', 'jobs.sqlite3'),
+    lambda compose_code, owner: _convert_job_item(compose_code, owner),
+    max_workers=int(os.getenv('JOB_WORKERS', '4'))
+)
+
+# Shadow traffic: mirror SHADOW_FRACTION of /convert requests to an alternate converter
+shadow_runner = None
+SHADOW_FRACTION = float(os.getenv('SHADOW_FRACTION', '0'))
+if SHADOW_FRACTION > 0:
+    shadow_converter = ComposeToJsonConverter(
+        os.getenv('SHADOW_API_KEY', API_KEY),
+        os.getenv('SHADOW_MODEL', ''),
+        LLMProvider(os.getenv('SHADOW_PROVIDER', 'gemini'))
+    )
+    if os.getenv('SHADOW_FEW_SHOT'):
+        shadow_converter.set_few_shot_count(int(os.getenv('SHADOW_FEW_SHOT')))
+    # Every mirrored request should reach the model to measure it
+    shadow_converter.cache_size = 0
+    shadow_converter.template_cache = None
+    shadow_runner = ShadowRunner(
+        shadow_converter,
+        fraction=SHADOW_FRACTION,
+        log_path=os.getenv('SHADOW_LOG', 'shadow_results.jsonl')
+    )
+
+# Speculative mode: answer from a template or from memoized subtrees at
+# once, verify with the model in the background and POST the verified
+# result to the request's callback_url
+speculative_runner = SpeculativeRunner(
+    local_convert_fn=lambda request_converter, compose_code: _memoized_result(request_converter, compose_code),
+    max_workers=int(os.getenv('SPECULATIVE_WORKERS', '4')),
+    max_pending=int(os.getenv('MAX_PENDING_VERIFICATIONS', '100'))
+)
+
+# Hosts speculative results may be POSTed to; without any, callback_url is
+# refused and verified results are only delivered over the WebSocket
+CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv('CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()
+}
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Refuse redirects, which could point a callback at an internal address"""
+    
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
 
 # Request model
 class ComposeRequest(BaseModel):
     compose_code: str
+    memoize_subtrees: bool = False
+    priority: str = "default"
+    timeout_ms: Optional[int] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    # Bounded, as every count is its own pooled converter
+    few_shot_count: Optional[int] = Field(None, ge=1, le=8)
+    speculative: bool = False
+    callback_url: Optional[str] = None
     
     model_config = {
         "json_schema_extra": {
@@ -45,11 +260,24 @@ class ComposeRequest(BaseModel):
         }
     }
 
+class ComposeFileRequest(BaseModel):
+    source: str
+    screen_name: str = ""
+
+class JobRequest(BaseModel):
+    inputs: list[str]
+
+class IncrementalRequest(BaseModel):
+    previous_input: str
+    previous_output: dict
+    compose_code: str
+
 # Response models
 class SuccessResponse(BaseModel):
     success: bool = True
     input: str
     output: dict
+    provisional: bool = False
     
 class ErrorResponse(BaseModel):
     success: bool = False
@@ -65,6 +293,13 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "convert": "/convert",
+            "convert_incremental": "/convert/incremental",
+            "convert_file": "/convert/file",
+            "convert_file_stream": "/convert/file/stream",
+            "convert_websocket": "/ws/convert",
+            "jobs": "/jobs",
+            "usage": "/admin/usage",
+            "profile": "/admin/profile",
             "health": "/health",
             "info": "/info"
         }
@@ -88,6 +323,13 @@ async def get_info():
     info = converter.get_training_info()
     return {
         "model_info": info,
+        "subtree_cache": subtree_memoizer.get_stats(),
+        "shadow": shadow_runner.get_stats() if shadow_runner else None,
+        "speculative": speculative_runner.get_stats(),
+        "cascade": (await run_in_threadpool(_tenant_cascade, None)).get_stats() if CASCADE_MODELS else None,
+        "scheduler": converter.scheduler.get_stats(),
+        "converter_pool": converter_pool.get_stats(),
+        "jobs_db": job_manager.db_path,
         "api_version": "1.0.0",
         "supported_features": [
             "Text conversion",
@@ -99,37 +341,331 @@ async def get_info():
     }
 
 @app.post("/convert")
-async def convert_compose(request: ComposeRequest):
+async def convert_compose(request: ComposeRequest, background_tasks: BackgroundTasks,
+                          x_api_key: Optional[str] = Header(None),
+                          x_llm_api_key: Optional[str] = Header(None)):
     """
     Convert Compose code to JSON
     
     Args:
-        request: ComposeRequest with compose_code
+        request: ComposeRequest with compose_code and optional provider,
+            model, few_shot_count, and speculative with a callback_url
+        background_tasks: Tasks run after the response is sent
+        x_api_key: Tenant API key
+        x_llm_api_key: Provider API key overriding the server's key
         
     Returns:
         JSON conversion result
     """
-    return await _convert_compose_code(request.compose_code)
+    tenant = _identify_tenant(x_api_key)
+    # A new configuration builds its converter, which must not block the loop
+    request_converter = await run_in_threadpool(_select_converter, request, x_llm_api_key, tenant)
+    if request.memoize_subtrees and request_converter is not await run_in_threadpool(_tenant_converter, tenant):
+        raise HTTPException(
+            status_code=400,
+            detail="memoize_subtrees is only available with the default converter"
+        )
+    if request.speculative and request.memoize_subtrees:
+        raise HTTPException(status_code=400, detail="speculative cannot be combined with memoize_subtrees")
+    if request.callback_url:
+        error = await run_in_threadpool(_callback_url_error, request.callback_url)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+    
+    return await _convert_compose_code(
+        request.compose_code,
+        request.memoize_subtrees,
+        background_tasks,
+        priority=request.priority,
+        timeout_ms=request.timeout_ms,
+        request_converter=request_converter,
+        tenant=tenant,
+        speculative=request.speculative,
+        callback_url=request.callback_url
+    )
+
+def _callback_url_error(callback_url: str) -> Optional[str]:
+    """
+    Check that a callback URL points at an allowed, public host
+    
+    The host must be in CALLBACK_ALLOWED_HOSTS and every address it
+    resolves to must be public, so callbacks cannot reach loopback,
+    private, link-local (e.g. cloud metadata) or reserved addresses.
+    
+    Args:
+        callback_url: URL given by the client
+        
+    Returns:
+        Error message, or None if the URL may be used
+    """
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return "callback_url must be an http(s) URL"
+    if not CALLBACK_ALLOWED_HOSTS:
+        return "callback_url is disabled on this server; use the WebSocket endpoint for verified results"
+    host = parsed.hostname.lower()
+    if host not in CALLBACK_ALLOWED_HOSTS:
+        return "callback_url host is not in CALLBACK_ALLOWED_HOSTS"
+    
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        addresses = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError):
+        return "callback_url host cannot be resolved"
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return "callback_url must resolve to public addresses"
+    return None
+
+def _post_callback(callback_url: Optional[str], result: dict):
+    """
+    Push a verified speculative result to the client
+    
+    Args:
+        callback_url: URL receiving the result as JSON, or None
+        result: Verified result dictionary
+    """
+    if not callback_url:
+        return
+    # Checked again, as the host may resolve elsewhere since the request
+    error = _callback_url_error(callback_url)
+    if error:
+        print(f"❌ Callback to {callback_url} refused: {error}")
+        return
+    
+    payload = {
+        "success": result['success'],
+        "input": result['input'],
+        "output": result.get('output'),
+        "error": result.get('error'),
+        "provisional": False,
+        "corrected": result['corrected']
+    }
+    request = urllib.request.Request(
+        callback_url,
+        data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with _callback_opener.open(request, timeout=10):
+            pass
+    except Exception as e:
+        print(f"❌ Callback to {callback_url} failed: {e}")
+
+def _identify_tenant(api_key: Optional[str]) -> Optional[Tenant]:
+    """
+    Identify the tenant of a request and count it against its request quota
+    
+    Args:
+        api_key: Tenant API key from the X-API-Key header
+        
+    Returns:
+        Tenant, or None when tenants are not configured
+    """
+    if tenant_registry is None:
+        return None
+    
+    tenant = tenant_registry.identify(api_key)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Missing or unknown X-API-Key")
+    
+    try:
+        tenant.check_request()
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return tenant
+
+def _tenant_converter(tenant: Optional[Tenant]) -> ComposeToJsonConverter:
+    """
+    Get the default converter of a tenant, with its own cache namespace
+    
+    Args:
+        tenant: Tenant or None
+        
+    Returns:
+        Converter charging model calls to the tenant
+    """
+    if tenant is None:
+        return converter
+    
+    return converter_pool.get(API_KEY, adaptive_few_shot=ADAPTIVE_FEW_SHOT, namespace=tenant.name, quota=tenant)
+
+def _tenant_memoizer(tenant: Optional[Tenant]) -> SubtreeMemoizer:
+    """
+    Get the subtree memoizer of a tenant
+    
+    Args:
+        tenant: Tenant or None
+        
+    Returns:
+        Memoizer over the tenant's default converter
+    """
+    if tenant is None:
+        return subtree_memoizer
+    
+    tenant_converter = _tenant_converter(tenant)
+    with tenant_memoizers_lock:
+        memoizer = tenant_memoizers.get(tenant.name)
+        # Rebuild if the pool replaced the tenant's converter
+        if memoizer is None or memoizer.converter is not tenant_converter:
+            memoizer = SubtreeMemoizer(tenant_converter)
+            tenant_memoizers[tenant.name] = memoizer
+    return memoizer
+
+def _memoized_result(request_converter: ComposeToJsonConverter, compose_code: str) -> Optional[dict]:
+    """
+    Assemble a provisional result from the subtrees memoized for a tenant
+    
+    Args:
+        request_converter: Converter of the request; its quota is the tenant
+        compose_code: Compose code
+        
+    Returns:
+        Result dictionary, or None if the tenant has no memoizer yet
+    """
+    tenant = request_converter.quota
+    if tenant is None:
+        memoizer = subtree_memoizer
+    else:
+        with tenant_memoizers_lock:
+            memoizer = tenant_memoizers.get(tenant.name)
+    if memoizer is None:
+        return None
+    return memoizer.convert_cached(compose_code)
+
+def _tenant_cascade(tenant: Optional[Tenant]) -> Optional[ModelCascade]:
+    """
+    Get the model cascade of a tenant
+    
+    Args:
+        tenant: Tenant or None
+    
+    Returns:
+        Cascade over the tenant's converters, or None when CASCADE_MODELS is not set
+    """
+    if not CASCADE_MODELS:
+        return None
+    
+    namespace = tenant.name if tenant else ""
+    with tenant_memoizers_lock:
+        cascade = cascades.get(namespace)
+    if cascade is not None:
+        return cascade
+    
+    # Built once per namespace; the cascade keeps its tiers even if the
+    # pool later evicts them
+    tiers = [
+        converter_pool.get(API_KEY, model_name, adaptive_few_shot=ADAPTIVE_FEW_SHOT,
+                           namespace=namespace, quota=tenant)
+        for model_name in CASCADE_MODELS
+    ]
+    cascade = ModelCascade(tiers, costs=CASCADE_COSTS)
+    with tenant_memoizers_lock:
+        # Another request may have built it meanwhile
+        return cascades.setdefault(namespace, cascade)
+
+def _tenant_file_converter(tenant: Optional[Tenant]) -> ComposeFileConverter:
+    """
+    Get a file converter using the tenant's converter
+    
+    Args:
+        tenant: Tenant or None
+        
+    Returns:
+        File converter
+    """
+    if tenant is None:
+        return file_converter
+    return ComposeFileConverter(_tenant_converter(tenant), max_workers=file_converter.max_workers)
+
+def _select_converter(request: ComposeRequest, api_key: Optional[str] = None,
+                      tenant: Optional[Tenant] = None) -> ComposeToJsonConverter:
+    """
+    Get the pooled converter for the provider, model and few-shot count of a request
+    
+    Args:
+        request: ComposeRequest
+        api_key: Provider API key from the X-LLM-API-Key header
+        tenant: Tenant charged for the conversion
+        
+    Returns:
+        Converter instance
+    """
+    if not (request.provider or request.model or request.few_shot_count or api_key):
+        return _tenant_converter(tenant)
+    
+    try:
+        provider = LLMProvider((request.provider or "gemini").lower())
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"provider must be one of: {', '.join(p.value for p in LLMProvider)}"
+        )
+    
+    # Server keys per provider: GEMINI_API_KEY, OPENAI_API_KEY, CLAUDE_API_KEY, ...
+    api_key = api_key or os.getenv(f"{provider.name}_API_KEY", "")
+    if not api_key and provider != LLMProvider.OLLAMA:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No API key for provider {provider.value}; send X-LLM-API-Key"
+        )
+    
+    request_converter = converter_pool.get(
+        api_key,
+        request.model or "",
+        provider,
+        few_shot_count=request.few_shot_count or converter.few_shot_count,
+        adaptive_few_shot=ADAPTIVE_FEW_SHOT and not request.few_shot_count,
+        namespace=tenant.name if tenant else "",
+        quota=tenant
+    )
+    return request_converter
 
 @app.post("/convert/raw")
-async def convert_compose_raw(compose_code: str = Form(...)):
+async def convert_compose_raw(background_tasks: BackgroundTasks, compose_code: str = Form(...),
+                              x_api_key: Optional[str] = Header(None)):
     """
     Convert raw Compose code to JSON (accepts form data)
     
     Args:
+        background_tasks: Tasks run after the response is sent
         compose_code: Raw Compose code as form field
+        x_api_key: Tenant API key
         
     Returns:
         JSON conversion result
     """
-    return await _convert_compose_code(compose_code)
+    tenant = _identify_tenant(x_api_key)
+    return await _convert_compose_code(
+        compose_code,
+        background_tasks=background_tasks,
+        request_converter=await run_in_threadpool(_tenant_converter, tenant),
+        tenant=tenant
+    )
 
-async def _convert_compose_code(compose_code: str):
+async def _convert_compose_code(compose_code: str, memoize_subtrees: bool = False,
+                                background_tasks: BackgroundTasks = None,
+                                priority: str = "default", timeout_ms: Optional[int] = None,
+                                request_converter: Optional[ComposeToJsonConverter] = None,
+                                tenant: Optional[Tenant] = None, speculative: bool = False,
+                                callback_url: Optional[str] = None):
     """
     Convert Compose code to JSON
     
     Args:
         compose_code: Compose code string
+        memoize_subtrees: Convert only subtrees not seen before
+        background_tasks: Tasks run after the response is sent
+        priority: Request class: interactive, default or bulk
+        timeout_ms: Give up (504) if not converted within this time
+        request_converter: Pooled converter to use instead of the default
+        tenant: Tenant whose usage is recorded
+        speculative: Return a provisional result and verify it in the background
+        callback_url: URL receiving the verified speculative result
         
     Returns:
         JSON conversion result
@@ -142,14 +678,62 @@ async def _convert_compose_code(compose_code: str):
                 detail="compose_code cannot be empty"
             )
         
+        try:
+            request_priority = RequestPriority[priority.upper()]
+        except KeyError:
+            raise HTTPException(
+                status_code=400,
+                detail="priority must be one of: interactive, default, bulk"
+            )
+        deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+        
         # Convert
-        result = converter.convert_compose_to_json(compose_code.strip())
+        start = time.perf_counter()
+        request_converter = request_converter or converter
+        if speculative:
+            convert = partial(
+                speculative_runner.convert,
+                request_converter,
+                on_verified=partial(_post_callback, callback_url)
+            )
+        elif memoize_subtrees:
+            convert = (await run_in_threadpool(_tenant_memoizer, tenant)).convert
+        else:
+            # The cascade stands in for the tenant's default converter;
+            # looking either up may build converters, so not on the loop
+            cascade = None
+            if CASCADE_MODELS and request_converter is await run_in_threadpool(_tenant_converter, tenant):
+                cascade = await run_in_threadpool(_tenant_cascade, tenant)
+            convert = cascade.convert if cascade is not None else request_converter.convert_compose_to_json
+        result = await run_in_threadpool(
+            convert,
+            compose_code.strip(),
+            priority=request_priority,
+            deadline=deadline
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+        
+        if tenant is not None:
+            tenant.record_request(result, latency_ms)
+        
+        # Requests that never reached the model
+        if result.get('error_code') == 'deadline_exceeded':
+            raise HTTPException(status_code=504, detail=result['error'])
+        if result.get('error_code') == 'overloaded':
+            raise HTTPException(status_code=503, detail=result['error'])
+        if result.get('error_code') == 'quota_exceeded':
+            raise HTTPException(status_code=429, detail=result['error'])
+        
+        # Mirror to the shadow converter once the response is sent
+        if shadow_runner is not None and background_tasks is not None and not result.get('provisional'):
+            background_tasks.add_task(shadow_runner.maybe_mirror, compose_code.strip(), result, latency_ms)
         
         # Return result
         if result['success']:
             return SuccessResponse(
                 input=result['input'],
-                output=result['output']
+                output=result['output'],
+                provisional=result.get('provisional', False)
             )
         else:
             return ErrorResponse(
@@ -158,12 +742,701 @@ async def _convert_compose_code(compose_code: str):
                 raw_response=result.get('raw_response', '')
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
 
+@app.post("/convert/incremental")
+async def convert_compose_incremental(request: IncrementalRequest, x_api_key: Optional[str] = Header(None)):
+    """
+    Re-convert only the subtrees that changed since a previous conversion
+    
+    Args:
+        request: IncrementalRequest with previous input/output and new code
+        x_api_key: Tenant API key
+        
+    Returns:
+        Full output plus a JSON Patch (RFC 6902) against previous_output
+    """
+    tenant = _identify_tenant(x_api_key)
+    if not request.compose_code or not request.compose_code.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="compose_code cannot be empty"
+        )
+    
+    if tenant is None:
+        request_incremental_converter = incremental_converter
+    else:
+        request_incremental_converter = IncrementalConverter(await run_in_threadpool(_tenant_memoizer, tenant))
+    result = await run_in_threadpool(
+        request_incremental_converter.reconvert,
+        request.previous_input.strip(),
+        request.previous_output,
+        request.compose_code.strip()
+    )
+    
+    if not result['success']:
+        return ErrorResponse(
+            input=result['input'],
+            error=result['error']
+        )
+    return {
+        "success": True,
+        "input": result['input'],
+        "output": result['output'],
+        "patch": result['patch']
+    }
+
+@app.post("/convert/file")
+async def convert_compose_file(request: ComposeFileRequest, x_api_key: Optional[str] = Header(None)):
+    """
+    Convert a whole .kt file, one entry per @Composable function
+    
+    Args:
+        request: ComposeFileRequest with source and optional screen_name
+        x_api_key: Tenant API key
+        
+    Returns:
+        Screen-level JSON conversion result
+    """
+    tenant = _identify_tenant(x_api_key)
+    _validate_source(request.source)
+    request_file_converter = await run_in_threadpool(_tenant_file_converter, tenant)
+    return await run_in_threadpool(request_file_converter.convert_file, request.source, request.screen_name)
+
+@app.post("/convert/file/raw")
+async def convert_compose_file_raw(file: UploadFile = File(...), x_api_key: Optional[str] = Header(None)):
+    """
+    Convert an uploaded .kt file
+    
+    Args:
+        file: Uploaded Kotlin source file
+        x_api_key: Tenant API key
+        
+    Returns:
+        Screen-level JSON conversion result
+    """
+    tenant = _identify_tenant(x_api_key)
+    source = (await file.read()).decode('utf-8')
+    _validate_source(source)
+    screen_name = os.path.splitext(os.path.basename(file.filename or ""))[0]
+    request_file_converter = await run_in_threadpool(_tenant_file_converter, tenant)
+    return await run_in_threadpool(request_file_converter.convert_file, source, screen_name)
+
+@app.post("/convert/file/stream")
+async def convert_compose_file_stream(request: ComposeFileRequest, x_api_key: Optional[str] = Header(None)):
+    """
+    Convert a whole .kt file, streaming per-function results as NDJSON
+    
+    Each line is one composable result as it finishes; the last line
+    is the reassembled screen.
+    
+    Args:
+        request: ComposeFileRequest with source and optional screen_name
+        x_api_key: Tenant API key
+        
+    Returns:
+        Streaming NDJSON response
+    """
+    tenant = _identify_tenant(x_api_key)
+    _validate_source(request.source)
+    request_file_converter = await run_in_threadpool(_tenant_file_converter, tenant)
+    
+    def generate():
+        unit_results = []
+        for result in request_file_converter.iter_convert_file(request.source):
+            unit_results.append(result)
+            yield json.dumps({"event": "composable", **result}, ensure_ascii=False) + "\n"
+        screen = request_file_converter.assemble_screen(unit_results, request.screen_name)
+        yield json.dumps({"event": "screen", "output": screen}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# Conversions a WebSocket client may have running at once
+WS_MAX_IN_FLIGHT = int(os.getenv('WS_MAX_IN_FLIGHT', '16'))
+
+@app.websocket("/ws/convert")
+async def convert_websocket(websocket: WebSocket, x_api_key: Optional[str] = Header(None)):
+    """
+    Convert Compose code over one long-lived connection
+    
+    Client messages are JSON objects:
+        {"id": "1", "compose_code": "...", "document": "Main.kt", ...}
+            starts a conversion; other ComposeRequest fields (priority,
+            provider, model, few_shot_count, speculative) are accepted,
+            memoize_subtrees and callback_url are refused. A new
+            conversion for the same document cancels the previous one.
+        {"action": "cancel", "id": "1"}
+            cancels a conversion
+    
+    Server messages carry the id and an event:
+        partial: "text" streamed from the model so far (one chunk)
+        result: the ComposeRequest response, with provisional true for a
+            speculative answer still being verified
+        verified: the model's result for a provisional answer, with corrected
+        cancelled: the conversion was cancelled before it finished
+        error: a message that could not be handled (binary frames
+            included; messages are JSON text)
+    
+    Cancelled conversions stop their model call: a queued call never
+    reaches the provider and a streaming one is closed.
+    
+    Args:
+        websocket: Client connection
+        x_api_key: Tenant API key
+    """
+    try:
+        tenant = _identify_tenant(x_api_key)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    send_lock = asyncio.Lock()
+    # id -> (CallControl, document) of running conversions
+    running = {}
+    # Conversion tasks, cancelled when the client leaves
+    tasks = set()
+    closed = False
+    
+    async def send(message: dict):
+        # Results of conversions finishing after a disconnect are dropped
+        nonlocal closed
+        async with send_lock:
+            if closed:
+                return
+            try:
+                await websocket.send_json(message)
+            except Exception:
+                closed = True
+    
+    def send_from_thread(message: dict):
+        # Model chunks and verifications arrive on worker threads
+        if not closed:
+            asyncio.run_coroutine_threadsafe(send(message), loop)
+    
+    async def convert(request_id: str, request: ComposeRequest, control: CallControl):
+        try:
+            request_converter = await run_in_threadpool(_select_converter, request, None, tenant)
+            result = await _run_controlled(request_id, request, request_converter, control, send_from_thread, tenant)
+            if result.get('error_code') == 'cancelled':
+                await send({"event": "cancelled", "id": request_id})
+            else:
+                await send({"event": "result", "id": request_id, **_result_message(result)})
+        except HTTPException as e:
+            await send({"event": "error", "id": request_id, "error": e.detail, "status_code": e.status_code})
+        except Exception as e:
+            await send({"event": "error", "id": request_id, "error": f"Internal server error: {e}"})
+        finally:
+            running.pop(request_id, None)
+    
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame['type'] == 'websocket.disconnect':
+                raise WebSocketDisconnect(frame.get('code', 1000))
+            if frame.get('text') is None:
+                await send({"event": "error", "error": "Invalid message: binary frames are not supported, send JSON text"})
+                continue
+            try:
+                message = json.loads(frame['text'])
+                if not isinstance(message, dict) or not isinstance(message.get('id'), str):
+                    raise ValueError("messages must be JSON objects with a string id")
+            except ValueError as e:
+                await send({"event": "error", "error": f"Invalid message: {e}"})
+                continue
+            
+            request_id = message['id']
+            if message.get('action') == 'cancel':
+                if request_id in running:
+                    running[request_id][0].cancel()
+                continue
+            
+            if request_id in running:
+                await send({"event": "error", "id": request_id, "error": "A conversion with this id is running"})
+                continue
+            unsupported = [field for field in ('memoize_subtrees', 'callback_url') if message.get(field)]
+            if unsupported:
+                # Verified results arrive as verified events instead of callbacks
+                await send({"event": "error", "id": request_id, "error": f"Not supported over WebSocket: {', '.join(unsupported)}"})
+                continue
+            if len(running) >= WS_MAX_IN_FLIGHT:
+                await send({"event": "error", "id": request_id, "error": f"More than {WS_MAX_IN_FLIGHT} conversions in flight"})
+                continue
+            try:
+                # Unknown keys such as id and document are ignored;
+                # editor traffic is interactive unless stated otherwise
+                request = ComposeRequest(**{'priority': 'interactive', **message})
+            except ValidationError as e:
+                await send({"event": "error", "id": request_id, "error": str(e)})
+                continue
+            
+            # A newer version of the same document supersedes the running one
+            document = message.get('document')
+            if document is not None:
+                for control, running_document in list(running.values()):
+                    if running_document == document:
+                        control.cancel()
+            
+            if tenant is not None:
+                try:
+                    tenant.check_request()
+                except QuotaExceeded as e:
+                    await send({"event": "error", "id": request_id, "error": str(e), "status_code": 429})
+                    continue
+            
+            control = CallControl(
+                on_chunk=lambda chunk, request_id=request_id: send_from_thread(
+                    {"event": "partial", "id": request_id, "text": chunk}
+                )
+            )
+            running[request_id] = (control, document)
+            task = asyncio.create_task(convert(request_id, request, control))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Nobody is left to receive the results
+        closed = True
+        for control, _ in list(running.values()):
+            control.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _run_controlled(request_id: str, request: ComposeRequest, request_converter: ComposeToJsonConverter,
+                          control: CallControl, send_from_thread, tenant: Optional[Tenant] = None) -> dict:
+    """
+    Run one WebSocket conversion under its CallControl
+    
+    Args:
+        request_id: Client id of the conversion
+        request: ComposeRequest
+        request_converter: Converter to use
+        control: CallControl cancelling and streaming the model calls
+        send_from_thread: Function sending a message from a worker thread
+        tenant: Tenant whose usage is recorded
+    
+    Returns:
+        Result dictionary
+    """
+    compose_code = request.compose_code.strip()
+    if not compose_code:
+        raise HTTPException(status_code=400, detail="compose_code cannot be empty")
+    try:
+        priority = RequestPriority[request.priority.upper()]
+    except KeyError:
+        raise HTTPException(status_code=400, detail="priority must be one of: interactive, default, bulk")
+    deadline = time.monotonic() + request.timeout_ms / 1000 if request.timeout_ms else None
+    
+    if request.speculative:
+        convert = partial(
+            speculative_runner.convert,
+            request_converter,
+            on_verified=lambda result: send_from_thread({"event": "verified", "id": request_id, **_result_message(result)})
+        )
+    else:
+        convert = request_converter.convert_compose_to_json
+    
+    def run():
+        with control.active():
+            return convert(compose_code, priority=priority, deadline=deadline)
+    
+    start = time.perf_counter()
+    result = await run_in_threadpool(run)
+    if tenant is not None:
+        tenant.record_request(result, (time.perf_counter() - start) * 1000)
+    return result
+
+def _result_message(result: dict) -> dict:
+    """
+    Shape a result like the /convert response
+    
+    Args:
+        result: Result dictionary
+    
+    Returns:
+        Message fields
+    """
+    if result['success']:
+        message = {
+            "success": True,
+            "input": result['input'],
+            "output": result['output'],
+            "provisional": result.get('provisional', False)
+        }
+        if 'corrected' in result:
+            message['corrected'] = result['corrected']
+        return message
+    return {
+        "success": False,
+        "input": result['input'],
+        "error": result['error'],
+        "error_code": result.get('error_code'),
+        "raw_response": result.get('raw_response', '')
+    }
+
+def _validate_source(source: str):
+    """
+    Reject empty file sources
+    
+    Args:
+        source: Kotlin source
+    """
+    if not source or not source.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="source cannot be empty"
+        )
+
+@app.post("/jobs")
+async def create_job(request: JobRequest, x_api_key: Optional[str] = Header(None)):
+    """
+    Submit a bulk conversion job
+    
+    Args:
+        request: JobRequest with a list of Compose snippets
+        x_api_key: Tenant API key
+        
+    Returns:
+        Job id and initial progress
+    """
+    tenant = _identify_tenant(x_api_key)
+    return _submit_job(request.inputs, tenant)
+
+@app.post("/jobs/upload")
+async def create_job_from_file(file: UploadFile = File(...), x_api_key: Optional[str] = Header(None)):
+    """
+    Submit a bulk conversion job from an uploaded file
+    
+    Accepts a .kt file (one item per @Composable function), a JSON
+    array, or JSONL with one snippet per line, either as a string or
+    an object with "compose_code" or "input".
+    
+    Args:
+        file: Uploaded file
+        x_api_key: Tenant API key
+        
+    Returns:
+        Job id and initial progress
+    """
+    tenant = _identify_tenant(x_api_key)
+    content = (await file.read()).decode('utf-8')
+    filename = file.filename or ""
+    
+    try:
+        if filename.endswith('.kt'):
+            inputs = [unit['body'] for unit in file_converter.split(content) if unit['body']]
+        elif filename.endswith('.json'):
+            inputs = [_job_input(record) for record in json.loads(content)]
+        else:
+            inputs = [_job_input(json.loads(line)) for line in content.splitlines() if line.strip()]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid job file: {str(e)}")
+    
+    return _submit_job(inputs, tenant)
+
+def _job_input(record) -> str:
+    """
+    Get the Compose code of an uploaded record
+    
+    Args:
+        record: String or object with compose_code or input
+        
+    Returns:
+        Compose code
+    """
+    if isinstance(record, str):
+        return record
+    return record['compose_code'] if 'compose_code' in record else record['input']
+
+def _submit_job(inputs: list, tenant: Optional[Tenant] = None) -> dict:
+    """
+    Validate inputs and create a job
+    
+    Args:
+        inputs: Compose snippets
+        tenant: Tenant owning the job
+        
+    Returns:
+        Job progress dictionary
+    """
+    inputs = [code.strip() for code in inputs]
+    if not inputs or not all(inputs):
+        raise HTTPException(
+            status_code=400,
+            detail="inputs must be a non-empty list of non-empty snippets"
+        )
+    
+    job_id = job_manager.submit(inputs, owner=tenant.name if tenant else "")
+    return job_manager.get_job(job_id)
+
+def _convert_job_item(compose_code: str, owner: str) -> dict:
+    """
+    Convert one job item with its owner's converter
+    
+    Args:
+        compose_code: Compose code
+        owner: Tenant name or "" for jobs without a tenant
+        
+    Returns:
+        Result dictionary
+    """
+    tenant = None
+    if owner:
+        tenant = tenant_registry.get_tenant(owner) if tenant_registry else None
+        if tenant is None:
+            return {'success': False, 'input': compose_code, 'error': f"Unknown tenant {owner}"}
+    return _tenant_converter(tenant).convert_compose_to_json(compose_code, priority=RequestPriority.BULK)
+
+def _get_owned_job(job_id: str, tenant: Optional[Tenant]) -> dict:
+    """
+    Get a job visible to the caller
+    
+    Args:
+        job_id: Job id
+        tenant: Calling tenant
+        
+    Returns:
+        Job progress dictionary
+    """
+    job = job_manager.get_job(job_id)
+    if job is None or (tenant is not None and job['owner'] != tenant.name):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, offset: int = 0, limit: int = 100, x_api_key: Optional[str] = Header(None)):
+    """
+    Get job progress and a page of results
+    
+    Args:
+        job_id: Job id
+        offset: First item position
+        limit: Maximum items returned (up to 1000)
+        x_api_key: Tenant API key
+        
+    Returns:
+        Job progress with results[offset:offset + limit]
+    """
+    job = _get_owned_job(job_id, _identify_tenant(x_api_key))
+    
+    offset = max(0, offset)
+    limit = max(1, min(limit, 1000))
+    results = job_manager.get_results(job_id, offset, limit)
+    next_offset = offset + limit if offset + limit < job['total'] else None
+    return {**job, "offset": offset, "results": results, "next_offset": next_offset}
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, x_api_key: Optional[str] = Header(None)):
+    """
+    Cancel a queued or running job
+    
+    Args:
+        job_id: Job id
+        x_api_key: Tenant API key
+        
+    Returns:
+        Job progress
+    """
+    _get_owned_job(job_id, _identify_tenant(x_api_key))
+    job_manager.cancel(job_id)
+    return job_manager.get_job(job_id)
+
+@app.get("/admin/usage")
+async def get_usage(tenant: Optional[str] = None, since: Optional[str] = None,
+                    x_admin_key: Optional[str] = Header(None)):
+    """
+    Get per-tenant usage counters
+    
+    Args:
+        tenant: Only this tenant
+        since: First day included (YYYY-MM-DD)
+        x_admin_key: Must match ADMIN_API_KEY
+        
+    Returns:
+        Calls, tokens, cache hits, rejections and average latency per tenant
+    """
+    if tenant_registry is None:
+        raise HTTPException(status_code=404, detail="Tenants are not configured")
+    if not _is_admin(x_admin_key):
+        raise HTTPException(status_code=403, detail="Invalid X-Admin-Key")
+    
+    return {
+        "usage": await run_in_threadpool(tenant_registry.get_usage, tenant, since),
+        "quotas": {
+            t.name: {
+                "requests_per_minute": t.requests_per_minute,
+                "tokens_per_day": t.tokens_per_day
+            }
+            for t in tenant_registry.tenants.values()
+        }
+    }
+
+def _is_admin(admin_key: Optional[str]) -> bool:
+    """
+    Check an admin key
+    
+    Args:
+        admin_key: Value of the X-Admin-Key header
+        
+    Returns:
+        True if it matches ADMIN_API_KEY
+    """
+    return bool(ADMIN_API_KEY) and hmac.compare_digest(admin_key or "", ADMIN_API_KEY)
+
+class ProfileRequest(BaseModel):
+    mode: str = "cprofile"
+    seconds: Optional[float] = None
+    requests: Optional[int] = None
+    interval_ms: float = 5
+    all_threads: bool = False
+
+@app.post("/admin/profile/start")
+async def start_profile(request: ProfileRequest, x_admin_key: Optional[str] = Header(None)):
+    """
+    Start profiling the service
+    
+    Args:
+        request: Mode ("cprofile" or "sampling"), and optionally a duration
+            in seconds, a request count, the sampling interval and whether
+            to sample all threads
+        x_admin_key: Must match ADMIN_API_KEY
+        
+    Returns:
+        Session summary
+    """
+    if not _is_admin(x_admin_key):
+        raise HTTPException(status_code=403, detail="Invalid X-Admin-Key")
+    try:
+        session = start_profiling(
+            request.mode,
+            duration=request.seconds,
+            max_requests=request.requests,
+            interval=request.interval_ms / 1000,
+            all_threads=request.all_threads
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return session.get_summary()
+
+@app.post("/admin/profile/stop")
+async def stop_profile(x_admin_key: Optional[str] = Header(None)):
+    """
+    Stop profiling the service
+    
+    Args:
+        x_admin_key: Must match ADMIN_API_KEY
+        
+    Returns:
+        Session summary
+    """
+    if not _is_admin(x_admin_key):
+        raise HTTPException(status_code=403, detail="Invalid X-Admin-Key")
+    session = stop_profiling()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return session.get_summary()
+
+@app.get("/admin/profile")
+async def get_profile(format: str = "text", sort: str = "cumulative", limit: int = 50,
+                      x_admin_key: Optional[str] = Header(None)):
+    """
+    Get the profile of the running or last profiling session
+    
+    Args:
+        format: "text", "pstats" (load with pstats.Stats or snakeviz) or
+            "collapsed" (flamegraph.pl, speedscope; sampling sessions)
+        sort: pstats sort key of the text table
+        limit: Rows of the text table
+        x_admin_key: Must match ADMIN_API_KEY
+        
+    Returns:
+        Profile report
+    """
+    if not _is_admin(x_admin_key):
+        raise HTTPException(status_code=403, detail="Invalid X-Admin-Key")
+    session = get_profiling_session()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return _profile_response(session, format, sort, limit)
+
+@app.get("/admin/profile/{profile_id}")
+async def get_request_profile(profile_id: str, format: str = "text", sort: str = "cumulative",
+                              limit: int = 50, x_admin_key: Optional[str] = Header(None)):
+    """
+    Get the profile of a request sent with the X-Profile header
+    
+    Args:
+        profile_id: X-Profile-Id of the response
+        format: "text", "pstats" or "collapsed"
+        sort: pstats sort key of the text table
+        limit: Rows of the text table
+        x_admin_key: Must match ADMIN_API_KEY
+        
+    Returns:
+        Profile report
+    """
+    if not _is_admin(x_admin_key):
+        raise HTTPException(status_code=403, detail="Invalid X-Admin-Key")
+    session = request_profiles.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _profile_response(session, format, sort, limit)
+
+def _profile_response(session: ProfileSession, output_format: str, sort: str, limit: int) -> Response:
+    """
+    Render a profiling session
+    
+    Args:
+        session: ProfileSession
+        output_format: "text", "pstats" or "collapsed"
+        sort: pstats sort key of the text table
+        limit: Rows of the text table
+        
+    Returns:
+        Plain text, or a pstats file download
+    """
+    try:
+        report = session.report(output_format, sort=sort, limit=limit)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if output_format == "pstats":
+        return Response(
+            report,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": "attachment; filename=profile.pstats"}
+        )
+    return PlainTextResponse(report)
+
+@app.on_event("startup")
+async def startup():
+    """Start job workers, resuming jobs left unfinished by a restart"""
+    job_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop job workers, flush open trace segments, finish shadow conversions and verifications, and close usage counters"""
+    await run_in_threadpool(job_manager.stop)
+    await run_in_threadpool(speculative_runner.shutdown)
+    if converter.trace_store is not None:
+        converter.trace_store.close()
+    if converter.request_log is not None:
+        converter.request_log.close()
+    if shadow_runner is not None:
+        shadow_runner.shutdown()
+    if tenant_registry is not None:
+        tenant_registry.close()
+
 # Example usage endpoint
 @app.get("/examples")
 async def get_examples():
@@ -1,4 +1,12 @@
+import argparse
 import json
+import random
+import sys
+from multiprocessing import Pool
+
+sys.path.append('..')
+from llm_converter.canonicalizer import canonical_key
+from llm_converter.dataset_store import DatasetStore
 
 def clean_value(value):
     """Clean values to ensure consistent JSON output"""
@@ -210,7 +218,204 @@ data = [
     }
 ]
 
-# Clean the datasets and write to file as JSON array
-with open("compose_sdui_dataset.json", "w", encoding="utf-8") as f:
+# Building blocks for synthetic examples
+TEXTS = [
+    "سلام", "خوش آمدید", "ورود", "ثبت نام", "تایید", "لغو", "ارسال", "عنوان",
+    "جزئیات", "تنظیمات", "پروفایل", "جستجو", "خانه", "سبد خرید", "پرداخت",
+    "Hello", "Welcome", "Login", "Sign up", "OK", "Cancel", "Submit", "Title",
+    "Details", "Settings", "Profile", "Search", "Home", "Cart", "Checkout"
+]
+COLORS = ["Red", "Blue", "Green", "Black", "Gray", "White"]
+ACTIONS = ["doSomething", "submitForm", "login", "logout", "openSettings", "addToCart", "goBack"]
+DRAWABLES = ["ic_logo", "ic_home", "ic_user", "ic_cart", "ic_search", "banner"]
+CONTAINERS = ["Column", "Row", "Box"]
+SIZES = [4, 8, 12, 16, 24, 32, 48, 64, 100]
+
+def random_modifier(rng):
+    """Build a Modifier chain and its flattened output keys"""
+    calls = []
+    output = {}
+    for name in rng.sample(["fillMaxWidth", "fillMaxSize", "padding", "size"], rng.randint(1, 2)):
+        if name in ("padding", "size"):
+            value = rng.choice(SIZES)
+            calls.append(f"{name}({value}.dp)")
+            output[f"modifier.{name}"] = value
+        else:
+            calls.append(f"{name}()")
+            output[f"modifier.{name}"] = True
+    return "Modifier." + ".".join(calls), output
+
+def random_text(rng):
+    """Build a Text node"""
+    text = rng.choice(TEXTS)
+    if rng.random() < 0.2:
+        color = rng.choice(COLORS)
+        return f'Text(text = "{text}", color = Color.{color})', {"type": "Text", "text": text, "color": color}
+    return f'Text("{text}")', {"type": "Text", "text": text}
+
+def random_button(rng):
+    """Build a Button node with a Text child"""
+    child_code, child_output = random_text(rng)
+    choice = rng.random()
+    if choice < 0.3:
+        on_click, action = rng.choice(["{}", "{ }"]), ""
+    elif choice < 0.8:
+        name = rng.choice(ACTIONS)
+        on_click, action = f"{{ {name}() }}", name
+    else:
+        message = rng.choice(TEXTS)
+        on_click, action = f'{{ println("{message}") }}', f'println("{message}")'
+    code = f"Button(onClick = {on_click}) {{ {child_code} }}"
+    return code, {"type": "Button", "onClick": action, "children": [child_output]}
+
+def random_image(rng):
+    """Build an Image node"""
+    description = rng.choice(TEXTS) if rng.random() < 0.7 else None
+    description_code = f'"{description}"' if description is not None else "null"
+    if rng.random() < 0.7:
+        src = f"R.drawable.{rng.choice(DRAWABLES)}"
+        painter = f"painterResource(id = {src})"
+    else:
+        src = f"https://example.com/{rng.choice(DRAWABLES)}.png"
+        painter = f'rememberAsyncImagePainter("{src}")'
+    code = f"Image(painter = {painter}, contentDescription = {description_code})"
+    return code, {"type": "Image", "src": src, "contentDescription": description}
+
+def random_node(rng, depth):
+    """Build a random node, nesting containers up to depth"""
+    choice = rng.random()
+    if depth > 0 and choice < 0.4:
+        return random_container(rng, depth)
+    if choice < 0.7:
+        return random_text(rng)
+    if choice < 0.9:
+        return random_button(rng)
+    return random_image(rng)
+
+def random_container(rng, depth):
+    """Build a Column, Row or Box with children"""
+    name = rng.choice(CONTAINERS)
+    output = {"type": name}
+    code = name
+    if rng.random() < 0.5:
+        modifier_code, modifier_output = random_modifier(rng)
+        code += f"(modifier = {modifier_code})"
+        output.update(modifier_output)
+    children = [random_node(rng, depth - 1) for _ in range(rng.randint(1, 4))]
+    code += " { " + " ".join(child_code for child_code, _ in children) + " }"
+    output["children"] = [child_output for _, child_output in children]
+    return code, output
+
+def generate_example(seed, index, max_depth=3):
+    """Generate one example deterministically from seed and index"""
+    rng = random.Random(seed * 1000003 + index)
+    depth = rng.randint(0, max_depth)
+    # Nested roots dominate so the combinatorial space stays large
+    if depth > 0:
+        code, output = random_container(rng, depth)
+    else:
+        code, output = random_node(rng, 0)
+    return {"input": code, "output": clean_dict(output)}
+
+def example_digest(example):
+    """First 8 bytes of the canonical key, as an int; sets of these stay small"""
+    return int(canonical_key(example["input"])[:16], 16)
+
+def generate_chunk(spec):
+    """Generate a chunk of examples as (digest, JSON line) pairs"""
+    seed, start, count, max_depth = spec
+    chunk = []
+    for index in range(start, start + count):
+        example = generate_example(seed, index, max_depth)
+        chunk.append((example_digest(example), json.dumps(example, ensure_ascii=False)))
+    return chunk
+
+def generate_synthetic(output_path, count, seed=0, chunk_size=10000, processes=None,
+                       max_depth=3, seed_examples=()):
+    """
+    Generate examples across processes and stream unique ones to a JSONL file
+
+    Duplicates (by canonical input) are dropped, and generation continues
+    until count unique synthetic examples are written or a whole round
+    adds none, i.e. the generator's space is exhausted. Curated
+    seed_examples come first and are not counted.
+    """
+    seen = set()
+    written = 0
+    synthetic = 0
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        for example in seed_examples:
+            digest = example_digest(example)
+            if digest not in seen:
+                seen.add(digest)
+                f.write(json.dumps(example, ensure_ascii=False) + "\n")
+                written += 1
+
+        next_index = 0
+        with Pool(processes) as pool:
+            while synthetic < count:
+                # Each round asks for the examples still missing (at least
+                # a chunk); later rounds make up for duplicates
+                batch = max(count - synthetic, chunk_size)
+                specs = [
+                    (seed, start, min(chunk_size, next_index + batch - start), max_depth)
+                    for start in range(next_index, next_index + batch, chunk_size)
+                ]
+                next_index += batch
+
+                added = 0
+                # imap keeps chunk order, so output is deterministic for a seed
+                for chunk in pool.imap(generate_chunk, specs):
+                    lines = []
+                    for digest, line in chunk:
+                        if synthetic + added + len(lines) >= count:
+                            break
+                        if digest not in seen:
+                            seen.add(digest)
+                            lines.append(line)
+                    f.write("\n".join(lines) + "\n" if lines else "")
+                    added += len(lines)
+                    print(f"✅ {written + synthetic + added} unique examples written")
+
+                synthetic += added
+                if not added:
+                    print(f"⚠️ No new unique examples; stopping at {synthetic} synthetic examples")
+                    break
+
+    DatasetStore.build_index(output_path)
+    return written + synthetic
+
+def main():
+    """Write the curated dataset, or generate a synthetic JSONL dataset"""
+    parser = argparse.ArgumentParser(description="Generate Compose/SDUI datasets")
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of unique synthetic examples to generate")
+    parser.add_argument("--output", default="compose_sdui_synthetic.jsonl", help="Synthetic JSONL output file")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Examples per worker task")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-depth", type=int, default=3, help="Maximum container nesting")
+    parser.add_argument("--include-curated", action="store_true", help="Start the output with the curated examples")
+    args = parser.parse_args()
+
     cleaned_data = [clean_dict(item) for item in data]
-    json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
+
+    if not args.synthetic:
+        # Clean the datasets and write to file as JSON array
+        with open("compose_sdui_dataset.json", "w", encoding="utf-8") as f:
+            json.dump(cleaned_data, f, ensure_ascii=False, indent=2)
+        return
+
+    written = generate_synthetic(
+        args.output,
+        args.synthetic,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        processes=args.processes,
+        max_depth=args.max_depth,
+        seed_examples=cleaned_data if args.include_curated else ()
+    )
+    print(f"🎉 {written} unique examples in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -13,10 +13,43 @@ from .llm_base_converter import (
     ClaudeConverter,
     OllamaConverter,
     HuggingFaceConverter,
+    CallControl,
+    ConversionCancelled,
     create_converter
 )
 
 from .compose_to_json_converter import ComposeToJsonConverter
+from .converter_pool import ConverterPool
+from .cascade import ModelCascade
+from .compose_file_converter import ComposeFileConverter
+from .compose_parser import split_composables
+from .subtree_memoizer import SubtreeMemoizer
+from .incremental_converter import IncrementalConverter
+from .json_patch import make_patch, apply_patch
+from .trace_store import TraceStore
+from .dataset_store import DatasetStore, convert_json_dataset
+from .example_index import ExampleIndex
+from .shadow import ShadowRunner
+from .speculative import SpeculativeRunner
+from .scheduler import ConversionScheduler, RequestPriority, DeadlineExceeded, SchedulerOverloaded
+from .replay import replay_traces, summarize_replay
+from .jobs import JobManager
+from .bulk import iter_bulk_inputs, convert_bulk
+from .warmup import warm_cache, save_cache_snapshot, load_cache_snapshot, top_trace_inputs
+from .sdui_schema import SchemaValidator, SDUI_SCHEMA, format_errors
+from .template_cache import TemplateCache
+from .compact_format import compact_output, expand_output, CompactFormatError
+from .tenants import TenantRegistry, Tenant, QuotaExceeded
+from .tracing import configure_tracing, tracing_enabled, start_span, current_span, parse_traceparent
+from .profiling import (
+    ProfileSession,
+    start_profiling,
+    stop_profiling,
+    get_profiling_session,
+    profile_section,
+    set_request_session,
+    reset_request_session
+)
 
 __all__ = [
     'LLMBaseConverter',
@@ -26,6 +59,57 @@ __all__ = [
     'ClaudeConverter',
     'OllamaConverter',
     'HuggingFaceConverter',
+    'CallControl',
+    'ConversionCancelled',
     'ComposeToJsonConverter',
+    'ConverterPool',
+    'ModelCascade',
+    'ComposeFileConverter',
+    'split_composables',
+    'SubtreeMemoizer',
+    'IncrementalConverter',
+    'make_patch',
+    'apply_patch',
+    'TraceStore',
+    'DatasetStore',
+    'convert_json_dataset',
+    'ExampleIndex',
+    'ShadowRunner',
+    'SpeculativeRunner',
+    'ConversionScheduler',
+    'RequestPriority',
+    'DeadlineExceeded',
+    'SchedulerOverloaded',
+    'replay_traces',
+    'summarize_replay',
+    'JobManager',
+    'iter_bulk_inputs',
+    'convert_bulk',
+    'warm_cache',
+    'save_cache_snapshot',
+    'load_cache_snapshot',
+    'top_trace_inputs',
+    'SchemaValidator',
+    'SDUI_SCHEMA',
+    'format_errors',
+    'TemplateCache',
+    'compact_output',
+    'expand_output',
+    'CompactFormatError',
+    'TenantRegistry',
+    'Tenant',
+    'QuotaExceeded',
+    'configure_tracing',
+    'tracing_enabled',
+    'start_span',
+    'current_span',
+    'parse_traceparent',
+    'ProfileSession',
+    'start_profiling',
+    'stop_profiling',
+    'get_profiling_session',
+    'profile_section',
+    'set_request_session',
+    'reset_request_session',
     'create_converter'
 ] 
\ No newline at end of file
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Command line interface
+
+    python -m llm_converter convert app/src/main results.jsonl
+    python -m llm_converter convert snippets.jsonl results.jsonl --workers 16
+    python -m llm_converter warmup snapshots --traces traces --top 500
+"""
+
+import argparse
+import os
+import sys
+
+from .bulk import iter_bulk_inputs, convert_bulk
+from .cascade import ModelCascade
+from .converter_pool import ConverterPool
+from .llm_base_converter import LLMProvider
+from .scheduler import ConversionScheduler
+from .trace_store import TraceStore
+from .warmup import warm_cache
+
+# Dataset shipped with the repository, used when --dataset is not given
+DEFAULT_DATASET = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "datasets", "compose_sdui_dataset.json"
+)
+
+def build_converters(args) -> list:
+    """
+    Create the converters selected by the common arguments
+
+    Args:
+        args: Parsed arguments
+
+    Returns:
+        Converters, one per cascade model
+    """
+    provider = LLMProvider(args.provider)
+    api_key = args.api_key or os.getenv('LLM_API_KEY') or os.getenv(f"{provider.name}_API_KEY", "")
+
+    # One scheduler bounds concurrent model calls across all workers and models
+    pool = ConverterPool(
+        scheduler=ConversionScheduler(max_concurrent=args.max_concurrent),
+        trace_store=TraceStore(args.trace_dir) if getattr(args, 'trace_dir', None) else None,
+        output_format=args.output_format,
+        # Loaded once by the first converter; the other tiers share it
+        dataset_file=args.dataset
+    )
+    model_names = [m.strip() for m in args.cascade.split(',') if m.strip()] if args.cascade else [args.model]
+    converters = [
+        pool.get(
+            api_key,
+            model_name,
+            provider,
+            few_shot_count=args.few_shot or 5,
+            adaptive_few_shot=args.adaptive_few_shot
+        )
+        for model_name in model_names
+    ]
+    return converters
+
+def convert_command(args):
+    """
+    Convert a source tree or snippet file to JSONL
+
+    Args:
+        args: Parsed arguments of the convert command
+    """
+    converters = build_converters(args)
+    convert_fn = ModelCascade(converters).convert if len(converters) > 1 else None
+
+    print(f"🔄 Converting {args.input} to {args.output}")
+    summary = convert_bulk(
+        converters[0],
+        iter_bulk_inputs(args.input, skip_previews=not args.include_previews),
+        args.output,
+        max_workers=args.workers,
+        retry_failed=args.retry_failed,
+        convert_fn=convert_fn
+    )
+
+    print("\n📈 Summary:")
+    for key, value in summary.items():
+        print(f"   {key}: {value}")
+    for converter in converters:
+        print(f"   cache ({converter.model_name}): {converter.cache_stats}")
+
+def warmup_command(args):
+    """
+    Warm the cache and write a snapshot loaded by new workers
+
+    Args:
+        args: Parsed arguments of the warmup command
+    """
+    converters = build_converters(args)
+    convert_fn = ModelCascade(converters).convert if len(converters) > 1 else None
+
+    summary = warm_cache(
+        converters[0],
+        args.snapshot_dir,
+        seed_dataset=not args.no_dataset,
+        trace_dir=args.traces,
+        top_n=args.top,
+        since=args.since,
+        max_workers=args.workers,
+        convert_fn=convert_fn
+    )
+
+    print("\n📈 Summary:")
+    for key, value in summary.items():
+        print(f"   {key}: {value}")
+
+def add_converter_arguments(parser):
+    """
+    Add the arguments selecting the provider, model and prompt
+
+    Args:
+        parser: Command parser
+    """
+    parser.add_argument("--provider", default="gemini", choices=[p.value for p in LLMProvider], help="LLM provider")
+    parser.add_argument("--model", default="", help="Model name (provider default if empty)")
+    parser.add_argument("--api-key", help="Provider API key (default LLM_API_KEY or <PROVIDER>_API_KEY)")
+    parser.add_argument("--cascade", help="Comma-separated models, escalating failures to the next one")
+    parser.add_argument("--workers", type=int, default=8, help="Items converted concurrently")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="Model calls running at once")
+    parser.add_argument("--few-shot", type=int, help="Examples per prompt")
+    parser.add_argument("--adaptive-few-shot", action="store_true", help="Choose the example count per input")
+    parser.add_argument("--output-format", default="json", choices=["json", "compact"], help="Model output format")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET, help="Training examples (.json or .jsonl)")
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(prog="python -m llm_converter", description="Compose to SDUI JSON converter")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser(
+        "convert",
+        help="Convert a directory of .kt files or a JSON/JSONL file of snippets",
+        description="Convert every composable of a source tree, or every snippet of a JSON/JSONL "
+                    "file, appending results to a JSONL file as they finish. Items already in the "
+                    "output are skipped, so an interrupted run resumes with the same command."
+    )
+    convert.add_argument("input", help="Directory or .kt file, .json array or JSONL of snippets")
+    convert.add_argument("output", help="JSONL file receiving one result per item")
+    add_converter_arguments(convert)
+    convert.add_argument("--trace-dir", help="Record model calls to this TraceStore directory")
+    convert.add_argument("--include-previews", action="store_true", help="Also convert @Preview functions")
+    convert.add_argument("--retry-failed", action="store_true", help="Convert items that failed in earlier runs again")
+    convert.set_defaults(handler=convert_command)
+
+    warmup = commands.add_parser(
+        "warmup",
+        help="Warm the result cache and write a snapshot for new workers",
+        description="Pin the dataset examples as exact matches, pre-convert the most frequent inputs "
+                    "of recorded traffic and write a cache snapshot. Snapshots are versioned by a "
+                    "fingerprint of the prompt and model; servers with CACHE_SNAPSHOT_DIR load the "
+                    "one matching their configuration at startup."
+    )
+    warmup.add_argument("snapshot_dir", help="Directory receiving the snapshot")
+    add_converter_arguments(warmup)
+    warmup.add_argument("--traces", help="TraceStore directory of recorded traffic (TRACE_DIR of the server)")
+    warmup.add_argument("--top", type=int, default=0, help="Most frequent traced inputs to pre-convert")
+    warmup.add_argument("--since", type=float, help="Only traces after this Unix timestamp")
+    warmup.add_argument("--no-dataset", action="store_true", help="Do not pin the dataset examples")
+    warmup.set_defaults(handler=warmup_command)
+
+    args = parser.parse_args()
+    try:
+        args.handler(args)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
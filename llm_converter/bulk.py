@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bulk conversion of source trees and snippet files to JSONL
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterator
+
+from .compose_parser import split_composables
+from .scheduler import RequestPriority
+
+def iter_bulk_inputs(path: str, skip_previews: bool = True) -> Iterator[dict]:
+    """
+    Read the snippets to convert
+
+    A directory is searched for .kt files, each contributing one item per
+    @Composable function. A .kt file is read the same way. A .json file
+    is an array and any other file is JSONL; records are snippets, either
+    as a string or an object with "compose_code" or "input" and an
+    optional "id".
+
+    Args:
+        path: Directory, .kt, .json or JSONL file
+        skip_previews: Ignore @Preview functions
+
+    Yields:
+        Items with a stable id, the input and where it came from
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            # Sorted walk so ids and output order are reproducible
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != 'build')
+            for name in sorted(files):
+                if name.endswith('.kt'):
+                    file_path = os.path.join(root, name)
+                    yield from _iter_kotlin_file(file_path, os.path.relpath(file_path, path), skip_previews)
+        return
+
+    if path.endswith('.kt'):
+        yield from _iter_kotlin_file(path, os.path.basename(path), skip_previews)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            records = enumerate(json.load(f))
+        else:
+            records = ((number, json.loads(line)) for number, line in enumerate(f) if line.strip())
+
+        for number, record in records:
+            if isinstance(record, str):
+                yield {'id': str(number), 'input': record}
+            else:
+                yield {
+                    'id': str(record.get('id', number)),
+                    'input': record['compose_code'] if 'compose_code' in record else record['input']
+                }
+
+def _iter_kotlin_file(file_path: str, relative_path: str, skip_previews: bool) -> Iterator[dict]:
+    """
+    Read the composables of one .kt file
+
+    Args:
+        file_path: Path of the file
+        relative_path: Path used in item ids
+        skip_previews: Ignore @Preview functions
+
+    Yields:
+        One item per composable function
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    seen = {}
+    for unit in split_composables(source):
+        if not unit['body'] or (skip_previews and 'Preview' in unit['annotations']):
+            continue
+        # Overloads share a name
+        seen[unit['name']] = seen.get(unit['name'], 0) + 1
+        suffix = f"#{seen[unit['name']]}" if seen[unit['name']] > 1 else ""
+        yield {
+            'id': f"{relative_path}::{unit['name']}{suffix}",
+            'input': unit['body'],
+            'file': relative_path,
+            'name': unit['name'],
+            'line': unit['line']
+        }
+
+def read_completed(output_path: str, retry_failed: bool = False) -> set:
+    """
+    Find the items already in an output file
+
+    A last line cut short by an interrupted run is removed so new
+    results can be appended. With retry_failed, failed records are
+    removed from the file before their items are converted again, so
+    every id keeps a single record; where an id has several records
+    (output of older runs), the last one wins.
+
+    Args:
+        output_path: JSONL output of a previous run
+        retry_failed: Count only successful items as completed
+
+    Returns:
+        Ids of completed items
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    with open(output_path, 'rb+') as f:
+        content = f.read()
+        end = content.rfind(b'\n') + 1
+        if end < len(content):
+            f.truncate(end)
+
+    lines = content[:end].decode('utf-8').splitlines()
+    # id -> (line number, success) of its last record
+    last = {}
+    for number, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        last[record['id']] = (number, bool(record.get('success')))
+
+    if not retry_failed:
+        return set(last)
+
+    completed = {item_id for item_id, (_, success) in last.items() if success}
+    kept = {number for number, success in last.values() if success}
+    if len(kept) < len(lines):
+        # Write then rename, so an interruption never loses results
+        temporary = f"{output_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            for number, line in enumerate(lines):
+                if number in kept:
+                    f.write(line + "\n")
+        os.replace(temporary, output_path)
+        print(f"🧹 Removed {len(lines) - len(kept)} failed or superseded records from {output_path}")
+    return completed
+
+def convert_bulk(converter, items, output_path: str, max_workers: int = 8,
+                 retry_failed: bool = False, convert_fn=None) -> dict:
+    """
+    Convert items concurrently, appending each result to a JSONL file as it finishes
+
+    Items already in the output are skipped, so an interrupted run
+    resumes where it stopped. Workers share the converter, and with it
+    its result cache and its scheduler's concurrency limit; conversions
+    run at bulk priority.
+
+    Args:
+        converter: ComposeToJsonConverter
+        items: Items from iter_bulk_inputs()
+        output_path: JSONL output file
+        max_workers: Number of items converted concurrently
+        retry_failed: Convert items that failed in a previous run again
+        convert_fn: Function(code, priority=...) used instead of the converter
+
+    Returns:
+        Counts of converted, failed and skipped items with elapsed time
+    """
+    completed = read_completed(output_path, retry_failed)
+    convert = convert_fn or converter.convert_compose_to_json
+    summary = {'converted': 0, 'failed': 0, 'skipped': 0, 'cached': 0}
+    start = time.perf_counter()
+
+    def convert_item(item: dict) -> dict:
+        result = convert(item['input'], priority=RequestPriority.BULK)
+        record = {key: value for key, value in item.items() if key != 'input'}
+        record['success'] = result['success']
+        if result['success']:
+            record['output'] = result['output']
+        else:
+            record['error'] = result.get('error')
+            record['error_code'] = result.get('error_code')
+        record['cached'] = result.get('cached', False)
+        record['latency_ms'] = result.get('latency_ms')
+        return record
+
+    # Initialize once before workers share the model
+    converter.ensure_model()
+
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = set()
+
+        def write_finished(done):
+            for future in done:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                summary['converted' if record['success'] else 'failed'] += 1
+                summary['cached'] += 1 if record['cached'] else 0
+            # Flushed per batch so an interrupted run loses nothing written
+            out.flush()
+
+        try:
+            for item in items:
+                if item['id'] in completed:
+                    summary['skipped'] += 1
+                    continue
+                # Bounded submission keeps memory flat on large trees
+                if len(pending) >= 2 * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    write_finished(done)
+                pending.add(executor.submit(convert_item, item))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write_finished(done)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            print("\n⏹️ Interrupted; run again with the same output to resume")
+            raise
+
+    summary['elapsed_s'] = round(time.perf_counter() - start, 2)
+    return summary
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Canonical form of Compose code for caching, coalescing and retrieval
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+from .compose_parser import skip_literal
+
+# Changes when the same code may get a different canonical form, so
+# cached results keyed by the old form are not reused
+CANONICAL_FORM_VERSION = 2
+
+# Multi-character operators, longest first so "..<" is not read as ".."
+_OPERATORS = (
+    '===', '!==', '..<',
+    '->', '==', '!=', '<=', '>=', '&&', '||', '?.', '?:', '::', '..',
+    '++', '--', '+=', '-=', '*=', '/=', '%=', '!!'
+)
+
+# Numbers that can be swapped for another of the same form
+_PLAIN_NUMBER = re.compile(r'^\d+(\.\d+)?$')
+
+# First positional parameter of common composables; a leading named
+# argument with this name is the same as a positional one
+FIRST_PARAMETERS = {
+    'Text': 'text',
+    'BasicText': 'text',
+    'Button': 'onClick',
+    'TextButton': 'onClick',
+    'OutlinedButton': 'onClick',
+    'IconButton': 'onClick',
+    'Image': 'painter',
+    'Icon': 'imageVector'
+}
+
+def tokenize(code: str) -> list:
+    """
+    Split Compose code into tokens
+
+    Comments and whitespace are dropped.
+
+    Args:
+        code: Compose code
+
+    Returns:
+        List of (kind, text) tuples; kind is one of
+        'string', 'char', 'number', 'ident' or 'punct'
+    """
+    tokens = []
+    i = 0
+
+    while i < len(code):
+        ch = code[i]
+
+        if ch.isspace():
+            i += 1
+            continue
+
+        end = skip_literal(code, i)
+        if end != i:
+            if ch == '"':
+                tokens.append(('string', code[i:end]))
+            elif ch == "'":
+                tokens.append(('char', code[i:end]))
+            # Anything else skipped is a comment
+            i = end
+            continue
+
+        if ch.isdigit():
+            end = i + 1
+            while end < len(code) and (code[end].isalnum() or code[end] == '_'):
+                end += 1
+            # Decimal part, but not member access like 8.dp
+            if end + 1 < len(code) and code[end] == '.' and code[end + 1].isdigit():
+                end += 1
+                while end < len(code) and (code[end].isalnum() or code[end] == '_'):
+                    end += 1
+            tokens.append(('number', code[i:end]))
+            i = end
+            continue
+
+        if ch.isalpha() or ch == '_':
+            end = i + 1
+            while end < len(code) and (code[end].isalnum() or code[end] == '_'):
+                end += 1
+            tokens.append(('ident', code[i:end]))
+            i = end
+            continue
+
+        # Multi-character operators
+        for op in _OPERATORS:
+            if code.startswith(op, i):
+                tokens.append(('punct', op))
+                i += len(op)
+                break
+        else:
+            tokens.append(('punct', ch))
+            i += 1
+
+    return tokens
+
+def _normalize_tokens(tokens: list) -> list:
+    """
+    Apply canonical rewrites to a token list
+
+    Removes trailing commas and semicolons, and turns a leading named
+    argument that matches the first parameter into a positional one.
+
+    Args:
+        tokens: Tokens from tokenize()
+
+    Returns:
+        Normalized tokens
+    """
+    result = []
+    i = 0
+
+    while i < len(tokens):
+        kind, text = tokens[i]
+
+        # Trailing comma before a closing bracket
+        if text == ',' and i + 1 < len(tokens) and tokens[i + 1][1] in (')', ']'):
+            i += 1
+            continue
+
+        # Statement separators are equivalent to newlines
+        if text == ';':
+            i += 1
+            continue
+
+        result.append(tokens[i])
+
+        # Name ( first = ...  ->  Name ( ...
+        if (kind == 'ident' and text in FIRST_PARAMETERS
+                and i + 3 < len(tokens)
+                and tokens[i + 1][1] == '('
+                and tokens[i + 2] == ('ident', FIRST_PARAMETERS[text])
+                and tokens[i + 3][1] == '='):
+            result.append(tokens[i + 1])
+            i += 4
+            continue
+
+        i += 1
+
+    return result
+
+def canonicalize(code: str) -> str:
+    """
+    Build the canonical form of Compose code
+
+    Semantically identical snippets such as
+    'Button(onClick = {}) { Text("Hi") }' and
+    'Button(onClick = { }) {Text(text = "Hi",)}' have the same form.
+
+    Args:
+        code: Compose code
+
+    Returns:
+        Canonical code string
+    """
+    return _join_tokens(_normalize_tokens(tokenize(code)))
+
+@lru_cache(maxsize=None)
+def _punct_merges(previous: str, text: str) -> bool:
+    """
+    Tell whether two punctuation tokens read differently once joined
+
+    "-" and "-" become "--", "/" and "/" a comment.
+
+    Args:
+        previous: First token
+        text: Second token
+
+    Returns:
+        True if they need a space between them
+    """
+    return tokenize(previous + text) != [('punct', previous), ('punct', text)]
+
+def _join_tokens(tokens: list) -> str:
+    """
+    Join tokens with minimal spacing
+
+    Args:
+        tokens: Tokens from tokenize()
+    
+    Returns:
+        Code string
+    """
+    parts = []
+    previous_kind = None
+    previous_text = None
+
+    for kind, text in tokens:
+        # Keep a space only where two tokens would otherwise merge
+        if previous_kind in ('ident', 'number') and kind in ('ident', 'number'):
+            parts.append(' ')
+        elif previous_kind == 'punct' and kind == 'punct' and _punct_merges(previous_text, text):
+            parts.append(' ')
+        parts.append(text)
+        previous_kind = kind
+        previous_text = text
+
+    return ''.join(parts)
+
+def canonical_key(code: str) -> str:
+    """
+    Hash the canonical form of Compose code
+
+    Args:
+        code: Compose code
+
+    Returns:
+        Hex digest usable as a cache key
+    """
+    return hashlib.sha256(canonicalize(code).encode('utf-8')).hexdigest()
+
+def parameterize(code: str) -> tuple:
+    """
+    Separate Compose code into a literal-free skeleton and its literals
+
+    Plain non-empty string literals (no escapes or templates) and plain
+    numbers are replaced by positional placeholders, so 'Text("A")' and
+    'Text(text = "B")' share a skeleton.
+
+    Args:
+        code: Compose code
+    
+    Returns:
+        (skeleton_key, literals): hex digest of the canonical skeleton
+        and a list of ('string', str) / ('number', int or float) tuples
+        in source order
+    """
+    tokens = []
+    literals = []
+
+    for kind, text in _normalize_tokens(tokenize(code)):
+        # Empty strings stay structural: "" is also what { } converts to
+        if (kind == 'string' and text != '""' and not text.startswith('"""')
+                and '\\' not in text and '$' not in text):
+            literals.append(('string', text[1:-1]))
+            tokens.append(('string', '"\x00"'))
+        elif kind == 'number' and _PLAIN_NUMBER.match(text):
+            literals.append(('number', float(text) if '.' in text else int(text)))
+            tokens.append(('number', '\x00'))
+        else:
+            tokens.append((kind, text))
+
+    skeleton = _join_tokens(tokens)
+    return hashlib.sha256(skeleton.encode('utf-8')).hexdigest(), literals
+
+def identifier_set(code: str) -> frozenset:
+    """
+    Get the identifiers used in Compose code
+
+    Used to compare the structure of two snippets regardless of literals.
+
+    Args:
+        code: Compose code
+
+    Returns:
+        Set of identifiers
+    """
+    return frozenset(text for kind, text in tokenize(code) if kind == 'ident')
+
+def score_complexity(code: str) -> dict:
+    """
+    Measure how complex a Compose snippet is
+
+    Args:
+        code: Compose code
+
+    Returns:
+        Dictionary with composables (PascalCase calls), depth (maximum
+        brace nesting), modifiers (Modifier calls) and their sum as score
+    """
+    tokens = tokenize(code)
+    composables = 0
+    modifiers = 0
+    depth = 0
+    max_depth = 0
+    in_modifier_chain = False
+
+    for i, (kind, text) in enumerate(tokens):
+        following = tokens[i + 1][1] if i + 1 < len(tokens) else None
+
+        if kind == 'ident':
+            if text == 'Modifier':
+                in_modifier_chain = True
+            elif in_modifier_chain and following == '(':
+                modifiers += 1
+            elif text[0].isupper() and following in ('(', '{'):
+                composables += 1
+        elif text == '{':
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif text == '}':
+            depth -= 1
+
+        # A Modifier chain continues only through member access
+        if in_modifier_chain and kind == 'punct' and text not in ('.', '?.', '(', ')'):
+            in_modifier_chain = False
+
+    return {
+        'composables': composables,
+        'depth': max_depth,
+        'modifiers': modifiers,
+        'score': composables + max(0, max_depth - 1) + modifiers
+    }
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Model cascade: convert with a fast model, escalate failures to stronger ones
+"""
+
+import threading
+import time
+from typing import Optional
+
+from .canonicalizer import canonical_key
+from .llm_base_converter import estimate_tokens, conversion_scope
+
+class ModelCascade:
+    """
+    Try converters from cheapest to strongest until one succeeds
+
+    Every tier's output goes through its converter's JSON parsing and
+    schema validation. A tier escalates when its conversion fails, or,
+    with escalate_on_repair, when it only succeeded after a repair prompt
+    or retry (a low-confidence answer); that answer is still returned if
+    no stronger tier succeeds. Requests the scheduler or a quota did not
+    serve are returned as is. An escalated result is cached in the first
+    tier, so repeated inputs stop at the cheap tier.
+    """
+
+    def __init__(self, tiers: list, costs: Optional[list] = None, escalate_on_repair: bool = True):
+        """
+        Initialize the cascade
+
+        Args:
+            tiers: ComposeToJsonConverter instances, cheapest first
+            costs: Optional price per 1000 tokens of each tier, for the
+                blended cost; omitted tiers cost 0
+            escalate_on_repair: Escalate outputs that needed a repair or retry
+        """
+        if not tiers:
+            raise ValueError("A cascade needs at least one converter")
+
+        self.tiers = tiers
+        self.costs = list(costs or []) + [0.0] * (len(tiers) - len(costs or []))
+        self.escalate_on_repair = escalate_on_repair
+        self.lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'escalations': 0,
+            'failures': 0,
+            'latency_ms': 0.0,
+            'cost': 0.0
+        }
+        self.tier_stats = [
+            {'attempts': 0, 'calls': 0, 'successes': 0, 'resolved': 0, 'latency_ms': 0.0,
+             'prompt_tokens': 0, 'output_tokens': 0}
+            for _ in tiers
+        ]
+
+    def convert(self, compose_code: str, priority=None, deadline: Optional[float] = None) -> dict:
+        """
+        Convert Compose code, escalating through the tiers as needed
+
+        Args:
+            compose_code: Jetpack Compose code
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline shared by all tiers
+
+        Returns:
+            Result dictionary with the model and tier that produced it
+        """
+        # One request, however many tiers it reaches
+        with conversion_scope() as outermost:
+            result = self._convert(compose_code, priority, deadline)
+        if outermost:
+            self.tiers[0].log_request(compose_code, result)
+        return result
+
+    def _convert(self, compose_code: str, priority=None, deadline: Optional[float] = None) -> dict:
+        """
+        Convert through the tiers
+
+        Args:
+            compose_code: Jetpack Compose code
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline shared by all tiers
+
+        Returns:
+            Result dictionary with the model and tier that produced it
+        """
+        start = time.perf_counter()
+        fallback = None
+        resolved = None
+        cost = 0.0
+
+        for index, tier in enumerate(self.tiers):
+            tier_start = time.perf_counter()
+            result = tier.convert_compose_to_json(compose_code, priority, deadline)
+            cost += self._record_tier(index, result, (time.perf_counter() - tier_start) * 1000)
+
+            # Not served: a stronger model would not be either
+            if result.get('error_code'):
+                break
+
+            last = index == len(self.tiers) - 1
+            if result['success']:
+                if last or not (self.escalate_on_repair and self._low_confidence(result)):
+                    resolved = index
+                    # A cached result keeps the tier that produced it
+                    result = {'model': tier.model_name, 'cascade_tier': index, **result}
+                    break
+                if fallback is None:
+                    fallback = {'model': tier.model_name, 'cascade_tier': index, **result}
+                    fallback_index = index
+
+            if not last:
+                print(f"⬆️ Escalating to {self.tiers[index + 1].model_name}: {compose_code}")
+
+        if resolved is None and fallback is not None:
+            result = fallback
+            resolved = fallback_index
+
+        # Serve the next identical request from the first tier's cache
+        if resolved and not result.get('cached'):
+            self.tiers[0]._store_result(canonical_key(compose_code), result)
+
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['escalations'] += int(index > 0)
+            self.stats['failures'] += int(not result['success'])
+            self.stats['latency_ms'] += (time.perf_counter() - start) * 1000
+            self.stats['cost'] += cost
+            if resolved is not None and result['success']:
+                self.tier_stats[resolved]['resolved'] += 1
+
+        return result
+
+    def _low_confidence(self, result: dict) -> bool:
+        """
+        Tell whether a successful result needed recovery
+
+        Args:
+            result: Result dictionary of a tier
+
+        Returns:
+            True if the output came from a repair prompt or retry
+        """
+        return bool(result.get('repair_attempts') or result.get('full_retries'))
+
+    def _record_tier(self, index: int, result: dict, latency_ms: float) -> float:
+        """
+        Account one tier attempt
+
+        Args:
+            index: Tier index
+            result: Result dictionary of the tier
+            latency_ms: Latency of the attempt
+
+        Returns:
+            Estimated cost of the attempt
+        """
+        # Cache hits and unserved requests made no model call
+        called = not result.get('cached') and not result.get('error_code')
+        prompt_tokens = result.get('prompt_tokens', 0) if called else 0
+        output_tokens = estimate_tokens(result.get('raw_response', '')) if called else 0
+
+        with self.lock:
+            stats = self.tier_stats[index]
+            stats['attempts'] += 1
+            stats['calls'] += int(called)
+            stats['successes'] += int(result['success'])
+            stats['latency_ms'] += latency_ms
+            stats['prompt_tokens'] += prompt_tokens
+            stats['output_tokens'] += output_tokens
+
+        return (prompt_tokens + output_tokens) / 1000 * self.costs[index]
+
+    def get_stats(self) -> dict:
+        """
+        Get escalation rate, blended latency and cost
+
+        Returns:
+            Cascade totals and per-tier statistics
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            tier_stats = [dict(s) for s in self.tier_stats]
+
+        requests = stats['requests']
+        return {
+            'requests': requests,
+            'escalation_rate': stats['escalations'] / requests if requests else None,
+            'failure_rate': stats['failures'] / requests if requests else None,
+            'avg_latency_ms': stats['latency_ms'] / requests if requests else None,
+            'avg_cost': stats['cost'] / requests if requests else None,
+            'tiers': [
+                {
+                    'model': tier.model_name,
+                    'cost_per_1k_tokens': self.costs[index],
+                    'attempts': s['attempts'],
+                    'calls': s['calls'],
+                    'successes': s['successes'],
+                    'resolved_share': s['resolved'] / requests if requests else None,
+                    'prompt_tokens': s['prompt_tokens'],
+                    'output_tokens': s['output_tokens'],
+                    'avg_latency_ms': s['latency_ms'] / s['attempts'] if s['attempts'] else None
+                }
+                for index, (tier, s) in enumerate(zip(self.tiers, tier_stats))
+            ]
+        }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compact wire format for model output, expanded locally to SDUI JSON
+"""
+
+# Frequent SDUI keys and their short forms
+COMPACT_KEYS = {
+    'text': 't',
+    'onClick': 'c',
+    'src': 's',
+    'contentDescription': 'd',
+    'color': 'k',
+    'backgroundColor': 'b'
+}
+
+_EXPANDED_KEYS = {short: key for key, short in COMPACT_KEYS.items()}
+
+# Modifier keys are written "@padding" instead of "modifier.padding"
+_MODIFIER_PREFIX = 'modifier.'
+
+# Other keys that would read as a short form are escaped with "!"
+_ESCAPE = '!'
+
+FORMAT_DESCRIPTION = [
+    "Output format (compact):",
+    '- A component is an array: ["Type", properties, [children]]',
+    '- properties is an object, or just the text string when text is the only property',
+    '- Leave out properties or children when there are none',
+    "- Short keys: " + ", ".join(f"{short}={key}" for key, short in COMPACT_KEYS.items())
+    + ', @name=modifier.name'
+]
+
+class CompactFormatError(ValueError):
+    """
+    Model output that is not valid compact format
+    """
+    pass
+
+def _compact_key(key: str) -> str:
+    """Short form of an SDUI key"""
+    if key in COMPACT_KEYS:
+        return COMPACT_KEYS[key]
+    if key.startswith(_MODIFIER_PREFIX):
+        return '@' + key[len(_MODIFIER_PREFIX):]
+    if key in _EXPANDED_KEYS or key.startswith(('@', _ESCAPE)):
+        return _ESCAPE + key
+    return key
+
+def _expand_key(key: str) -> str:
+    """SDUI key of a short form"""
+    if key in _EXPANDED_KEYS:
+        return _EXPANDED_KEYS[key]
+    if key.startswith('@'):
+        return _MODIFIER_PREFIX + key[1:]
+    if key.startswith(_ESCAPE):
+        return key[1:]
+    return key
+
+def compact_output(node) -> list:
+    """
+    Convert SDUI JSON to the compact format
+
+    {"type": "Column", "children": [{"type": "Text", "text": "Hi"}]}
+    becomes ["Column", [["Text", "Hi"]]].
+
+    Args:
+        node: SDUI component
+
+    Returns:
+        Compact component
+
+    Raises:
+        CompactFormatError: A node has no string type or invalid children
+    """
+    if not isinstance(node, dict) or not isinstance(node.get('type'), str):
+        raise CompactFormatError(f"expected a component with a type, got {node!r}")
+
+    properties = {
+        _compact_key(key): value for key, value in node.items() if key not in ('type', 'children')
+    }
+
+    result = [node['type']]
+    if set(properties) == {'t'} and isinstance(properties['t'], str):
+        result.append(properties['t'])
+    elif properties:
+        result.append(properties)
+
+    if 'children' in node:
+        if not isinstance(node['children'], list):
+            raise CompactFormatError(f"expected a list of children, got {node['children']!r}")
+        result.append([compact_output(child) for child in node['children']])
+
+    return result
+
+def expand_output(node) -> dict:
+    """
+    Convert a compact component back to SDUI JSON
+
+    Args:
+        node: Compact component
+
+    Returns:
+        SDUI component
+
+    Raises:
+        CompactFormatError: The value is not a compact component
+    """
+    if not isinstance(node, list) or not node or not isinstance(node[0], str):
+        raise CompactFormatError(f'expected ["Type", properties, [children]], got {node!r}')
+
+    result = {'type': node[0]}
+    rest = node[1:]
+
+    if rest and isinstance(rest[0], str):
+        result['text'] = rest[0]
+        rest = rest[1:]
+    elif rest and isinstance(rest[0], dict):
+        for key, value in rest[0].items():
+            result[_expand_key(key)] = value
+        rest = rest[1:]
+
+    if rest and isinstance(rest[0], list):
+        result['children'] = [expand_output(child) for child in rest[0]]
+        rest = rest[1:]
+
+    if rest:
+        raise CompactFormatError(f"unexpected {rest[0]!r} in {node!r}")
+
+    return result
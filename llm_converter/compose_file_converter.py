@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Whole-file Compose to JSON conversion
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+
+from .compose_parser import split_composables
+
+class ComposeFileConverter:
+    """
+    Convert a whole .kt file by converting each @Composable function in parallel
+    """
+
+    def __init__(self, converter, max_workers: int = 4, skip_previews: bool = True):
+        """
+        Initialize the file converter
+
+        Args:
+            converter: ComposeToJsonConverter used for each unit
+            max_workers: Number of units converted concurrently
+            skip_previews: Ignore @Preview functions
+        """
+        self.converter = converter
+        self.max_workers = max(1, max_workers)
+        self.skip_previews = skip_previews
+
+    def split(self, source: str) -> list:
+        """
+        Split source into composable units
+
+        Args:
+            source: Content of a .kt file
+
+        Returns:
+            List of units to convert
+        """
+        units = split_composables(source)
+        if self.skip_previews:
+            units = [unit for unit in units if 'Preview' not in unit['annotations']]
+        return units
+
+    def _convert_unit(self, index: int, unit: dict) -> dict:
+        """
+        Convert a single unit
+
+        Args:
+            index: Position of the unit in the file
+            unit: Unit from split()
+
+        Returns:
+            Converter result with unit name, line and index
+        """
+        if not unit['body']:
+            result = {
+                'success': False,
+                'input': unit['body'],
+                'error': 'Empty composable body'
+            }
+        else:
+            result = self.converter.convert_compose_to_json(unit['body'])
+
+        return {
+            **result,
+            'name': unit['name'],
+            'line': unit['line'],
+            'index': index
+        }
+
+    def iter_convert_file(self, source: str) -> Iterator[dict]:
+        """
+        Convert every unit, yielding results as they finish
+
+        Args:
+            source: Content of a .kt file
+
+        Yields:
+            Per-unit result dictionaries in completion order
+        """
+        units = self.split(source)
+        if not units:
+            return
+
+        # Initialize once before workers share the model
+        self.converter.ensure_model()
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(units))) as executor:
+            futures = [
+                executor.submit(self._convert_unit, index, unit)
+                for index, unit in enumerate(units)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def assemble_screen(self, unit_results: list, screen_name: str = "") -> dict:
+        """
+        Reassemble unit results into a screen-level document
+
+        Args:
+            unit_results: Results from iter_convert_file()
+            screen_name: Name of the screen (usually the file name)
+
+        Returns:
+            Screen JSON with one entry per converted composable; overloads
+            after the first are keyed "Name#2", "Name#3", ... in file order
+        """
+        ordered = sorted(unit_results, key=lambda r: r['index'])
+        composables = {}
+        seen = {}
+        for r in ordered:
+            # Overloads share a name
+            seen[r['name']] = seen.get(r['name'], 0) + 1
+            if r['success']:
+                suffix = f"#{seen[r['name']]}" if seen[r['name']] > 1 else ""
+                composables[f"{r['name']}{suffix}"] = r['output']
+        return {
+            "type": "Screen",
+            "name": screen_name,
+            "composables": composables
+        }
+
+    def convert_file(self, source: str, screen_name: str = "") -> dict:
+        """
+        Convert a whole file
+
+        Args:
+            source: Content of a .kt file
+            screen_name: Name of the screen
+
+        Returns:
+            Result dictionary with screen output and per-unit errors
+        """
+        print(f"🔄 Converting file: {screen_name or '<source>'}")
+
+        try:
+            unit_results = list(self.iter_convert_file(source))
+        except Exception as e:
+            print(f"❌ Unexpected error: {e}")
+            return {
+                'success': False,
+                'input': source,
+                'error': str(e)
+            }
+
+        if not unit_results:
+            return {
+                'success': False,
+                'input': source,
+                'error': 'No @Composable functions found'
+            }
+
+        errors = [
+            {'name': r['name'], 'line': r['line'], 'error': r['error']}
+            for r in sorted(unit_results, key=lambda r: r['index'])
+            if not r['success']
+        ]
+
+        print(f"✅ {len(unit_results) - len(errors)}/{len(unit_results)} composables converted")
+        return {
+            'success': not errors,
+            'input': source,
+            'output': self.assemble_screen(unit_results, screen_name),
+            'errors': errors
+        }
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Lightweight scanning helpers for Kotlin/Compose source
+"""
+
+import re
+
+# Matching bracket pairs
+_PAIRS = {'(': ')', '{': '}', '[': ']'}
+
+# Type parameters or arguments, nested up to three levels: <T>, <K, List<V>>
+_TYPE_ARGUMENTS = r'<(?:[^<>]|<(?:[^<>]|<[^<>]*>)*>)*>'
+
+# Function declaration: fun [<T>] [Receiver[<T>][?].]Name(
+_FUN_PATTERN = re.compile(
+    rf'fun\s+(?:{_TYPE_ARGUMENTS}\s*)?(?:[\w.]+?(?:{_TYPE_ARGUMENTS})?\??\.)?(\w+)\s*\('
+)
+
+# Annotation name: @Composable, @Preview(...)
+_ANNOTATION_PATTERN = re.compile(r'@(\w+)')
+
+# Declarations that end a pending annotation list
+_DECLARATION_PATTERN = re.compile(r'(?:class|object|interface|val|var|typealias)\b')
+
+# Call target: Text, Modifier.padding, androidx.compose.material.Button
+_CALL_PATTERN = re.compile(r'([A-Za-z_][\w.]*)\s*')
+
+def skip_literal(source: str, index: int) -> int:
+    """
+    Skip a string, char literal or comment starting at index
+
+    Args:
+        source: Kotlin source
+        index: Current position
+
+    Returns:
+        Position just after the literal, or index if none starts there
+    """
+    if source.startswith('//', index):
+        end = source.find('\n', index)
+        return len(source) if end == -1 else end
+
+    if source.startswith('/*', index):
+        # Kotlin block comments nest
+        depth = 0
+        i = index
+        while i < len(source):
+            if source.startswith('/*', i):
+                depth += 1
+                i += 2
+            elif source.startswith('*/', i):
+                depth -= 1
+                i += 2
+                if depth == 0:
+                    return i
+            else:
+                i += 1
+        return len(source)
+
+    if source.startswith('"""', index):
+        i = index + 3
+        while i < len(source):
+            if source.startswith('${', i):
+                i = _skip_template(source, i)
+            elif source.startswith('"""', i):
+                # Closing quotes may be preceded by extra quote characters
+                i += 3
+                while i < len(source) and source[i] == '"':
+                    i += 1
+                return i
+            else:
+                i += 1
+        return len(source)
+
+    if index < len(source) and source[index] == '"':
+        i = index + 1
+        while i < len(source):
+            ch = source[i]
+            if ch == '\\':
+                i += 2
+            elif source.startswith('${', i):
+                i = _skip_template(source, i)
+            elif ch == '"':
+                return i + 1
+            elif ch == '\n':
+                # Unterminated string
+                return i
+            else:
+                i += 1
+        return len(source)
+
+    if index < len(source) and source[index] == "'":
+        i = index + 1
+        while i < len(source) and source[i] not in "'\n":
+            i += 2 if source[i] == '\\' else 1
+        return min(i + 1, len(source))
+
+    return index
+
+def _skip_template(source: str, index: int) -> int:
+    """
+    Skip a ${...} string template starting at index
+
+    Args:
+        source: Kotlin source
+        index: Position of '$'
+
+    Returns:
+        Position just after the closing brace
+    """
+    end = find_matching(source, index + 1)
+    return len(source) if end == -1 else end + 1
+
+def find_matching(source: str, open_index: int) -> int:
+    """
+    Find the bracket closing the one at open_index
+
+    Strings, char literals and comments are skipped, so braces inside
+    them do not affect the depth.
+
+    Args:
+        source: Kotlin source
+        open_index: Position of '(', '{' or '['
+
+    Returns:
+        Position of the matching bracket or -1 if unbalanced
+    """
+    opening = source[open_index]
+    closing = _PAIRS[opening]
+    depth = 0
+    i = open_index
+
+    while i < len(source):
+        skipped = skip_literal(source, i)
+        if skipped != i:
+            i = skipped
+            continue
+
+        ch = source[i]
+        if ch == opening:
+            depth += 1
+        elif ch == closing:
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+
+    return -1
+
+def _skip_whitespace(source: str, index: int) -> int:
+    """
+    Skip whitespace and comments
+
+    Args:
+        source: Kotlin source
+        index: Current position
+
+    Returns:
+        Position of the next significant character
+    """
+    while index < len(source):
+        if source[index].isspace():
+            index += 1
+            continue
+        if source.startswith('//', index) or source.startswith('/*', index):
+            index = skip_literal(source, index)
+            continue
+        break
+    return index
+
+def _find_body(source: str, index: int) -> tuple:
+    """
+    Find a function body after its parameter list
+
+    Args:
+        source: Kotlin source
+        index: Position just after the closing parenthesis
+
+    Returns:
+        (body_start, body_end, end) or None if there is no body
+    """
+    i = _skip_whitespace(source, index)
+
+    # Optional return type
+    if i < len(source) and source[i] == ':':
+        while i < len(source) and source[i] not in '{=\n':
+            i += 1
+        i = _skip_whitespace(source, i)
+
+    if i >= len(source):
+        return None
+
+    if source[i] == '{':
+        end = find_matching(source, i)
+        if end == -1:
+            return None
+        return i + 1, end, end + 1
+
+    if source[i] == '=':
+        # Expression body: a single call with optional trailing lambda
+        start = _skip_whitespace(source, i + 1)
+        match = re.compile(r'[\w.]+\s*').match(source, start)
+        if not match:
+            return None
+        j = match.end()
+        if j < len(source) and source[j] == '(':
+            j = find_matching(source, j)
+            if j == -1:
+                return None
+            j = _skip_whitespace(source, j + 1)
+        if j < len(source) and source[j] == '{':
+            j = find_matching(source, j)
+            if j == -1:
+                return None
+            j += 1
+        return start, j, j
+
+    return None
+
+def split_composables(source: str) -> list:
+    """
+    Split a Kotlin file into its top-level @Composable functions
+
+    Args:
+        source: Content of a .kt file
+
+    Returns:
+        List of units with name, annotations, parameters, body and line
+    """
+    units = []
+    pending_annotations = []
+    i = 0
+
+    while i < len(source):
+        skipped = skip_literal(source, i)
+        if skipped != i:
+            i = skipped
+            continue
+
+        ch = source[i]
+        at_word_start = i == 0 or not (source[i - 1].isalnum() or source[i - 1] == '_')
+
+        if ch == '@':
+            match = _ANNOTATION_PATTERN.match(source, i)
+            if match:
+                pending_annotations.append(match.group(1))
+                i = match.end()
+                # Skip annotation arguments like @Preview(showBackground = true)
+                j = _skip_whitespace(source, i)
+                if j < len(source) and source[j] == '(':
+                    end = find_matching(source, j)
+                    i = len(source) if end == -1 else end + 1
+                continue
+
+        elif ch in '{}':
+            pending_annotations = []
+
+        elif at_word_start and _DECLARATION_PATTERN.match(source, i):
+            pending_annotations = []
+
+        elif at_word_start and ch == 'f':
+            match = _FUN_PATTERN.match(source, i)
+            if match:
+                annotations = pending_annotations
+                pending_annotations = []
+
+                if 'Composable' not in annotations:
+                    i = match.end()
+                    continue
+
+                params_start = match.end() - 1
+                params_end = find_matching(source, params_start)
+                if params_end == -1:
+                    break
+
+                body = _find_body(source, params_end + 1)
+                if body is None:
+                    i = params_end + 1
+                    continue
+
+                body_start, body_end, end = body
+                units.append({
+                    'name': match.group(1),
+                    'annotations': annotations,
+                    'parameters': source[params_start + 1:params_end].strip(),
+                    'body': source[body_start:body_end].strip(),
+                    'line': source.count('\n', 0, i) + 1
+                })
+                i = end
+                continue
+
+        i += 1
+
+    return units
+
+def parse_calls(code: str) -> list:
+    """
+    Split code into its sequence of top-level calls
+
+    Each call is Name(args), Name { content } or Name(args) { content }.
+
+    Args:
+        code: Compose code such as the content of a trailing lambda
+
+    Returns:
+        List of calls with name, args, content and text, or None if any
+        statement is not a plain call
+    """
+    calls = []
+    i = _skip_whitespace(code, 0)
+
+    while i < len(code):
+        if code[i] == ';':
+            i = _skip_whitespace(code, i + 1)
+            continue
+
+        match = _CALL_PATTERN.match(code, i)
+        if not match:
+            return None
+
+        j = match.end()
+        args = None
+        content = None
+
+        if j < len(code) and code[j] == '(':
+            end = find_matching(code, j)
+            if end == -1:
+                return None
+            args = code[j + 1:end]
+            j = _skip_whitespace(code, end + 1)
+
+        if j < len(code) and code[j] == '{':
+            end = find_matching(code, j)
+            if end == -1:
+                return None
+            content = code[j + 1:end]
+            j = end + 1
+
+        if args is None and content is None:
+            return None
+
+        calls.append({
+            'name': match.group(1),
+            'args': args,
+            'content': content,
+            'text': code[i:j].strip()
+        })
+        i = _skip_whitespace(code, j)
+
+    return calls
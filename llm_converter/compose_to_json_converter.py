@@ -5,27 +5,59 @@
 Compose to JSON converter for SDUI
 """
 
+import copy
 import json
-from .llm_base_converter import GeminiConverter
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional
+from .llm_base_converter import GeminiConverter, LLMProvider, ConversionCancelled, create_converter, estimate_tokens, conversion_scope, is_truncated_json
+from .canonicalizer import canonical_key, score_complexity, CANONICAL_FORM_VERSION
+from .dataset_store import DatasetStore
+from .example_index import ExampleIndex
+from .scheduler import RequestPriority, DeadlineExceeded, SchedulerOverloaded
+from .tenants import QuotaExceeded
+from .sdui_schema import SchemaValidator, format_errors
+from .template_cache import TemplateCache
+from .compact_format import compact_output, expand_output, CompactFormatError, FORMAT_DESCRIPTION
+from .tracing import start_span
+from .profiling import profile_section
+from .trace_store import prompt_fingerprint
 
 class ComposeToJsonConverter(GeminiConverter):
     """
     Compose to JSON converter that inherits from GeminiConverter
+    
+    Other providers are used through a backend created with
+    create_converter; prompting, caching and parsing stay the same.
     """
     
-    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
+    def __init__(self, api_key: str, model_name: str = "",
+                 provider: LLMProvider = LLMProvider.GEMINI, load_examples: bool = True):
         """
         Initialize the converter
         
         Args:
-            api_key: Gemini API key
-            model_name: Gemini model name
+            api_key: API key of the provider
+            model_name: Model name (default of the provider if empty)
+            provider: LLM provider (default Gemini)
+            load_examples: Load the default dataset (off when the examples
+                are shared with share_training_examples())
         """
         # Base prompt
         base_prompt = "You are an expert in converting Jetpack Compose code to JSON."
         
         # Call parent class
-        super().__init__(api_key, model_name, base_prompt)
+        super().__init__(api_key, model_name or "gemini-1.5-flash", base_prompt)
+        
+        # Non-Gemini providers delegate model calls to their converter
+        self.provider = provider
+        self.backend = None
+        if provider != LLMProvider.GEMINI:
+            self.backend = create_converter(provider, api_key, model_name, base_prompt)
+            self.model_name = self.backend.model_name
         
         # Training examples list
         self.training_examples = []
@@ -33,19 +65,104 @@ class ComposeToJsonConverter(GeminiConverter):
         # Number of examples for few-shot
         self.few_shot_count = 5
         
+        # Adaptive few-shot: pick the count per request from input complexity
+        self.adaptive_few_shot = False
+        self.min_few_shot_count = 1
+        self.max_few_shot_count = 8
+        
+        # Examples at the end of the dataset excluded from few-shot retrieval
+        self.held_out_count = 0
+        
+        # Result cache keyed by canonical input
+        self.cache_size = 1000
+        self.result_cache = OrderedDict()
+        self.cache_stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+        self._cache_lock = threading.Lock()
+        
+        # Results of known inputs (e.g. dataset examples), never evicted
+        self.pinned_results = {}
+        
+        # Outputs of inputs that differ only in string/number literals;
+        # set to None to disable
+        self.template_cache = TemplateCache()
+        
+        # Conversions in progress, shared by identical concurrent requests
+        self._in_flight = {}
+        
+        # Optional ConversionScheduler ordering model calls by priority/deadline
+        self.scheduler = None
+        
+        # Outputs are validated and normalized against the SDUI schema;
+        # set to None to return them as parsed
+        self.validator = SchemaValidator()
+        
+        # Failure recovery: targeted repair prompts first, then full retries
+        self.max_repair_attempts = 2
+        self.max_full_retries = 1
+        self.recovery_stats = {
+            'repair_attempts': 0,
+            'repair_successes': 0,
+            'repair_prompt_tokens': 0,
+            'full_retry_attempts': 0,
+            'full_retry_successes': 0,
+            'full_retry_prompt_tokens': 0
+        }
+        
+        # Optional Tenant charged for model calls; its token quota is
+        # checked before each call
+        self.quota = None
+        
+        # Model output format: "json" (SDUI JSON) or "compact" (short
+        # arrays expanded locally, about half the output tokens)
+        self.output_format = "json"
+        
         # Auto-load examples
-        self.load_training_examples()
+        self._example_index = None
+        self._output_token_ratios = {}
+        if load_examples:
+            self.load_training_examples()
+    
+    def _initialize_model(self):
+        """Initialize the model of the configured provider"""
+        if self.backend is None:
+            return super()._initialize_model()
+        self.backend._initialize_model()
+        self.model = self.backend.model
+    
+    def _call_model(self, full_prompt: str, max_output_tokens: Optional[int] = None):
+        """Call the model of the configured provider"""
+        if self.backend is None:
+            return super()._call_model(full_prompt, max_output_tokens)
+        return self.backend._call_model(full_prompt, max_output_tokens)
+    
+    def get_available_models(self) -> list:
+        """Get available models of the configured provider"""
+        if self.backend is None:
+            return super().get_available_models()
+        return self.backend.get_available_models()
     
     def load_training_examples(self, dataset_file: str = "../datasets/compose_sdui_dataset.json"):
         """
         Load training examples from file
         
+        A .jsonl file is opened as a memory-mapped DatasetStore and read
+        lazily; a .json array is loaded into memory.
+        
         Args:
             dataset_file: Dataset file path
         """
+        # Retrieval index is built on first use
+        self._example_index = None
+        self._output_token_ratios = {}
+        
         try:
-            with open(dataset_file, 'r', encoding='utf-8') as f:
-                self.training_examples = json.load(f)
+            if dataset_file.endswith('.jsonl'):
+                if not os.path.exists(dataset_file):
+                    raise FileNotFoundError(dataset_file)
+                self.training_examples = DatasetStore(dataset_file)
+            else:
+                with open(dataset_file, 'r', encoding='utf-8') as f:
+                    self.training_examples = json.load(f)
             
             print(f"✅ {len(self.training_examples)} training examples loaded")
             
@@ -59,6 +176,74 @@ class ComposeToJsonConverter(GeminiConverter):
             print(f"❌ Error loading examples: {e}")
             self.training_examples = []
     
+    def share_training_examples(self, other: 'ComposeToJsonConverter'):
+        """
+        Use the training examples and retrieval index of another converter
+        
+        Converters of one dataset then hold a single copy of it instead of
+        loading and indexing it each.
+        
+        Args:
+            other: Converter whose examples are shared
+        """
+        if other._example_index is None:
+            other._index_training_examples()
+        self.training_examples = other.training_examples
+        self._example_index = other._example_index
+        self._output_token_ratios = other._output_token_ratios
+    
+    def _index_training_examples(self):
+        """
+        Build the retrieval index of the training examples
+        """
+        self._example_index = ExampleIndex(self.training_examples)
+    
+    def choose_few_shot_count(self, input_code: str) -> int:
+        """
+        Choose how many examples to put in the prompt
+        
+        With adaptive few-shot, a single Text gets min_few_shot_count
+        examples and each extra composable, nesting level or modifier adds
+        one, up to max_few_shot_count.
+        
+        Args:
+            input_code: Input code
+            
+        Returns:
+            Number of examples
+        """
+        if not self.adaptive_few_shot:
+            return self.few_shot_count
+        
+        score = score_complexity(input_code)['score']
+        count = self.min_few_shot_count + max(0, score - 1)
+        return max(self.min_few_shot_count, min(count, self.max_few_shot_count))
+    
+    def select_few_shot_examples(self, input_code: str) -> list:
+        """
+        Select the training examples most similar to the input
+        
+        Examples with the same canonical form come first, then examples
+        ranked by identifier overlap; ties keep dataset order. Only
+        examples sharing an identifier with the input are scored (see
+        ExampleIndex).
+        
+        Args:
+            input_code: Input code
+            
+        Returns:
+            List of examples
+        """
+        pool_size = len(self.training_examples) - self.held_out_count
+        if pool_size <= 0:
+            return []
+        
+        if self._example_index is None:
+            self._index_training_examples()
+        
+        ranked = self._example_index.top(input_code, self.choose_few_shot_count(input_code), pool_size)
+        return [self.training_examples[i] for i in ranked]
+    
     def create_few_shot_prompt(self, input_code: str) -> str:
         """
         Create prompt with few-shot examples
@@ -82,19 +267,22 @@ class ComposeToJsonConverter(GeminiConverter):
             ""
         ]
         
+        if self.output_format == "compact":
+            prompt_parts.extend(FORMAT_DESCRIPTION + [""])
+        
         # Add few-shot examples
         if self.training_examples:
             prompt_parts.append("Examples:")
             prompt_parts.append("")
             
             # Select examples
-            examples_to_use = self.training_examples[:self.few_shot_count]
+            examples_to_use = self.select_few_shot_examples(input_code)
             
             for i, example in enumerate(examples_to_use, 1):
                 prompt_parts.extend([
                     f"Example {i}:",
                     f"Input: {example['input']}",
-                    f"Output: {json.dumps(example['output'], ensure_ascii=False)}",
+                    f"Output: {self.render_output(example['output'])}",
                     ""
                 ])
         
@@ -107,70 +295,466 @@ class ComposeToJsonConverter(GeminiConverter):
         
         return "\n".join(prompt_parts)
     
-    def convert_compose_to_json(self, compose_code: str) -> dict:
+    def estimate_output_budget(self, compose_code: str) -> int:
+        """
+        Right-size the output token limit of a conversion
+        
+        The limit follows the input size, using the largest output/input
+        token ratio of the training examples in the current output format
+        with a safety margin, and never exceeds max_output_tokens.
+        
+        Args:
+            compose_code: Jetpack Compose code
+        
+        Returns:
+            Output token limit
+        """
+        ratio = self._output_token_ratios.get(self.output_format)
+        if ratio is None:
+            # A sample is enough; large datasets are read lazily
+            ratios = [
+                estimate_tokens(self.render_output(example['output'])) / max(1, estimate_tokens(example['input']))
+                for example in (self.training_examples[i] for i in range(min(200, len(self.training_examples))))
+            ]
+            ratio = max(ratios) if ratios else 4.0
+            self._output_token_ratios[self.output_format] = ratio
+        
+        return min(self.max_output_tokens, int(estimate_tokens(compose_code) * ratio * 1.5) + 64)
+    
+    def render_output(self, output) -> str:
+        """
+        Render an example output in the model output format
+        
+        Args:
+            output: SDUI JSON
+        
+        Returns:
+            JSON text, compact arrays in compact mode
+        """
+        if self.output_format == "compact":
+            try:
+                return json.dumps(compact_output(output), ensure_ascii=False, separators=(',', ':'))
+            except CompactFormatError:
+                pass
+        return json.dumps(output, ensure_ascii=False)
+    
+    def convert_compose_to_json(self, compose_code: str, priority: Optional[RequestPriority] = None,
+                                deadline: Optional[float] = None) -> dict:
         """
         Convert Compose code to JSON
         
+        Inputs with the same canonical form share cached results, and
+        identical concurrent requests share a single model call.
+        
         Args:
             compose_code: Jetpack Compose code
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline; expired requests
+                fail with error_code "deadline_exceeded" without a model call
             
         Returns:
             Result dictionary
         """
-        print(f"🔄 Converting Compose code: {compose_code}")
+        # Tiers of a cascade run inside the cascade's conversion
+        with conversion_scope() as outermost:
+            result = self._convert_request(compose_code, priority, deadline)
+        if outermost:
+            self.log_request(compose_code, result)
+        return result
+    
+    def _convert_request(self, compose_code: str, priority: Optional[RequestPriority] = None,
+                         deadline: Optional[float] = None) -> dict:
+        """
+        Convert Compose code from the cache, a template or the model
+        
+        Args:
+            compose_code: Jetpack Compose code
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline
+            
+        Returns:
+            Result dictionary
+        """
+        with profile_section(self.profile_session), \
+                start_span("converter.convert", {"provider": self.provider.value, "model": self.model_name}) as span:
+            key = canonical_key(compose_code)
+            
+            cached = self._get_cached_result(key)
+            templated = None
+            if cached is not None:
+                print(f"⚡ Cache hit: {compose_code}")
+                result = {**cached, 'input': compose_code, 'cached': True}
+            else:
+                templated = self._lookup_template(compose_code)
+            
+            if templated is not None:
+                print(f"🧩 Template hit: {compose_code}")
+                self._store_result(key, templated)
+                result = {**templated, 'cached': True}
+            elif cached is None:
+                result = self._convert_coalesced(key, compose_code, priority, deadline)
+            
+            if span.recording:
+                span.set_attributes({
+                    "cache_hit": cached is not None,
+                    "template_hit": templated is not None,
+                    "success": result['success'],
+                    "error_code": result.get('error_code'),
+                    "prompt_tokens": result.get('prompt_tokens'),
+                    "repair_attempts": result.get('repair_attempts'),
+                    "full_retries": result.get('full_retries')
+                })
+        
+        self._count_profiled_request()
+        return result
+    
+    def log_request(self, compose_code: str, result: dict):
+        """
+        Record a conversion request in the request log, if one is attached
+        
+        Unlike model call traces, the log has one record per request,
+        cache and template hits included, so it counts how often each
+        input is asked for (see top_trace_inputs).
         
+        Args:
+            compose_code: Jetpack Compose code
+            result: Result returned for it
+        """
+        if self.request_log is None:
+            return
         try:
-            # Create prompt with examples
-            full_prompt = self.create_few_shot_prompt(compose_code)
+            self.request_log.record({
+                "timestamp": time.time(),
+                "provider": self.provider.value,
+                "model": self.model_name,
+                "input": compose_code,
+                "cached": result.get('cached', False),
+                "success": result['success']
+            })
+        except Exception as e:
+            print(f"❌ Error logging request: {e}")
+    
+    def reconvert(self, compose_code: str, priority: Optional[RequestPriority] = None,
+                  deadline: Optional[float] = None) -> dict:
+        """
+        Convert Compose code with the model, ignoring cached and template results
+        
+        A successful result replaces the cached one, so this corrects
+        entries that were answered from a template.
+        
+        Args:
+            compose_code: Jetpack Compose code
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline
             
-            # Use _call_model from parent class
-            if self.model is None:
-                self._initialize_model()
+        Returns:
+            Result dictionary
+        """
+        return self._convert_coalesced(canonical_key(compose_code), compose_code, priority, deadline)
+    
+    def _convert_coalesced(self, key: str, compose_code: str,
+                           priority: Optional[RequestPriority] = None,
+                           deadline: Optional[float] = None) -> dict:
+        """
+        Convert with a model call shared by identical concurrent requests
+        
+        Args:
+            key: Canonical input key
+            compose_code: Jetpack Compose code
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline
             
-            result = self._call_model(full_prompt)
+        Returns:
+            Result dictionary
+        """
+        with self._cache_lock:
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.cache_stats['coalesced'] += 1
+        
+        if not is_owner:
+            print(f"🔗 Joined in-flight conversion: {compose_code}")
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                shared = future.result(timeout)
+            except FutureTimeoutError:
+                return self._scheduling_error(compose_code, 'deadline_exceeded', 'Deadline exceeded')
+            # The owner's caller gave up, but this request still wants a result
+            if shared.get('error_code') == 'cancelled':
+                return self._convert_coalesced(key, compose_code, priority, deadline)
+            return {**copy.deepcopy(shared), 'input': compose_code, 'cached': True}
+        
+        result = None
+        try:
+            result = self._convert_uncached(compose_code, priority, deadline)
+            if result['success']:
+                self._store_result(key, result)
+                # A template of this shape that no longer holds is dropped
+                if self.template_cache is not None and not self.template_cache.learn(compose_code, result['output']):
+                    self.template_cache.forget(compose_code)
+        finally:
+            with self._cache_lock:
+                self._in_flight.pop(key, None)
+            future.set_result(result or {
+                'success': False,
+                'input': compose_code,
+                'error': 'Conversion aborted'
+            })
+        
+        return result
+    
+    def _lookup_template(self, compose_code: str) -> Optional[dict]:
+        """
+        Answer from the template cache
+        
+        Args:
+            compose_code: Jetpack Compose code
             
-            if result:
-                # Clean response
-                cleaned_result = result.strip()
-                
-                # Remove markdown code blocks if present
-                if cleaned_result.startswith('```json'):
-                    cleaned_result = cleaned_result[7:]  # Remove ```json
-                if cleaned_result.startswith('```'):
-                    cleaned_result = cleaned_result[3:]   # Remove ```
-                if cleaned_result.endswith('```'):
-                    cleaned_result = cleaned_result[:-3]  # Remove ending ```
-                
-                # Final cleanup
-                cleaned_result = cleaned_result.strip()
+        Returns:
+            Result dictionary or None on a miss
+        """
+        if self.template_cache is None:
+            return None
+        
+        output = self.template_cache.lookup(compose_code)
+        if output is None:
+            return None
+        
+        # Substituted literals still have to fit the schema
+        if self.validator is not None:
+            validation = self.validator.validate(output)
+            if not validation['valid']:
+                return None
+            output = validation['output']
+        
+        return {
+            'success': True,
+            'input': compose_code,
+            'output': output,
+            'template_hit': True
+        }
+    
+    def _scheduling_error(self, compose_code: str, error_code: str, error: str) -> dict:
+        """
+        Build the result of a request that was not served
+        
+        Args:
+            compose_code: Jetpack Compose code
+            error_code: "deadline_exceeded", "overloaded", "quota_exceeded" or "cancelled"
+            error: Error message
+            
+        Returns:
+            Result dictionary
+        """
+        print(f"⏱️ {error}: {compose_code}")
+        return {
+            'success': False,
+            'input': compose_code,
+            'error': error,
+            'error_code': error_code
+        }
+    
+    def _get_cached_result(self, key: str):
+        """
+        Get a cached result
+        
+        Args:
+            key: Canonical input key
+            
+        Returns:
+            Copy of the cached result or None
+        """
+        with self._cache_lock:
+            if key in self.pinned_results:
+                self.cache_stats['hits'] += 1
+                return copy.deepcopy(self.pinned_results[key])
+            if key not in self.result_cache:
+                self.cache_stats['misses'] += 1
+                return None
+            self.cache_stats['hits'] += 1
+            self.result_cache.move_to_end(key)
+            return copy.deepcopy(self.result_cache[key])
+    
+    def _store_result(self, key: str, result: dict):
+        """
+        Cache a successful result
+        
+        Args:
+            key: Canonical input key
+            result: Result dictionary
+        """
+        with self._cache_lock:
+            self.result_cache[key] = copy.deepcopy(result)
+            self.result_cache.move_to_end(key)
+            while len(self.result_cache) > self.cache_size:
+                self.result_cache.popitem(last=False)
+    
+    def seed_exact_matches(self, examples=None) -> int:
+        """
+        Pin the outputs of known inputs so they never reach the model
+        
+        Args:
+            examples: Examples with "input" and "output" (the training
+                examples, without held-out ones, if None)
+            
+        Returns:
+            Number of pinned inputs
+        """
+        if examples is None:
+            examples = (self.training_examples[i] for i in range(len(self.training_examples) - self.held_out_count))
+        
+        pinned = {}
+        for example in examples:
+            pinned[canonical_key(example['input'])] = {
+                'success': True,
+                'input': example['input'],
+                'output': example['output']
+            }
+        
+        with self._cache_lock:
+            self.pinned_results.update(pinned)
+        print(f"📌 {len(pinned)} exact-match results pinned")
+        return len(pinned)
+    
+    def cache_fingerprint(self) -> str:
+        """
+        Fingerprint what cached results depend on: provider, model, output
+        format, prompt and the canonical form of cache keys
+        
+        The prompt of a fixed probe input covers the instructions, the
+        few-shot settings and the examples, so changing any of them starts
+        a new cache generation.
+        
+        Returns:
+            Short hex digest
+        """
+        return prompt_fingerprint("\n".join([
+            self.provider.value,
+            self.model_name,
+            self.output_format,
+            str(CANONICAL_FORM_VERSION),
+            self.create_few_shot_prompt('Column { Text("probe") }')
+        ]))
+    
+    def clear_cache(self):
+        """
+        Clear cached results and learned templates
+        
+        Pinned results stay; remove them with unpin_all().
+        """
+        with self._cache_lock:
+            self.result_cache.clear()
+        if self.template_cache is not None:
+            self.template_cache.clear()
+    
+    def unpin_all(self) -> int:
+        """
+        Remove all pinned results
+        
+        Returns:
+            Number of removed results
+        """
+        with self._cache_lock:
+            count = len(self.pinned_results)
+            self.pinned_results.clear()
+        return count
+    
+    def _convert_uncached(self, compose_code: str, priority: Optional[RequestPriority] = None,
+                          deadline: Optional[float] = None) -> dict:
+        """
+        Convert Compose code with a model call
+        
+        A response that is not valid JSON or does not match the schema is
+        sent back with its error in a short repair prompt, up to
+        max_repair_attempts times, before falling back to up to
+        max_full_retries full conversions. Output cut off by the output
+        budget skips the repairs. Repairs and retries get the full
+        max_output_tokens.
+        
+        Args:
+            compose_code: Jetpack Compose code
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline
+            
+        Returns:
+            Result dictionary
+        """
+        print(f"🔄 Converting Compose code: {compose_code}")
+        
+        if deadline is not None and time.monotonic() >= deadline:
+            return self._scheduling_error(compose_code, 'deadline_exceeded', 'Deadline exceeded')
+        
+        try:
+            # Create prompt with examples
+            with start_span("converter.build_prompt") as span:
+                full_prompt = self.create_few_shot_prompt(compose_code)
                 
-                # Try to parse JSON
-                try:
-                    result_json = json.loads(cleaned_result)
-                    print(f"✅ Conversion successful!")
-                    return {
-                        'success': True,
-                        'input': compose_code,
-                        'output': result_json,
-                        'raw_response': cleaned_result
-                    }
-                except json.JSONDecodeError:
-                    # If JSON is invalid
-                    print(f"❌ Invalid JSON")
-                    return {
-                        'success': False,
-                        'input': compose_code,
-                        'error': 'Response is not valid JSON',
-                        'raw_response': cleaned_result
-                    }
-            else:
-                print(f"❌ Conversion error")
-                return {
-                    'success': False,
-                    'input': compose_code,
-                    'error': 'Error calling model'
+                prompt_info = {
+                    'prompt_tokens': estimate_tokens(full_prompt),
+                    'few_shot_count': self.choose_few_shot_count(compose_code),
+                    'max_output_tokens': self.estimate_output_budget(compose_code),
+                    'repair_attempts': 0,
+                    'full_retries': 0
                 }
+                span.set_attributes(prompt_info)
+            budget = prompt_info['max_output_tokens']
+            
+            start = time.perf_counter()
+            response, failure = self._call_model_scheduled(full_prompt, compose_code, priority, deadline, budget)
+            if failure is not None:
+                return failure
+            parsed = self._parse_response(compose_code, response)
+            # Output cut off by the budget: a repair would be cut off too,
+            # so go straight to a full retry with the full limit
+            truncated = not parsed['success'] and is_truncated_json(response)
+            
+            # Targeted repair: the broken output and its error, no examples
+            while (not parsed['success'] and 'raw_response' in parsed and not truncated
+                   and prompt_info['repair_attempts'] < self.max_repair_attempts):
+                prompt_info['repair_attempts'] += 1
+                repair_prompt = self.create_repair_prompt(
+                    compose_code,
+                    parsed.get('expanded_output', parsed['raw_response']),
+                    parsed['error'],
+                    expanded='expanded_output' in parsed
+                )
+                print(f"🔧 Repair attempt {prompt_info['repair_attempts']}: {parsed['error'].splitlines()[0]}")
+                
+                # The whole output is written again, with the full limit
+                response, failure = self._call_model_scheduled(
+                    repair_prompt, compose_code, priority, deadline, self.max_output_tokens
+                )
+                if failure is not None:
+                    return failure
+                parsed = self._parse_response(compose_code, response)
+                self._count_recovery('repair', parsed['success'], estimate_tokens(repair_prompt))
+            
+            # Last resort: the full few-shot prompt again
+            while not parsed['success'] and prompt_info['full_retries'] < self.max_full_retries:
+                prompt_info['full_retries'] += 1
+                print(f"🔁 Full retry {prompt_info['full_retries']}")
                 
+                # Full output token limit, in case the budget cut the output short
+                response, failure = self._call_model_scheduled(
+                    full_prompt, compose_code, priority, deadline, self.max_output_tokens
+                )
+                if failure is not None:
+                    return failure
+                parsed = self._parse_response(compose_code, response)
+                self._count_recovery('full_retry', parsed['success'], prompt_info['prompt_tokens'])
+            
+            prompt_info['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            
+            if parsed['success']:
+                print(f"✅ Conversion successful!")
+            return {**parsed, **prompt_info}
+        
+        except ConversionCancelled:
+            return self._scheduling_error(compose_code, 'cancelled', 'Conversion cancelled')
         except Exception as e:
             print(f"❌ Unexpected error: {e}")
             return {
@@ -179,6 +763,232 @@ class ComposeToJsonConverter(GeminiConverter):
                 'error': str(e)
             }
     
+    def _call_model_scheduled(self, prompt: str, compose_code: str,
+                              priority: Optional[RequestPriority] = None,
+                              deadline: Optional[float] = None,
+                              max_output_tokens: Optional[int] = None):
+        """
+        Call the model through the scheduler and the tenant quota
+        
+        Args:
+            prompt: Complete prompt
+            compose_code: Jetpack Compose code, for traces and errors
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline
+            max_output_tokens: Output token limit of the call
+            
+        Returns:
+            (response, None) or (None, error result) if the call was not made
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = max_output_tokens or self.max_output_tokens
+        
+        # Reserve the call's tokens up front, so concurrent calls cannot
+        # overshoot the tenant's quota together
+        quota = self.quota
+        if quota is not None:
+            try:
+                quota.check_tokens(prompt_tokens, output_tokens)
+            except QuotaExceeded as e:
+                return None, self._scheduling_error(compose_code, 'quota_exceeded', str(e))
+        
+        # Use _invoke_model from parent class
+        self.ensure_model()
+        
+        failure = None
+        try:
+            # Covers the scheduler queue; the provider call is a child span
+            with start_span("converter.model_call", {"priority": (priority or RequestPriority.DEFAULT).name.lower()}) as span:
+                if self.scheduler is not None:
+                    try:
+                        response = self.scheduler.run(
+                            self._invoke_model, prompt, compose_code, max_output_tokens,
+                            priority=priority or RequestPriority.DEFAULT,
+                            deadline=deadline
+                        )
+                    except DeadlineExceeded:
+                        span.set_attribute("error_code", "deadline_exceeded")
+                        failure = self._scheduling_error(compose_code, 'deadline_exceeded', 'Deadline exceeded')
+                    except SchedulerOverloaded:
+                        span.set_attribute("error_code", "overloaded")
+                        failure = self._scheduling_error(compose_code, 'overloaded', 'Too many queued conversions')
+                else:
+                    response = self._invoke_model(prompt, compose_code, max_output_tokens)
+        except BaseException:
+            if quota is not None:
+                quota.release_tokens(prompt_tokens, output_tokens)
+            raise
+        
+        if failure is not None:
+            if quota is not None:
+                quota.release_tokens(prompt_tokens, output_tokens)
+            return None, failure
+        
+        if quota is not None:
+            quota.record_call(prompt_tokens, response, output_tokens)
+        
+        return response, None
+    
+    def _parse_response(self, compose_code: str, response: Optional[str]) -> dict:
+        """
+        Parse, validate and normalize a model response
+        
+        Args:
+            compose_code: Jetpack Compose code
+            response: Model response or None
+            
+        Returns:
+            Result dictionary; failures carry raw_response when the model
+            answered, so they can be repaired
+        """
+        if not response:
+            print(f"❌ Conversion error")
+            return {
+                'success': False,
+                'input': compose_code,
+                'error': 'Error calling model'
+            }
+        
+        # Clean response
+        cleaned_result = response.strip()
+        
+        # Remove markdown code blocks if present
+        if cleaned_result.startswith('```json'):
+            cleaned_result = cleaned_result[7:]  # Remove ```json
+        if cleaned_result.startswith('```'):
+            cleaned_result = cleaned_result[3:]   # Remove ```
+        if cleaned_result.endswith('```'):
+            cleaned_result = cleaned_result[:-3]  # Remove ending ```
+        
+        # Final cleanup
+        cleaned_result = cleaned_result.strip()
+        
+        # Try to parse JSON
+        try:
+            result_json = json.loads(cleaned_result)
+        except json.JSONDecodeError as e:
+            # If JSON is invalid
+            print(f"❌ Invalid JSON")
+            return {
+                'success': False,
+                'input': compose_code,
+                'error': f'Response is not valid JSON: {e}',
+                'raw_response': cleaned_result
+            }
+        
+        if self.output_format == "compact":
+            try:
+                result_json = expand_output(result_json)
+            except CompactFormatError as e:
+                print(f"❌ Invalid compact output")
+                return {
+                    'success': False,
+                    'input': compose_code,
+                    'error': f'Response is not valid compact output: {e}',
+                    'raw_response': cleaned_result
+                }
+        
+        if self.validator is not None:
+            validation = self.validator.validate(result_json)
+            if not validation['valid']:
+                print(f"❌ Output does not match the SDUI schema")
+                failure = {
+                    'success': False,
+                    'input': compose_code,
+                    'error': 'Output does not match the SDUI schema:\n' + format_errors(validation['errors']),
+                    'validation_errors': validation['errors'],
+                    'raw_response': cleaned_result
+                }
+                if self.output_format == "compact":
+                    # The errors point into the expanded JSON, not the compact response
+                    failure['expanded_output'] = json.dumps(result_json, ensure_ascii=False)
+                return failure
+            result_json = validation['output']
+        
+        return {
+            'success': True,
+            'input': compose_code,
+            'output': result_json,
+            'raw_response': cleaned_result
+        }
+    
+    def create_repair_prompt(self, compose_code: str, broken_output: str, error: str,
+                             expanded: bool = False) -> str:
+        """
+        Create a prompt asking the model to fix its own output
+        
+        Much shorter than the conversion prompt: no few-shot examples,
+        only the input, the broken output and what is wrong with it.
+        
+        Args:
+            compose_code: Jetpack Compose code
+            broken_output: Output that failed
+            error: Parse or validation error
+            expanded: broken_output is compact output expanded to SDUI
+                JSON, which the schema errors point into; the answer is
+                still asked for in the compact format
+            
+        Returns:
+            Repair prompt
+        """
+        output_format = FORMAT_DESCRIPTION + [""] if self.output_format == "compact" else []
+        if expanded:
+            instructions = [
+                "The output below was converted from Jetpack Compose code and expanded to SDUI JSON, but it is invalid.",
+                "Fix only the reported problems and return only the corrected output in the compact format."
+            ]
+        else:
+            instructions = [
+                "The JSON below was converted from Jetpack Compose code but is invalid.",
+                "Fix only the reported problems and return only the corrected JSON."
+            ]
+        return "\n".join([
+            *instructions,
+            "",
+            *output_format,
+            f"Input: {compose_code}",
+            f"Output: {broken_output}",
+            f"Errors:",
+            error,
+            "",
+            "Corrected output:"
+        ])
+    
+    def _count_recovery(self, kind: str, success: bool, prompt_tokens: int):
+        """
+        Update failure recovery statistics
+        
+        Args:
+            kind: "repair" or "full_retry"
+            success: The attempt produced a valid output
+            prompt_tokens: Estimated prompt tokens of the attempt
+        """
+        with self._cache_lock:
+            self.recovery_stats[f'{kind}_attempts'] += 1
+            self.recovery_stats[f'{kind}_successes'] += int(success)
+            self.recovery_stats[f'{kind}_prompt_tokens'] += prompt_tokens
+    
+    def get_recovery_stats(self) -> dict:
+        """
+        Compare repair prompts with full retries
+        
+        Returns:
+            Attempts, success rate and average prompt tokens of each
+        """
+        with self._cache_lock:
+            stats = dict(self.recovery_stats)
+        
+        summary = {}
+        for kind in ('repair', 'full_retry'):
+            attempts = stats[f'{kind}_attempts']
+            summary[kind] = {
+                'attempts': attempts,
+                'successes': stats[f'{kind}_successes'],
+                'success_rate': stats[f'{kind}_successes'] / attempts if attempts else None,
+                'avg_prompt_tokens': stats[f'{kind}_prompt_tokens'] / attempts if attempts else None
+            }
+        return summary
+    
     def test_on_examples(self, count: int = 3):
         """
         Test on examples from dataset
@@ -199,9 +1009,35 @@ class ComposeToJsonConverter(GeminiConverter):
         
         print(f"🧪 Testing on {len(test_examples)} examples...")
         
+        # Keep test examples out of few-shot retrieval
+        self.held_out_count = len(test_examples)
+        
+        try:
+            results = self._run_test_examples(test_examples)
+        finally:
+            self.held_out_count = 0
+        
+        return results
+    
+    def _run_test_examples(self, test_examples: list) -> list:
+        """
+        Convert test examples and compare with expected output
+        
+        Every example is converted with the model: cached, pinned and
+        template results (which may hold the expected output itself) are
+        bypassed, and the caches are left as they were.
+        
+        Args:
+            test_examples: Examples to test
+            
+        Returns:
+            List of results
+        """
+        results = []
+        
         for i, example in enumerate(test_examples, 1):
             print(f"\n--- Test {i} ---")
-            result = self.convert_compose_to_json(example['input'])
+            result = self._convert_uncached(example['input'])
             
             if result['success']:
                 # Compare with expected result
@@ -223,6 +1059,84 @@ class ComposeToJsonConverter(GeminiConverter):
         
         return results
     
+    def evaluate_few_shot_strategies(self, count: int = 5) -> dict:
+        """
+        Compare fixed and adaptive few-shot counts on held-out examples
+        
+        Every example reaches the model; the caches are bypassed, not
+        cleared.
+        
+        Args:
+            count: Number of test examples
+            
+        Returns:
+            Accuracy, average prompt tokens and latency per strategy
+        """
+        previous = self.adaptive_few_shot
+        summary = {}
+        
+        try:
+            for name, adaptive in (("fixed", False), ("adaptive", True)):
+                self.adaptive_few_shot = adaptive
+                results = self.test_on_examples(count)
+                measured = [r for r in results if 'prompt_tokens' in r]
+                summary[name] = {
+                    "total": len(results),
+                    "correct": sum(1 for r in results if r.get('is_correct', False)),
+                    "avg_few_shot_count": sum(r['few_shot_count'] for r in measured) / len(measured) if measured else None,
+                    "avg_prompt_tokens": sum(r['prompt_tokens'] for r in measured) / len(measured) if measured else None,
+                    "avg_latency_ms": sum(r['latency_ms'] for r in measured) / len(measured) if measured else None
+                }
+        finally:
+            self.adaptive_few_shot = previous
+        
+        print(f"\n📈 Few-shot strategies:")
+        for name, stats in summary.items():
+            print(f"   {name}: {stats}")
+        
+        return summary
+    
+    def evaluate_output_formats(self, count: int = 5) -> dict:
+        """
+        Compare the JSON and compact output formats on held-out examples
+        
+        Every example reaches the model; the caches are bypassed, not
+        cleared.
+        
+        Args:
+            count: Number of test examples
+        
+        Returns:
+            Accuracy, average output tokens and latency per format
+        """
+        previous = self.output_format
+        summary = {}
+        
+        try:
+            for output_format in ("json", "compact"):
+                self.output_format = output_format
+                results = self.test_on_examples(count)
+                measured = [r for r in results if 'latency_ms' in r]
+                responses = [r for r in results if 'raw_response' in r]
+                summary[output_format] = {
+                    "total": len(results),
+                    "correct": sum(1 for r in results if r.get('is_correct', False)),
+                    "avg_prompt_tokens": sum(r['prompt_tokens'] for r in measured) / len(measured) if measured else None,
+                    "avg_output_tokens": (
+                        sum(estimate_tokens(r['raw_response']) for r in responses) / len(responses)
+                        if responses else None
+                    ),
+                    "avg_latency_ms": sum(r['latency_ms'] for r in measured) / len(measured) if measured else None
+                }
+        finally:
+            self.output_format = previous
+        
+        print(f"\n📈 Output formats:")
+        for name, stats in summary.items():
+            print(f"   {name}: {stats}")
+        
+        return summary
+    
     def get_training_info(self) -> dict:
         """
         Get training information
@@ -236,7 +1150,14 @@ class ComposeToJsonConverter(GeminiConverter):
             **base_info,
             "training_examples_count": len(self.training_examples),
             "few_shot_count": self.few_shot_count,
+            "adaptive_few_shot": self.adaptive_few_shot,
+            "output_format": self.output_format,
             "training_loaded": len(self.training_examples) > 0,
+            "cache_entries": len(self.result_cache),
+            "pinned_results": len(self.pinned_results),
+            "cache_stats": dict(self.cache_stats),
+            "recovery": self.get_recovery_stats(),
+            "template_cache": self.template_cache.get_stats() if self.template_cache is not None else None,
             "class_name": "ComposeToJsonConverter"
         }
     
@@ -252,6 +1173,33 @@ class ComposeToJsonConverter(GeminiConverter):
         else:
             self.few_shot_count = count
         print(f"✅ Few-shot examples count: {self.few_shot_count}")
+    
+    def set_adaptive_few_shot(self, enabled: bool, min_count: int = 1, max_count: int = 8):
+        """
+        Enable or disable per-request few-shot counts
+        
+        Args:
+            enabled: Choose the count from input complexity
+            min_count: Examples for the simplest inputs
+            max_count: Examples for the most complex inputs
+        """
+        self.adaptive_few_shot = enabled
+        self.min_few_shot_count = max(0, min_count)
+        self.max_few_shot_count = max(self.min_few_shot_count, max_count)
+        state = "enabled" if enabled else "disabled"
+        print(f"✅ Adaptive few-shot {state} ({self.min_few_shot_count}-{self.max_few_shot_count} examples)")
+    
+    def set_output_format(self, output_format: str):
+        """
+        Set the model output format
+        
+        Args:
+            output_format: "json" or "compact"
+        """
+        if output_format not in ("json", "compact"):
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.output_format = output_format
+        print(f"✅ Output format: {output_format}")
 
 # Example usage
 if __name__ == "__main__":
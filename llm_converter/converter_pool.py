@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Registry of converters keyed by provider, model, API key and few-shot config
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .compose_to_json_converter import ComposeToJsonConverter
+from .llm_base_converter import LLMProvider
+from .warmup import load_cache_snapshot
+
+class ConverterPool:
+    """
+    Hand out one shared ComposeToJsonConverter per configuration
+
+    Converters are keyed by (provider, model, API key, few-shot config,
+    namespace) and created on first use. The namespace (e.g. a tenant)
+    keeps result caches of otherwise identical configurations apart.
+    Each has its own SDK client, result cache and in-flight table, and
+    is safe to call from many threads. All converters share the pool's
+    scheduler, so the model concurrency limit is process-wide. The least
+    recently used converter is dropped when more than max_converters
+    exist.
+
+    New converters are built outside the pool lock and share the
+    training examples and retrieval index of the first one, so a miss
+    neither reloads the dataset nor blocks lookups of other configurations.
+    """
+
+    def __init__(self, scheduler=None, trace_store=None, max_converters: int = 32,
+                 output_format: str = "json", snapshot_dir: str = None, request_log=None,
+                 dataset_file: str = None):
+        """
+        Initialize the pool
+
+        Args:
+            scheduler: ConversionScheduler shared by all converters
+            trace_store: TraceStore shared by all converters
+            max_converters: Maximum converters kept
+            output_format: Model output format of new converters, "json" or "compact"
+            snapshot_dir: Directory of cache snapshots (see warm_cache) loaded
+                into new converters of the matching cache generation
+            request_log: TraceStore logging the requests of all converters
+            dataset_file: Training examples of the first converter, shared
+                by the others (the converter's default dataset if None)
+        """
+        self.scheduler = scheduler
+        self.trace_store = trace_store
+        self.max_converters = max_converters
+        self.output_format = output_format
+        self.snapshot_dir = snapshot_dir
+        self.request_log = request_log
+        self.dataset_file = dataset_file
+        self.converters = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'created': 0, 'reused': 0, 'evicted': 0}
+        # Converter whose training examples new converters share
+        self.examples_source = None
+
+    @staticmethod
+    def make_key(api_key: str, model_name: str = "", provider: LLMProvider = LLMProvider.GEMINI,
+                 few_shot_count: int = 5, adaptive_few_shot: bool = False, namespace: str = "") -> tuple:
+        """
+        Build the registry key of a configuration
+
+        The API key is hashed so it never appears in stats or logs.
+
+        Args:
+            api_key: API key of the provider
+            model_name: Model name
+            provider: LLM provider
+            few_shot_count: Examples per prompt
+            adaptive_few_shot: Choose the example count per request
+            namespace: Cache namespace
+
+        Returns:
+            Hashable key
+        """
+        key_hash = hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:16]
+        return (provider.value, model_name, key_hash, few_shot_count, adaptive_few_shot, namespace)
+
+    def get(self, api_key: str, model_name: str = "", provider: LLMProvider = LLMProvider.GEMINI,
+            few_shot_count: int = 5, adaptive_few_shot: bool = False,
+            namespace: str = "", quota=None) -> ComposeToJsonConverter:
+        """
+        Get the converter of a configuration, creating it if needed
+
+        Args:
+            api_key: API key of the provider
+            model_name: Model name (default of the provider if empty)
+            provider: LLM provider
+            few_shot_count: Examples per prompt
+            adaptive_few_shot: Choose the example count per request
+            namespace: Cache namespace
+            quota: Tenant charged for the model calls of a new converter;
+                a namespace belongs to one tenant, so it is set only once
+
+        Returns:
+            Shared converter
+        """
+        key = self.make_key(api_key, model_name, provider, few_shot_count, adaptive_few_shot, namespace)
+
+        with self.lock:
+            converter = self.converters.get(key)
+            if converter is not None:
+                self.converters.move_to_end(key)
+                self.stats['reused'] += 1
+                return converter
+            examples_source = self.examples_source
+
+        # Built without the lock: loading a snapshot and fingerprinting the
+        # prompt take a while. The SDK client is built on the first call.
+        converter = ComposeToJsonConverter(api_key, model_name, provider, load_examples=False)
+        if examples_source is not None:
+            converter.share_training_examples(examples_source)
+        elif self.dataset_file:
+            converter.load_training_examples(self.dataset_file)
+        else:
+            converter.load_training_examples()
+        if few_shot_count != converter.few_shot_count:
+            converter.set_few_shot_count(few_shot_count)
+        if adaptive_few_shot:
+            converter.set_adaptive_few_shot(True)
+        if self.output_format != converter.output_format:
+            converter.set_output_format(self.output_format)
+        converter.scheduler = self.scheduler
+        converter.trace_store = self.trace_store
+        converter.request_log = self.request_log
+        converter.quota = quota
+        if self.snapshot_dir:
+            # Traffic results stay out of other namespaces' caches;
+            # pinned dataset results are shared
+            load_cache_snapshot(converter, self.snapshot_dir, include_results=not namespace)
+
+        with self.lock:
+            existing = self.converters.get(key)
+            if existing is not None:
+                # Another thread built the same configuration first
+                self.converters.move_to_end(key)
+                self.stats['reused'] += 1
+                return existing
+
+            if self.examples_source is None:
+                self.examples_source = converter
+            self.converters[key] = converter
+            self.stats['created'] += 1
+            while len(self.converters) > self.max_converters:
+                self.converters.popitem(last=False)
+                self.stats['evicted'] += 1
+
+        return converter
+
+    def get_stats(self) -> dict:
+        """
+        Get pool statistics
+
+        Returns:
+            Counters and the configurations currently pooled
+        """
+        with self.lock:
+            return {
+                **self.stats,
+                'size': len(self.converters),
+                'converters': [
+                    {
+                        'provider': provider,
+                        'model': converter.model_name,
+                        'few_shot_count': few_shot_count,
+                        'adaptive_few_shot': adaptive,
+                        'namespace': namespace,
+                        'model_initialized': converter.model is not None
+                    }
+                    for (provider, _, _, few_shot_count, adaptive, namespace), converter in self.converters.items()
+                ]
+            }
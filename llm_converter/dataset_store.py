@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Indexed, memory-mapped JSONL dataset store
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Sequence
+from typing import Iterator
+
+# Index file: magic, data file size, modification time (ns) and a hash of
+# its first and last bytes, then one uint64 offset per record
+_INDEX_MAGIC = b'CSDIDX02'
+_HEADER = struct.Struct('<8sQQ8s')
+_SAMPLE_SIZE = 65536
+
+def _data_signature(path: str) -> tuple:
+    """
+    Identify the content of a data file cheaply
+
+    Size and mtime catch most edits; the hash of the first and last
+    64 KiB catches rewrites of the same size that keep the mtime (e.g.
+    copies preserving timestamps).
+
+    Args:
+        path: Data file
+
+    Returns:
+        (size, mtime_ns, sample_hash)
+    """
+    stat = os.stat(path)
+    sample = hashlib.sha256()
+    with open(path, 'rb') as f:
+        sample.update(f.read(_SAMPLE_SIZE))
+        if stat.st_size > _SAMPLE_SIZE:
+            f.seek(max(_SAMPLE_SIZE, stat.st_size - _SAMPLE_SIZE))
+            sample.update(f.read(_SAMPLE_SIZE))
+    return stat.st_size, stat.st_mtime_ns, sample.digest()[:8]
+
+class DatasetStore(Sequence):
+    """
+    Read-only dataset of {"input", "output"} pairs stored as JSONL
+
+    A binary index of line offsets sits next to the data file
+    (dataset.jsonl.idx). Both files are memory-mapped on first access,
+    so startup is instant, records are parsed only when used, and worker
+    processes share the same pages. A record's id is its position.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store
+
+        Args:
+            path: JSONL dataset file
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self._data = None
+        self._index = None
+        self._count = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_index(path: str) -> int:
+        """
+        Write the offset index of a JSONL file
+
+        Args:
+            path: JSONL dataset file
+
+        Returns:
+            Number of records
+        """
+        count = 0
+        size, mtime_ns, sample_hash = _data_signature(path)
+        index_path = path + '.idx'
+
+        with open(path, 'rb') as data, open(index_path + '.tmp', 'wb') as index:
+            index.write(_HEADER.pack(_INDEX_MAGIC, size, mtime_ns, sample_hash))
+            offset = 0
+            for line in data:
+                if line.strip():
+                    index.write(struct.pack('<Q', offset))
+                    count += 1
+                offset += len(line)
+
+        os.replace(index_path + '.tmp', index_path)
+        return count
+
+    def _index_is_current(self) -> bool:
+        """
+        Check the index matches the data file
+
+        Returns:
+            True if the index exists and was built for the current size,
+            modification time and content sample of the data file
+        """
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, 'rb') as f:
+            header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return False
+        magic, size, mtime_ns, sample_hash = _HEADER.unpack(header)
+        return magic == _INDEX_MAGIC and (size, mtime_ns, sample_hash) == _data_signature(self.path)
+
+    def _open(self):
+        """
+        Memory-map data and index, rebuilding a stale index
+        """
+        with self._lock:
+            if self._count is not None:
+                return
+
+            if not self._index_is_current():
+                self.build_index(self.path)
+
+            with open(self.path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.path) else b''
+            with open(self.index_path, 'rb') as f:
+                self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._count = (len(self._index) - _HEADER.size) // 8
+
+    def __len__(self) -> int:
+        self._open()
+        return self._count
+
+    def _read(self, position: int) -> dict:
+        """
+        Parse the record at a position
+
+        Args:
+            position: Record position
+
+        Returns:
+            Parsed record
+        """
+        start = struct.unpack_from('<Q', self._index, _HEADER.size + 8 * position)[0]
+        end = self._data.find(b'\n', start)
+        if end == -1:
+            end = len(self._data)
+        return json.loads(self._data[start:end])
+
+    def __getitem__(self, key):
+        self._open()
+        if isinstance(key, slice):
+            return [self._read(i) for i in range(*key.indices(self._count))]
+        if key < 0:
+            key += self._count
+        if not 0 <= key < self._count:
+            raise IndexError("dataset index out of range")
+        return self._read(key)
+
+    def __iter__(self) -> Iterator[dict]:
+        self._open()
+        for position in range(self._count):
+            yield self._read(position)
+
+    def get(self, example_id: int) -> dict:
+        """
+        Get a record by id
+
+        Args:
+            example_id: Record id (position)
+
+        Returns:
+            Record dictionary
+        """
+        return self[example_id]
+
+    def close(self):
+        """
+        Release the memory maps
+        """
+        with self._lock:
+            if self._count is not None:
+                self._index.close()
+                if isinstance(self._data, mmap.mmap):
+                    self._data.close()
+            self._data = None
+            self._index = None
+            self._count = None
+
+def convert_json_dataset(json_path: str, jsonl_path: str) -> int:
+    """
+    Convert a JSON array dataset into an indexed JSONL store
+
+    Args:
+        json_path: Dataset as a JSON array
+        jsonl_path: Output JSONL file
+
+    Returns:
+        Number of records written
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        examples = json.load(f)
+
+    with open(jsonl_path, 'w', encoding='utf-8') as f:
+        for example in examples:
+            f.write(json.dumps(example, ensure_ascii=False) + "\n")
+
+    return DatasetStore.build_index(jsonl_path)
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python -m llm_converter.dataset_store dataset.json dataset.jsonl")
+        sys.exit(1)
+
+    count = convert_json_dataset(sys.argv[1], sys.argv[2])
+    print(f"✅ {count} examples written to {sys.argv[2]}")
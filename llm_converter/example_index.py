@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Inverted index of training examples for few-shot retrieval
+"""
+
+import heapq
+from array import array
+from collections import defaultdict
+
+from .canonicalizer import canonical_key, identifier_set
+
+class ExampleIndex:
+    """
+    Find the training examples most similar to an input
+
+    Built once per dataset: identifier -> ids of the examples using it,
+    canonical key -> ids of the examples with that form, and the number
+    of identifiers of each example. Ids are positions in the dataset and
+    are kept in compact arrays, so no per-example sets or keys stay in
+    memory. A query scores only the examples sharing an identifier with
+    the input, and keeps the best with a bounded heap.
+    """
+
+    def __init__(self, examples):
+        """
+        Index a dataset
+
+        Args:
+            examples: Sequence of {"input", "output"} examples (a list or DatasetStore)
+        """
+        postings = defaultdict(lambda: array('I'))
+        keys = defaultdict(lambda: array('I'))
+        sizes = array('I')
+        for i, example in enumerate(examples):
+            identifiers = identifier_set(example['input'])
+            for identifier in identifiers:
+                postings[identifier].append(i)
+            keys[canonical_key(example['input'])].append(i)
+            sizes.append(len(identifiers))
+
+        self.postings = dict(postings)
+        self.keys = dict(keys)
+        self.sizes = sizes
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def top(self, input_code: str, count: int, pool_size: int = None) -> list:
+        """
+        Rank examples by similarity to an input
+
+        Examples with the same canonical form come first, then examples
+        ranked by identifier overlap (Jaccard similarity); ties keep
+        dataset order. Examples sharing nothing fill the remaining places
+        in dataset order.
+
+        Args:
+            input_code: Input code
+            count: Number of examples
+            pool_size: Only consider the first pool_size examples
+
+        Returns:
+            Ids of the best examples, best first
+        """
+        pool_size = len(self.sizes) if pool_size is None else min(pool_size, len(self.sizes))
+        if count <= 0 or pool_size <= 0:
+            return []
+
+        features = identifier_set(input_code)
+        shared = defaultdict(int)
+        for identifier in features:
+            for i in self.postings.get(identifier, ()):
+                if i >= pool_size:
+                    # Ids are ascending; the rest are held out
+                    break
+                shared[i] += 1
+        exact = {i for i in self.keys.get(canonical_key(input_code), ()) if i < pool_size}
+        for i in exact:
+            shared.setdefault(i, 0)
+
+        def score(i):
+            overlap = shared[i]
+            union = len(features) + self.sizes[i] - overlap
+            return (i in exact, overlap / union if union else 0.0, -i)
+
+        ranked = heapq.nlargest(count, shared, key=score)
+        if len(ranked) < count:
+            for i in range(pool_size):
+                if i not in shared:
+                    ranked.append(i)
+                    if len(ranked) == count:
+                        break
+        return ranked
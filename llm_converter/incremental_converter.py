@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Incremental re-conversion for editor and live-preview use
+"""
+
+from .json_patch import make_patch
+from .subtree_memoizer import SubtreeMemoizer
+
+class IncrementalConverter:
+    """
+    Re-convert only the subtrees that changed between two inputs
+
+    The previous input/output pair is decomposed into cached fragments of
+    a private memoizer, so client-supplied output never enters the shared
+    cache. Changed subtrees go through the shared memoizer.
+    """
+
+    def __init__(self, memoizer: SubtreeMemoizer):
+        """
+        Initialize the incremental converter
+
+        Args:
+            memoizer: Shared SubtreeMemoizer used for changed subtrees
+        """
+        self.memoizer = memoizer
+
+    def reconvert(self, previous_input: str, previous_output, compose_code: str) -> dict:
+        """
+        Convert new input against a previous conversion
+
+        Args:
+            previous_input: Compose code of the previous conversion
+            previous_output: JSON returned for previous_input
+            compose_code: New Compose code
+
+        Returns:
+            Result dictionary with full output and a JSON Patch (RFC 6902)
+            against previous_output
+        """
+        session = SubtreeMemoizer(self.memoizer.converter, convert_fn=self.memoizer.convert)
+        session.seed(previous_input, previous_output)
+
+        result = session.convert(compose_code)
+        if not result['success']:
+            return result
+
+        patch = make_patch(previous_output, result['output'])
+        print(f"✅ Incremental conversion: {len(patch)} patch operations")
+        return {
+            **result,
+            'patch': patch
+        }
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Background bulk conversion jobs persisted in SQLite
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    owner TEXT NOT NULL DEFAULT '',
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    input TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    output TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, position)
+);
+CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status);
+"""
+
+class JobManager:
+    """
+    Run bulk conversions in the background with state in SQLite
+
+    Each input is a row in job_items. Worker threads claim pending rows
+    round-robin across owners: the owner served least recently gets the
+    next item, from its oldest job, so one tenant's large job does not
+    hold up everyone else's. A restart resumes where it stopped: rows
+    left 'running' by a crash are reset to 'pending' on startup.
+    """
+
+    def __init__(self, db_path: str, convert_fn, max_workers: int = 4):
+        """
+        Initialize the job manager
+
+        Args:
+            db_path: SQLite database file
+            convert_fn: Function taking Compose code and the job owner
+                and returning a result dictionary
+            max_workers: Items converted concurrently
+        """
+        self.db_path = db_path
+        self.convert_fn = convert_fn
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.work_available = threading.Condition(self.lock)
+        self._stopping = False
+        self._workers = []
+        # Owner -> claim number of its last claimed item, for round-robin
+        self._served = {}
+        self._claims = 0
+
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+        # Databases created before jobs had owners
+        columns = [row['name'] for row in self.db.execute("PRAGMA table_info(jobs)")]
+        if 'owner' not in columns:
+            self.db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        self.db.commit()
+
+    def start(self):
+        """
+        Resume unfinished jobs and start the workers
+        """
+        with self.lock:
+            # Items of cancelled jobs stay pending but are never claimed,
+            # so they are not counted
+            resumed = self.db.execute(
+                "UPDATE job_items SET status = 'pending' WHERE status = 'running' "
+                "AND job_id IN (SELECT id FROM jobs WHERE status IN ('queued', 'running'))"
+            ).rowcount
+            self.db.execute("UPDATE job_items SET status = 'pending' WHERE status = 'running'")
+            self.db.commit()
+            pending = self.db.execute(
+                "SELECT COUNT(*) FROM job_items i JOIN jobs j ON j.id = i.job_id "
+                "WHERE i.status = 'pending' AND j.status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+            self._stopping = False
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f"job-worker-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+        if pending:
+            print(f"🔁 Resuming {pending} pending job items ({resumed} interrupted)")
+
+    def stop(self):
+        """
+        Stop workers after their current item
+        """
+        with self.lock:
+            self._stopping = True
+            self.work_available.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def submit(self, inputs: list, owner: str = "") -> str:
+        """
+        Create a job
+
+        Args:
+            inputs: List of Compose code snippets
+            owner: Tenant that submitted the job
+
+        Returns:
+            Job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO jobs (id, status, owner, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, 'queued' if inputs else 'completed', owner, len(inputs), now, now)
+            )
+            self.db.executemany(
+                "INSERT INTO job_items (job_id, position, input) VALUES (?, ?, ?)",
+                [(job_id, position, code) for position, code in enumerate(inputs)]
+            )
+            self.db.commit()
+            self.work_available.notify_all()
+
+        print(f"✅ Job {job_id} submitted with {len(inputs)} items")
+        return job_id
+
+    def _claim(self):
+        """
+        Claim the next pending item, waiting until one is available
+
+        Returns:
+            (job_id, owner, position, input) or None when stopping
+        """
+        with self.lock:
+            while not self._stopping:
+                owners = self.db.execute(
+                    "SELECT j.owner, MIN(j.created_at) AS first_created FROM jobs j "
+                    "WHERE j.status IN ('queued', 'running') AND EXISTS ("
+                    "SELECT 1 FROM job_items i WHERE i.job_id = j.id AND i.status = 'pending') "
+                    "GROUP BY j.owner"
+                ).fetchall()
+
+                row = None
+                if owners:
+                    # Owners never served first, then least recently served;
+                    # ties go to the owner with the oldest job
+                    owner = min(owners, key=lambda o: (self._served.get(o['owner'], 0), o['first_created']))['owner']
+                    row = self.db.execute(
+                        "SELECT i.job_id, j.owner, i.position, i.input FROM job_items i "
+                        "JOIN jobs j ON j.id = i.job_id "
+                        "WHERE i.status = 'pending' AND j.status IN ('queued', 'running') AND j.owner = ? "
+                        "ORDER BY j.created_at, i.position LIMIT 1",
+                        (owner,)
+                    ).fetchone()
+
+                if row is not None:
+                    self._claims += 1
+                    self._served[row['owner']] = self._claims
+                    self.db.execute(
+                        "UPDATE job_items SET status = 'running' WHERE job_id = ? AND position = ?",
+                        (row['job_id'], row['position'])
+                    )
+                    self.db.execute(
+                        "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                        (time.time(), row['job_id'])
+                    )
+                    self.db.commit()
+                    return row['job_id'], row['owner'], row['position'], row['input']
+
+                self.work_available.wait()
+        return None
+
+    def _finish(self, job_id: str, position: int, result: dict):
+        """
+        Store an item result and update job progress
+
+        Args:
+            job_id: Job id
+            position: Item position
+            result: Converter result dictionary
+        """
+        success = bool(result.get('success'))
+        with self.lock:
+            self.db.execute(
+                "UPDATE job_items SET status = ?, output = ?, error = ? WHERE job_id = ? AND position = ?",
+                (
+                    'done' if success else 'failed',
+                    json.dumps(result['output'], ensure_ascii=False) if success else None,
+                    None if success else result.get('error', 'Unknown error'),
+                    job_id,
+                    position
+                )
+            )
+            column = 'completed' if success else 'failed'
+            self.db.execute(
+                f"UPDATE jobs SET {column} = {column} + 1, updated_at = ? WHERE id = ?",
+                (time.time(), job_id)
+            )
+            self.db.execute(
+                "UPDATE jobs SET status = 'completed' "
+                "WHERE id = ? AND status = 'running' AND completed + failed >= total",
+                (job_id,)
+            )
+            self.db.commit()
+
+    def _work(self):
+        """
+        Worker loop
+        """
+        while True:
+            item = self._claim()
+            if item is None:
+                return
+
+            job_id, owner, position, compose_code = item
+            try:
+                result = self.convert_fn(compose_code, owner)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+
+            self._finish(job_id, position, result)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job; items already converted are kept
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            True if the job was queued or running
+        """
+        with self.lock:
+            cancelled = self.db.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            ).rowcount
+            self.db.commit()
+        return bool(cancelled)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """
+        Get job progress
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Job dictionary or None if unknown
+        """
+        with self.lock:
+            row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        done = job['completed'] + job['failed']
+        job['progress'] = done / job['total'] if job['total'] else 1.0
+        return job
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> list:
+        """
+        Page through item results
+
+        Args:
+            job_id: Job id
+            offset: First item position
+            limit: Maximum items returned
+
+        Returns:
+            List of items with position, input, status, output and error
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT position, input, status, output, error FROM job_items "
+                "WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                (job_id, offset, limit)
+            ).fetchall()
+
+        items = []
+        for row in rows:
+            item = dict(row)
+            item['output'] = json.loads(item['output']) if item['output'] else None
+            items.append(item)
+        return items
+
+    def close(self):
+        """
+        Stop workers and close the database
+        """
+        self.stop()
+        self.db.close()
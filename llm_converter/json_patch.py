@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Minimal JSON Patch (RFC 6902) generation and application
+"""
+
+import copy
+import json
+from difflib import SequenceMatcher
+
+def _escape(token) -> str:
+    """
+    Escape a JSON pointer reference token
+
+    Args:
+        token: Dict key or list index
+
+    Returns:
+        Escaped token
+    """
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+def _unescape(token: str) -> str:
+    """
+    Unescape a JSON pointer reference token
+
+    Args:
+        token: Escaped token
+
+    Returns:
+        Original token
+    """
+    return token.replace('~1', '/').replace('~0', '~')
+
+def _same_json(old, new) -> bool:
+    """
+    Compare JSON values, telling true from 1 and 1 from 1.0
+
+    Args:
+        old: First JSON value
+        new: Second JSON value
+
+    Returns:
+        True if both encode to the same JSON
+    """
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, dict):
+        return old.keys() == new.keys() and all(_same_json(value, new[key]) for key, value in old.items())
+    if isinstance(old, list):
+        return len(old) == len(new) and all(_same_json(a, b) for a, b in zip(old, new))
+    return old == new
+
+def make_patch(old, new, path: str = "") -> list:
+    """
+    Build a JSON Patch that turns old into new
+
+    Dicts are diffed key by key, lists element by element with
+    insertions and removals detected by sequence matching.
+
+    Args:
+        old: Previous JSON value
+        new: New JSON value
+        path: JSON pointer of the values
+
+    Returns:
+        List of patch operations
+    """
+    if _same_json(old, new):
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        return _make_list_patch(old, new, path)
+
+    return [{"op": "replace", "path": path, "value": new}]
+
+def _make_list_patch(old: list, new: list, path: str) -> list:
+    """
+    Build patch operations for a list
+
+    Args:
+        old: Previous list
+        new: New list
+        path: JSON pointer of the list
+
+    Returns:
+        List of patch operations
+    """
+    keys_old = [json.dumps(item, sort_keys=True, ensure_ascii=False) for item in old]
+    keys_new = [json.dumps(item, sort_keys=True, ensure_ascii=False) for item in new]
+    matcher = SequenceMatcher(a=keys_old, b=keys_new, autojunk=False)
+
+    ops = []
+    # Index shift caused by operations already emitted
+    offset = 0
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+
+        # Changed items at the same position are patched in place
+        common = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for k in range(common):
+            ops.extend(make_patch(old[i1 + k], new[j1 + k], f"{path}/{i1 + k + offset}"))
+
+        for _ in range(i2 - i1 - common):
+            ops.append({"op": "remove", "path": f"{path}/{i1 + common + offset}"})
+        offset -= i2 - i1 - common
+
+        for k in range(j2 - j1 - common):
+            index = i2 + offset + k
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": new[j1 + common + k]})
+        offset += j2 - j1 - common
+
+    return ops
+
+def apply_patch(document, patch: list):
+    """
+    Apply a JSON Patch
+
+    Supports the add, remove and replace operations produced by make_patch.
+
+    Args:
+        document: JSON value to patch (not modified)
+        patch: List of patch operations
+
+    Returns:
+        Patched copy of the document
+    """
+    document = copy.deepcopy(document)
+
+    for op in patch:
+        tokens = [_unescape(t) for t in op['path'].split('/')[1:]]
+        if not tokens:
+            if op['op'] in ('add', 'replace'):
+                document = copy.deepcopy(op['value'])
+                continue
+            raise ValueError("Cannot remove the document root")
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == '-' else int(last)
+            if op['op'] == 'add':
+                parent.insert(index, copy.deepcopy(op['value']))
+            elif op['op'] == 'remove':
+                del parent[index]
+            elif op['op'] == 'replace':
+                parent[index] = copy.deepcopy(op['value'])
+            else:
+                raise ValueError(f"Unsupported operation: {op['op']}")
+        else:
+            if op['op'] in ('add', 'replace'):
+                parent[last] = copy.deepcopy(op['value'])
+            elif op['op'] == 'remove':
+                del parent[last]
+            else:
+                raise ValueError(f"Unsupported operation: {op['op']}")
+
+    return document
@@ -5,10 +5,202 @@
 Base class for working with LLMs
 """
 
+import contextvars
+import json
+import os
+import threading
+import time
+import types
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from enum import Enum
 from typing import Optional
 
+from .tracing import start_span
+from .profiling import ProfileSession, profile_section
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the token count of a text
+    
+    Args:
+        text: Prompt or response text
+        
+    Returns:
+        Estimated tokens (about 4 bytes per token)
+    """
+    return max(1, len(text.encode('utf-8')) // 4) if text else 0
+
+# Stop sequences for prompts ending in "Output:": the closing code fence or
+# the model starting another example
+STOP_SEQUENCES = ["\n```", "\nInput:", "\nExample"]
+
+class JsonCompletionScanner:
+    """
+    Find where the first top-level JSON object or array of a text ends
+    
+    Text is fed in chunks as it streams; anything before the first "{" or
+    "[" (such as a ```json fence) is skipped.
+    """
+    
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk: str) -> Optional[int]:
+        """
+        Scan the next chunk
+        
+        Args:
+            chunk: Next piece of text
+        
+        Returns:
+            Position in the chunk just after the closing bracket, or None
+            if the value is not complete yet
+        """
+        for i, char in enumerate(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif not self.started:
+                if char in '{[':
+                    self.started = True
+                    self.depth = 1
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        return None
+
+def is_truncated_json(text: Optional[str]) -> bool:
+    """
+    Tell whether a text opens a JSON value that never closes
+    
+    This is how output cut off by the output token limit looks.
+    
+    Args:
+        text: Model response
+    
+    Returns:
+        True if the response is truncated
+    """
+    if not text:
+        return False
+    scanner = JsonCompletionScanner()
+    return scanner.feed(text) is None and scanner.started
+
+def _close_stream(stream):
+    """
+    Close a provider stream so the provider stops generating
+    
+    HTTP responses and generators are closed, gRPC calls cancelled.
+    Errors are ignored: the response has already been read.
+    
+    Args:
+        stream: Stream object of the provider SDK
+    """
+    for name in ('close', 'cancel'):
+        method = getattr(stream, name, None)
+        if callable(method):
+            try:
+                method()
+            except Exception:
+                pass
+            return
+
+class ConversionCancelled(Exception):
+    """
+    Raised inside a model call whose CallControl was cancelled
+    """
+    pass
+
+# CallControl of the conversion running in the current context
+_call_control = contextvars.ContextVar('call_control', default=None)
+
+# Id of the client conversion running in the current context; model calls
+# of one conversion (repairs, retries, cascade tiers) are traced with it
+_conversion_id = contextvars.ContextVar('conversion_id', default=None)
+
+@contextmanager
+def conversion_scope():
+    """
+    Run a client conversion under its own id, unless one is already running
+
+    Yields:
+        True if this scope started the conversion, so it should log the
+        request, False if nested in another one
+    """
+    if _conversion_id.get() is not None:
+        yield False
+        return
+    token = _conversion_id.set(os.urandom(8).hex())
+    try:
+        yield True
+    finally:
+        _conversion_id.reset(token)
+
+class CallControl:
+    """
+    Cancel or watch the model calls of one conversion
+    
+    Activate it around a conversion; every model call made for it, also
+    on scheduler workers, fails with ConversionCancelled once cancel() is
+    called (queued calls before reaching the provider, streaming calls at
+    the next chunk, which closes the stream), and passes each streamed
+    text chunk to on_chunk.
+    """
+    
+    def __init__(self, on_chunk=None):
+        """
+        Initialize the control
+        
+        Args:
+            on_chunk: Optional function called with each streamed text chunk
+        """
+        self.on_chunk = on_chunk
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """
+        Stop the conversion's current and future model calls
+        """
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def check(self):
+        """
+        Raise if cancelled
+        
+        Raises:
+            ConversionCancelled: cancel() was called
+        """
+        if self._cancelled.is_set():
+            raise ConversionCancelled("Conversion cancelled")
+    
+    @contextmanager
+    def active(self):
+        """
+        Apply the control to model calls made in this context
+        """
+        token = _call_control.set(self)
+        try:
+            yield self
+        finally:
+            _call_control.reset(token)
+
 class LLMProvider(Enum):
     """
     List of LLM providers
@@ -39,6 +231,21 @@ class LLMBaseConverter(ABC):
         self.prompt = prompt
         self.provider = provider
         self.model = None
+        self._model_lock = threading.Lock()
+        
+        # Output token limit of a call; callers may pass a smaller one
+        self.max_output_tokens = 1000
+        
+        # Optional TraceStore recording every model call
+        self.trace_store = None
+        
+        # Optional TraceStore recording every conversion request, cache
+        # hits included
+        self.request_log = None
+        
+        # Optional ProfileSession profiling this converter's conversions
+        # and model calls (see start_profiling)
+        self.profile_session = None
     
     @abstractmethod
     def _initialize_model(self):
@@ -48,12 +255,15 @@ class LLMBaseConverter(ABC):
         pass
     
     @abstractmethod
-    def _call_model(self, full_prompt: str) -> Optional[str]:
+    def _call_model(self, full_prompt: str, max_output_tokens: Optional[int] = None) -> Optional[str]:
         """
         Call the model
         
+        Generation stops once the top-level JSON value is complete.
+        
         Args:
             full_prompt: Complete prompt
+            max_output_tokens: Output token limit (max_output_tokens if None)
             
         Returns:
             Model response or None if error
@@ -70,6 +280,135 @@ class LLMBaseConverter(ABC):
         """
         pass
     
+    def _invoke_model(self, full_prompt: str, input_text: str = "",
+                      max_output_tokens: Optional[int] = None) -> Optional[str]:
+        """
+        Call the model and record the call if a trace store is attached
+        
+        Args:
+            full_prompt: Complete prompt
+            input_text: Original input, stored with the trace
+            max_output_tokens: Output token limit of the call
+            
+        Returns:
+            Model response or None if error
+        """
+        control = _call_control.get()
+        if control is not None:
+            control.check()
+        
+        timestamp = time.time()
+        start = time.perf_counter()
+        with profile_section(self.profile_session), \
+                start_span("provider.call", {"provider": self.provider.value, "model": self.model_name}) as span:
+            response = self._call_model(full_prompt, max_output_tokens=max_output_tokens)
+            if span.recording:
+                span.set_attributes({
+                    "prompt_tokens": estimate_tokens(full_prompt),
+                    "max_output_tokens": max_output_tokens or self.max_output_tokens,
+                    "output_tokens": estimate_tokens(response) if response else 0,
+                    "success": response is not None
+                })
+        latency_ms = (time.perf_counter() - start) * 1000
+        
+        if self.trace_store is not None:
+            try:
+                self.trace_store.record({
+                    "timestamp": timestamp,
+                    "provider": self.provider.value,
+                    "model": self.model_name,
+                    "input": input_text,
+                    "conversion_id": _conversion_id.get(),
+                    "prompt": full_prompt,
+                    "response": response,
+                    "max_output_tokens": max_output_tokens,
+                    "latency_ms": round(latency_ms, 2)
+                })
+            except Exception as e:
+                print(f"❌ Error recording trace: {e}")
+        
+        return response
+    
+    def _read_stream(self, chunks) -> str:
+        """
+        Join streamed text, stopping once the top-level JSON value is complete
+        
+        The caller closes the stream, which cancels the rest of the
+        generation.
+        
+        Args:
+            chunks: Iterable of text pieces
+        
+        Returns:
+            Text up to the end of the JSON value, or all of it if the
+            value never completes
+        """
+        control = _call_control.get()
+        scanner = JsonCompletionScanner()
+        parts = []
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if control is not None:
+                control.check()
+            end = scanner.feed(chunk)
+            if control is not None and control.on_chunk is not None:
+                control.on_chunk(chunk if end is None else chunk[:end])
+            if end is not None:
+                parts.append(chunk[:end])
+                break
+            parts.append(chunk)
+        return "".join(parts)
+    
+    def ensure_model(self):
+        """
+        Initialize the model once, even with concurrent callers
+        """
+        if self.model is None:
+            with self._model_lock:
+                if self.model is None:
+                    self._initialize_model()
+    
+    def start_profiling(self, mode: str = "cprofile", duration: Optional[float] = None,
+                        max_requests: Optional[int] = None, interval: float = 0.005) -> ProfileSession:
+        """
+        Profile this converter's conversions and model calls
+        
+        Only work done through this converter is profiled, on whichever
+        threads it runs. Read the results with session.report().
+        
+        Args:
+            mode: "cprofile" (pstats table) or "sampling" (collapsed stacks)
+            duration: Stop after this many seconds
+            max_requests: Stop after this many conversions
+            interval: Seconds between samples in sampling mode
+            
+        Returns:
+            The running ProfileSession
+        """
+        if self.profile_session is not None:
+            self.profile_session.stop()
+        self.profile_session = ProfileSession(mode, duration, max_requests, interval)
+        return self.profile_session
+    
+    def stop_profiling(self) -> Optional[ProfileSession]:
+        """
+        Stop profiling this converter
+        
+        Returns:
+            The stopped ProfileSession, or None if none was running
+        """
+        session = self.profile_session
+        self.profile_session = None
+        if session is not None:
+            session.stop()
+        return session
+    
+    def _count_profiled_request(self):
+        """Count a conversion against the converter's profiling session"""
+        if self.profile_session is not None:
+            self.profile_session.count_request()
+    
     def build_full_prompt(self, input_text: str) -> str:
         """
         Build complete prompt
@@ -94,14 +433,15 @@ class LLMBaseConverter(ABC):
         """
         try:
             # Initialize model if needed
-            if self.model is None:
-                self._initialize_model()
-            
-            # Build complete prompt
-            full_prompt = self.build_full_prompt(input_text)
+            self.ensure_model()
             
-            # Call model
-            response = self._call_model(full_prompt)
+            with profile_section(self.profile_session):
+                # Build complete prompt
+                full_prompt = self.build_full_prompt(input_text)
+                
+                # Call model
+                response = self._invoke_model(full_prompt, input_text)
+            self._count_profiled_request()
             
             # Clean response
             if response:
@@ -126,6 +466,10 @@ class LLMBaseConverter(ABC):
             "model_initialized": self.model is not None
         }
 
+# google.generativeai keeps its API key in module state; configuring and
+# binding a client must not interleave between converters
+_GEMINI_CONFIGURE_LOCK = threading.Lock()
+
 # Implementation classes for each LLM
 
 class GeminiConverter(LLMBaseConverter):
@@ -140,18 +484,47 @@ class GeminiConverter(LLMBaseConverter):
         """Initialize Gemini model"""
         try:
             import google.generativeai as genai
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel(self.model_name)
+            from google.generativeai import client as genai_client
+            with _GEMINI_CONFIGURE_LOCK:
+                genai.configure(api_key=self.api_key)
+                model = genai.GenerativeModel(self.model_name)
+                # Bind the client for this key now; the default client is
+                # replaced the next time another key is configured
+                model._client = genai_client.get_default_generative_client()
+            self.model = model
             print(f"✅ Gemini model ({self.model_name}) initialized")
         except Exception as e:
             print(f"❌ Error initializing Gemini: {e}")
             raise
     
-    def _call_model(self, full_prompt: str) -> Optional[str]:
-        """Call Gemini model"""
+    def _call_model(self, full_prompt: str, max_output_tokens: Optional[int] = None) -> Optional[str]:
+        """Call Gemini model, streaming until the JSON is complete"""
         try:
-            response = self.model.generate_content(full_prompt)
-            return response.text
+            response = self.model.generate_content(
+                full_prompt,
+                generation_config={
+                    "max_output_tokens": max_output_tokens or self.max_output_tokens,
+                    "stop_sequences": STOP_SEQUENCES
+                },
+                stream=True
+            )
+            
+            def texts():
+                for chunk in response:
+                    # Chunks without text (e.g. the final one) raise on .text
+                    try:
+                        yield chunk.text
+                    except ValueError:
+                        continue
+            
+            try:
+                return self._read_stream(texts())
+            finally:
+                # The SDK response has no close(); cancel the underlying
+                # gRPC call (or close the REST generator) it iterates
+                _close_stream(getattr(response, '_iterator', None))
+        except ConversionCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error calling Gemini: {e}")
             return None
@@ -177,23 +550,55 @@ class OpenAIConverter(LLMBaseConverter):
         """Initialize OpenAI model"""
         try:
             import openai
-            openai.api_key = self.api_key
-            self.model = openai
+            if hasattr(openai, 'OpenAI'):
+                self.model = openai.OpenAI(api_key=self.api_key)
+            else:
+                # openai<1.0 has no client object; the key is passed per call
+                self.model = openai
             print(f"✅ OpenAI model ({self.model_name}) initialized")
         except Exception as e:
             print(f"❌ Error initializing OpenAI: {e}")
             raise
     
-    def _call_model(self, full_prompt: str) -> Optional[str]:
-        """Call OpenAI model"""
+    def _call_model(self, full_prompt: str, max_output_tokens: Optional[int] = None) -> Optional[str]:
+        """Call OpenAI model, streaming until the JSON is complete"""
         try:
-            response = self.model.ChatCompletion.create(
+            if isinstance(self.model, types.ModuleType):
+                stream = self.model.ChatCompletion.create(
+                    api_key=self.api_key,
+                    model=self.model_name,
+                    messages=[{"role": "user", "content": full_prompt}],
+                    max_tokens=max_output_tokens or self.max_output_tokens,
+                    temperature=0.1,
+                    stop=STOP_SEQUENCES,
+                    stream=True
+                )
+                try:
+                    return self._read_stream(
+                        chunk['choices'][0]['delta'].get('content') for chunk in stream if chunk['choices']
+                    )
+                finally:
+                    # The stream is a generator over the HTTP response;
+                    # closing it stops reading and releases the connection
+                    _close_stream(stream)
+            
+            stream = self.model.chat.completions.create(
                 model=self.model_name,
                 messages=[{"role": "user", "content": full_prompt}],
-                max_tokens=1000,
-                temperature=0.1
+                max_tokens=max_output_tokens or self.max_output_tokens,
+                temperature=0.1,
+                stop=STOP_SEQUENCES,
+                stream=True
             )
-            return response.choices[0].message.content
+            try:
+                return self._read_stream(
+                    chunk.choices[0].delta.content for chunk in stream if chunk.choices
+                )
+            finally:
+                # Closing the connection cancels the rest of the generation
+                stream.close()
+        except ConversionCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error calling OpenAI: {e}")
             return None
@@ -225,16 +630,20 @@ class ClaudeConverter(LLMBaseConverter):
             print(f"❌ Error initializing Claude: {e}")
             raise
     
-    def _call_model(self, full_prompt: str) -> Optional[str]:
-        """Call Claude model"""
+    def _call_model(self, full_prompt: str, max_output_tokens: Optional[int] = None) -> Optional[str]:
+        """Call Claude model, streaming until the JSON is complete"""
         try:
-            response = self.model.messages.create(
+            # Leaving the stream context closes the connection
+            with self.model.messages.stream(
                 model=self.model_name,
-                max_tokens=1000,
+                max_tokens=max_output_tokens or self.max_output_tokens,
                 temperature=0.1,
+                stop_sequences=STOP_SEQUENCES,
                 messages=[{"role": "user", "content": full_prompt}]
-            )
-            return response.content[0].text
+            ) as stream:
+                return self._read_stream(stream.text_stream)
+        except ConversionCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error calling Claude: {e}")
             return None
@@ -266,18 +675,31 @@ class OllamaConverter(LLMBaseConverter):
             print(f"❌ Error initializing Ollama: {e}")
             raise
     
-    def _call_model(self, full_prompt: str) -> Optional[str]:
-        """Call Ollama model"""
+    def _call_model(self, full_prompt: str, max_output_tokens: Optional[int] = None) -> Optional[str]:
+        """Call Ollama model, streaming until the JSON is complete"""
         try:
             response = self.model.post(
                 'http://localhost:11434/api/generate',
                 json={
                     'model': self.model_name,
                     'prompt': full_prompt,
-                    'stream': False
-                }
+                    'stream': True,
+                    'options': {
+                        'num_predict': max_output_tokens or self.max_output_tokens,
+                        'stop': STOP_SEQUENCES
+                    }
+                },
+                stream=True
             )
-            return response.json()['response']
+            try:
+                return self._read_stream(
+                    json.loads(line).get('response', '') for line in response.iter_lines() if line
+                )
+            finally:
+                # Closing the connection makes Ollama stop generating
+                response.close()
+        except ConversionCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error calling Ollama: {e}")
             return None
@@ -310,11 +732,18 @@ class HuggingFaceConverter(LLMBaseConverter):
             print(f"❌ Error initializing Hugging Face: {e}")
             raise
     
-    def _call_model(self, full_prompt: str) -> Optional[str]:
+    def _call_model(self, full_prompt: str, max_output_tokens: Optional[int] = None) -> Optional[str]:
         """Call Hugging Face model"""
         try:
-            response = self.model(full_prompt, max_length=200, num_return_sequences=1)
-            return response[0]['generated_text'].replace(full_prompt, "").strip()
+            # The local pipeline does not stream; cut the text after the JSON
+            response = self.model(
+                full_prompt,
+                max_new_tokens=max_output_tokens or self.max_output_tokens,
+                num_return_sequences=1
+            )
+            return self._read_stream([response[0]['generated_text'].replace(full_prompt, "").strip()])
+        except ConversionCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error calling Hugging Face: {e}")
             return None
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CPU profiling of conversions with cProfile or stack sampling
+"""
+
+import cProfile
+import contextvars
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+# Session of the current request; the scheduler runs calls in the
+# submitter's context, so a request's model calls are profiled with it
+_request_session = contextvars.ContextVar('profile_session', default=None)
+
+# Process-wide session started with start_profiling()
+_global_session = None
+
+# cProfile profiles one thread at a time; the profiler running on this
+# thread, its session and its nesting depth
+_thread_state = threading.local()
+
+class ProfileSession:
+    """
+    Collect CPU profiles of profiled sections
+
+    In "cprofile" mode every thread entering a section runs its own
+    cProfile profiler while inside it, and the profiles are merged into
+    one pstats table. A thread already profiled by another session is
+    skipped. In "sampling" mode a background thread records the stacks of
+    the threads inside sections (or of all threads) every interval, giving
+    collapsed stacks for flamegraph tools at a lower overhead.
+
+    The session stops after duration seconds or max_requests requests,
+    or when stop() is called.
+    """
+
+    def __init__(self, mode: str = "cprofile", duration: Optional[float] = None,
+                 max_requests: Optional[int] = None, interval: float = 0.005,
+                 all_threads: bool = False):
+        """
+        Initialize and start the session
+
+        Args:
+            mode: "cprofile" or "sampling"
+            duration: Stop after this many seconds
+            max_requests: Stop after this many requests
+            interval: Seconds between samples in sampling mode
+            all_threads: Sample every thread, not only threads inside sections
+        """
+        if mode not in ("cprofile", "sampling"):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+
+        self.mode = mode
+        self.duration = duration
+        self.max_requests = max_requests
+        self.interval = interval
+        self.all_threads = all_threads
+        self.lock = threading.Lock()
+
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.requests = 0
+        self.samples = 0
+
+        self._profiles = []
+        self._stacks = Counter()
+        # Thread ident -> nesting depth of threads inside sections
+        self._threads = {}
+
+        self._sampler = None
+        if mode == "sampling":
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+
+    @property
+    def active(self) -> bool:
+        if self.stopped_at is None and self.duration is not None \
+                and time.time() - self.started_at >= self.duration:
+            self.stop()
+        return self.stopped_at is None
+
+    def stop(self):
+        """
+        Stop collecting; sections still running finish their profiles
+        """
+        with self.lock:
+            if self.stopped_at is None:
+                self.stopped_at = time.time()
+
+    def count_request(self):
+        """
+        Count a profiled request, stopping after max_requests
+        """
+        with self.lock:
+            if self.stopped_at is not None:
+                return
+            self.requests += 1
+            reached = self.max_requests is not None and self.requests >= self.max_requests
+        if reached:
+            self.stop()
+
+    def section(self):
+        """
+        Profile the current thread while inside the returned context manager
+
+        Returns:
+            Context manager
+        """
+        return _Section(self)
+
+    def _enter(self) -> bool:
+        if not self.active:
+            return False
+
+        if self.mode == "sampling":
+            ident = threading.get_ident()
+            with self.lock:
+                self._threads[ident] = self._threads.get(ident, 0) + 1
+            return True
+
+        owner = getattr(_thread_state, 'session', None)
+        if owner is self:
+            _thread_state.depth += 1
+            return True
+        if owner is not None:
+            return False
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger's) owns this thread
+            return False
+        _thread_state.session = self
+        _thread_state.profiler = profiler
+        _thread_state.depth = 1
+        return True
+
+    def _exit(self):
+        if self.mode == "sampling":
+            ident = threading.get_ident()
+            with self.lock:
+                depth = self._threads.get(ident, 1) - 1
+                if depth:
+                    self._threads[ident] = depth
+                else:
+                    self._threads.pop(ident, None)
+            return
+
+        _thread_state.depth -= 1
+        if _thread_state.depth:
+            return
+        profiler = _thread_state.profiler
+        profiler.disable()
+        _thread_state.session = None
+        _thread_state.profiler = None
+        with self.lock:
+            self._profiles.append(profiler)
+
+    def _sample(self):
+        """Record the stacks of profiled threads until the session stops"""
+        own = threading.get_ident()
+        while self.active:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                idents = list(frames) if self.all_threads else list(self._threads)
+            for ident in idents:
+                frame = frames.get(ident)
+                if ident == own or frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                with self.lock:
+                    self._stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def get_stats(self) -> Optional[pstats.Stats]:
+        """
+        Merge the cProfile profiles of finished sections
+
+        Returns:
+            pstats.Stats, or None if nothing was profiled
+        """
+        with self.lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        return stats
+
+    def collapsed_stacks(self) -> str:
+        """
+        Get samples as collapsed stacks ("outer;inner count" per line)
+
+        The output feeds flamegraph.pl, speedscope or inferno directly.
+
+        Returns:
+            Collapsed stacks, most frequent first
+        """
+        with self.lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def report(self, output_format: str = "text", sort: str = "cumulative", limit: int = 50):
+        """
+        Render the collected profile
+
+        Args:
+            output_format: "text" (readable table), "pstats" (marshalled
+                pstats data, as written by Stats.dump_stats, cprofile mode
+                only) or "collapsed" (flamegraph stacks, sampling mode only)
+            sort: pstats sort key for the text table
+            limit: Rows of the text table
+
+        Returns:
+            Report text, or bytes for "pstats"
+        """
+        if output_format == "collapsed":
+            if self.mode != "sampling":
+                raise ValueError("Collapsed stacks need a sampling session")
+            return self.collapsed_stacks()
+
+        if output_format == "pstats":
+            if self.mode != "cprofile":
+                raise ValueError("pstats output needs a cprofile session")
+            stats = self.get_stats()
+            return marshal.dumps(stats.stats if stats is not None else {})
+
+        if output_format != "text":
+            raise ValueError(f"Unknown profile format: {output_format}")
+
+        if self.mode == "sampling":
+            lines = self.collapsed_stacks().splitlines()[:limit]
+            return f"{self.samples} samples\n" + "\n".join(lines)
+
+        stats = self.get_stats()
+        if stats is None:
+            return "No profiled sections"
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def get_summary(self) -> dict:
+        """
+        Get the state of the session
+
+        Returns:
+            Mode, timing, request and sample counts
+        """
+        end = self.stopped_at or time.time()
+        return {
+            "mode": self.mode,
+            "active": self.active,
+            "started_at": self.started_at,
+            "elapsed_s": round(end - self.started_at, 3),
+            "requests": self.requests,
+            "profiled_sections": len(self._profiles),
+            "samples": self.samples
+        }
+
+class _Section:
+    """
+    Context manager profiling the current thread for a session
+    """
+
+    def __init__(self, session: ProfileSession):
+        self.session = session
+        self.entered = False
+
+    def __enter__(self):
+        self.entered = self.session._enter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.entered:
+            self.session._exit()
+        return False
+
+class _NoSection:
+    """
+    Context manager used while nothing is profiled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SECTION = _NoSection()
+
+def start_profiling(mode: str = "cprofile", duration: Optional[float] = None,
+                    max_requests: Optional[int] = None, interval: float = 0.005,
+                    all_threads: bool = False) -> ProfileSession:
+    """
+    Start a process-wide profiling session, replacing a running one
+
+    Args:
+        mode: "cprofile" or "sampling"
+        duration: Stop after this many seconds
+        max_requests: Stop after this many requests
+        interval: Seconds between samples in sampling mode
+        all_threads: Sample every thread, not only threads inside sections
+
+    Returns:
+        The new session
+    """
+    global _global_session
+    if _global_session is not None:
+        _global_session.stop()
+    _global_session = ProfileSession(mode, duration, max_requests, interval, all_threads)
+    print(f"✅ Profiling started: {mode}")
+    return _global_session
+
+def stop_profiling() -> Optional[ProfileSession]:
+    """
+    Stop the process-wide session
+
+    Returns:
+        The stopped session, or None if none was started
+    """
+    if _global_session is not None:
+        _global_session.stop()
+    return _global_session
+
+def get_profiling_session() -> Optional[ProfileSession]:
+    """
+    Get the process-wide session, running or last stopped
+
+    Returns:
+        Session or None
+    """
+    return _global_session
+
+def profile_section(session: Optional[ProfileSession] = None):
+    """
+    Profile the current thread for the given or active session
+
+    The active session is the one of the current request (see
+    profile_request), else the running process-wide one. With none, a
+    shared no-op context manager is returned.
+
+    Args:
+        session: Session to use instead of the active one
+
+    Returns:
+        Context manager
+    """
+    session = session or _request_session.get() or _global_session
+    if session is None or session.stopped_at is not None:
+        return _NO_SECTION
+    return session.section()
+
+def set_request_session(session: Optional[ProfileSession]):
+    """
+    Make a session the active one for the current context
+
+    Args:
+        session: Session of the current request
+
+    Returns:
+        Token for reset_request_session()
+    """
+    return _request_session.set(session)
+
+def reset_request_session(token):
+    """
+    Restore the session active before set_request_session()
+
+    Args:
+        token: Token returned by set_request_session()
+    """
+    _request_session.reset(token)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Replay recorded model calls against a backend or an HTTP server
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .llm_base_converter import LLMProvider, create_converter
+from .trace_store import TraceStore
+
+def _replay_one(trace: dict, converter=None, url: Optional[str] = None) -> dict:
+    """
+    Send one recorded trace
+
+    Args:
+        trace: Recorded trace
+        converter: LLMBaseConverter receiving the recorded prompt
+        url: Conversion endpoint receiving the recorded input
+
+    Returns:
+        Replay result
+    """
+    start = time.perf_counter()
+    error = None
+    response = None
+
+    try:
+        if converter is not None:
+            response = converter._call_model(trace['prompt'], max_output_tokens=trace.get('max_output_tokens'))
+        else:
+            import requests
+            reply = requests.post(url, json={"compose_code": trace['input']}, timeout=120)
+            response = reply.text
+            if reply.status_code != 200:
+                error = f"HTTP {reply.status_code}"
+    except Exception as e:
+        error = str(e)
+
+    latency_ms = (time.perf_counter() - start) * 1000
+    if response is None and error is None:
+        error = "Empty response"
+
+    return {
+        "prompt_fingerprint": trace.get('prompt_fingerprint'),
+        "input": trace.get('input'),
+        "original_latency_ms": trace.get('latency_ms'),
+        "replay_latency_ms": round(latency_ms, 2),
+        "same_response": converter is not None and response == trace.get('response'),
+        "error": error
+    }
+
+def replay_traces(traces: list, converter=None, url: Optional[str] = None,
+                  speed: float = 1.0, max_workers: int = 8) -> list:
+    """
+    Replay traces with their original spacing
+
+    Requests are dispatched at their recorded offsets divided by speed,
+    without waiting for earlier ones, so concurrency matches the recording.
+
+    Args:
+        traces: Recorded traces
+        converter: LLMBaseConverter backend (uses the recorded prompts)
+        url: Conversion endpoint such as http://localhost:8000/convert
+            (uses the recorded inputs)
+        speed: Time acceleration; 0 sends everything at once
+        max_workers: Maximum concurrent requests
+
+    Returns:
+        Replay results in trace order
+    """
+    if (converter is None) == (url is None):
+        raise ValueError("Pass exactly one of converter or url")
+
+    traces = sorted(traces, key=lambda t: t.get('timestamp', 0))
+    if not traces:
+        return []
+
+    if converter is not None:
+        if any('prompt' not in trace for trace in traces):
+            raise ValueError("Traces were recorded without prompts")
+        converter.ensure_model()
+
+    first_timestamp = traces[0].get('timestamp', 0)
+    started = time.perf_counter()
+    results = [None] * len(traces)
+
+    print(f"🔁 Replaying {len(traces)} traces at {speed or 'max'}x")
+
+    def run(index, trace):
+        results[index] = _replay_one(trace, converter, url)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index, trace in enumerate(traces):
+            if speed > 0:
+                due = (trace.get('timestamp', 0) - first_timestamp) / speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(run, index, trace)
+
+    return results
+
+def summarize_replay(results: list) -> dict:
+    """
+    Summarize replay results
+
+    Args:
+        results: Results from replay_traces()
+
+    Returns:
+        Counts and latency percentiles
+    """
+    def percentile(values, fraction):
+        if not values:
+            return None
+        values = sorted(values)
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    original = [r['original_latency_ms'] for r in results if r['original_latency_ms'] is not None]
+    replayed = [r['replay_latency_ms'] for r in results if not r['error']]
+
+    return {
+        "count": len(results),
+        "errors": sum(1 for r in results if r['error']),
+        "same_response": sum(1 for r in results if r['same_response']),
+        "original_p50_ms": percentile(original, 0.5),
+        "original_p95_ms": percentile(original, 0.95),
+        "replay_p50_ms": percentile(replayed, 0.5),
+        "replay_p95_ms": percentile(replayed, 0.95)
+    }
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Replay recorded model calls")
+    parser.add_argument("trace_dir", help="TraceStore directory")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time acceleration, 0 for no delays")
+    parser.add_argument("--url", help="Conversion endpoint to replay inputs against")
+    parser.add_argument("--provider", default="gemini", help="Provider to replay prompts against")
+    parser.add_argument("--model", default="", help="Model name")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum concurrent requests")
+    parser.add_argument("--since", type=float, help="Only traces after this Unix timestamp")
+    parser.add_argument("--until", type=float, help="Only traces before this Unix timestamp")
+    args = parser.parse_args()
+
+    traces = list(TraceStore(args.trace_dir).iter_traces(args.since, args.until))
+
+    converter = None
+    if not args.url:
+        api_key = os.getenv('LLM_API_KEY') or os.getenv('GEMINI_API_KEY', '')
+        converter = create_converter(LLMProvider(args.provider), api_key, args.model)
+
+    results = replay_traces(traces, converter=converter, url=args.url,
+                            speed=args.speed, max_workers=args.workers)
+
+    print("\n📈 Summary:")
+    for key, value in summarize_replay(results).items():
+        print(f"   {key}: {value}")
+
+if __name__ == "__main__":
+    main()
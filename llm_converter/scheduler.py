@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Priority and deadline scheduling of model calls
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from enum import Enum
+from typing import Optional
+
+class RequestPriority(Enum):
+    """
+    Request classes, most urgent first
+    """
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BULK = 2
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request's deadline passes before its model call finishes
+    """
+    pass
+
+class SchedulerOverloaded(Exception):
+    """
+    Raised when the scheduler queue is full
+    """
+    pass
+
+class ConversionScheduler:
+    """
+    Run model calls on a fixed number of workers in priority/deadline order
+
+    Queued work is ordered by priority, then earliest deadline, then
+    arrival. Work whose deadline has passed when a worker picks it up is
+    dropped without calling the provider. Calls run in a copy of the
+    submitter's context variables, so a CallControl set by the caller
+    still applies on the worker.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 1000):
+        """
+        Initialize the scheduler
+
+        Args:
+            max_concurrent: Concurrent model calls
+            max_queue: Maximum queued calls before rejecting new ones
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._heap = []
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._workers = []
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'expired': 0,
+            'rejected': 0,
+            'timed_out': 0
+        }
+
+    def _start_workers(self):
+        """
+        Start worker threads on first use
+        """
+        while len(self._workers) < self.max_concurrent:
+            worker = threading.Thread(target=self._work, name=f"scheduler-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, fn, *args, priority: RequestPriority = RequestPriority.DEFAULT,
+               deadline: Optional[float] = None) -> Future:
+        """
+        Queue a call
+
+        Args:
+            fn: Function to call
+            *args: Arguments of fn
+            priority: Request class
+            deadline: Absolute time.monotonic() deadline or None
+
+        Returns:
+            Future with the result of fn
+        """
+        future = Future()
+
+        with self._condition:
+            if len(self._heap) >= self.max_queue:
+                self.stats['rejected'] += 1
+                raise SchedulerOverloaded("Conversion queue is full")
+
+            self._start_workers()
+            order = (priority.value, deadline if deadline is not None else float('inf'), next(self._sequence))
+            heapq.heappush(self._heap, (order, fn, args, deadline, future, contextvars.copy_context()))
+            self.stats['submitted'] += 1
+            self._condition.notify()
+
+        return future
+
+    def _work(self):
+        """
+        Worker loop
+        """
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                _, fn, args, deadline, future, context = heapq.heappop(self._heap)
+
+            # Cancelled by a caller that already gave up
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if deadline is not None and time.monotonic() >= deadline:
+                with self._condition:
+                    self.stats['expired'] += 1
+                future.set_exception(DeadlineExceeded("Deadline passed while queued"))
+                continue
+
+            try:
+                future.set_result(context.run(fn, *args))
+            except Exception as e:
+                future.set_exception(e)
+
+            with self._condition:
+                self.stats['completed'] += 1
+
+    def run(self, fn, *args, priority: RequestPriority = RequestPriority.DEFAULT,
+            deadline: Optional[float] = None):
+        """
+        Queue a call and wait for its result
+
+        Args:
+            fn: Function to call
+            *args: Arguments of fn
+            priority: Request class
+            deadline: Absolute time.monotonic() deadline or None
+
+        Returns:
+            Result of fn
+
+        Raises:
+            DeadlineExceeded: The deadline passed first
+            SchedulerOverloaded: The queue is full
+        """
+        if deadline is not None and time.monotonic() >= deadline:
+            with self._condition:
+                self.stats['expired'] += 1
+            raise DeadlineExceeded("Deadline passed before queueing")
+
+        future = self.submit(fn, *args, priority=priority, deadline=deadline)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # A queued call is dropped; a running one finishes unobserved
+            future.cancel()
+            with self._condition:
+                self.stats['timed_out'] += 1
+            raise DeadlineExceeded("Deadline passed while waiting for the model")
+
+    def get_stats(self) -> dict:
+        """
+        Get scheduler statistics
+
+        Returns:
+            Counters and current queue length
+        """
+        with self._condition:
+            return {**self.stats, 'queued': len(self._heap), 'workers': self.max_concurrent}
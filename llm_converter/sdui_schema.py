@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SDUI output schema: validation and normalization of converted JSON
+"""
+
+import re
+
+from .json_patch import _escape
+
+# Conventions of datasets/compose_sdui_dataset.json: nodes have a type,
+# nested nodes go in children, modifiers are flattened to "modifier.<name>"
+# with dp values as plain numbers (named or multiple arguments become
+# {"horizontal": 8, "vertical": 4}), and nulls become "" (clean_dict)
+SDUI_SCHEMA = {
+    'required': {
+        'Text': ['text'],
+        'Button': ['onClick'],
+        'TextButton': ['onClick'],
+        'OutlinedButton': ['onClick'],
+        'IconButton': ['onClick']
+    },
+    'properties': {
+        'type': 'type',
+        'children': 'children',
+        'text': 'string',
+        'src': 'string',
+        'contentDescription': 'string',
+        'onClick': 'action',
+        'color': 'color',
+        'backgroundColor': 'color'
+    },
+    'modifiers': {
+        'padding': 'dp',
+        'size': 'dp',
+        'width': 'dp',
+        'height': 'dp',
+        'fillMaxWidth': 'flag',
+        'fillMaxSize': 'flag',
+        'fillMaxHeight': 'flag',
+        'wrapContentSize': 'flag',
+        'constrainAs': 'string'
+    }
+}
+
+_DP_PATTERN = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*(?:\.?\s*dp)?\s*$')
+_NAMED_ARGUMENT_PATTERN = re.compile(r'^\s*([A-Za-z_]\w*)\s*=\s*(.*)$', re.S)
+_MODIFIER_CALL_PATTERN = re.compile(r'(\w+)\s*\(([^()]*)\)')
+_BARE_CALL_PATTERN = re.compile(r'^([A-Za-z_][\w.]*)\(\)$')
+
+class SchemaError(ValueError):
+    """
+    A value that cannot be normalized to its schema kind
+    """
+    pass
+
+def _normalize_type(value):
+    """Component type: a non-empty string"""
+    if not isinstance(value, str) or not value.strip():
+        raise SchemaError(f"expected a non-empty component type, got {value!r}")
+    return value.strip()
+
+def _normalize_string(value):
+    """String; null becomes "" and numbers are stringified"""
+    if value is None:
+        return ""
+    if isinstance(value, bool) or isinstance(value, (dict, list)):
+        raise SchemaError(f"expected a string, got {value!r}")
+    return value if isinstance(value, str) else str(value)
+
+def _normalize_action(value):
+    """Click handler; { doSomething() } becomes doSomething"""
+    action = _normalize_string(value).strip()
+    # { doSomething() } -> doSomething
+    if action.startswith('{') and action.endswith('}'):
+        action = action[1:-1].strip()
+    match = _BARE_CALL_PATTERN.match(action)
+    return match.group(1) if match else action
+
+def _normalize_color(value):
+    """Color name; Color.Red becomes Red"""
+    color = _normalize_string(value).strip()
+    return color[len('Color.'):] if color.startswith('Color.') else color
+
+def _normalize_dp_value(value):
+    """Single dimension; "8.dp", "8" and 8.0 become 8"""
+    if isinstance(value, bool):
+        raise SchemaError(f"expected a dp value like 8, got {value!r}")
+    if isinstance(value, (int, float)):
+        number = value
+    elif isinstance(value, str) and _DP_PATTERN.match(value):
+        number = float(_DP_PATTERN.match(value).group(1))
+    else:
+        raise SchemaError(f"expected a dp value like 8, got {value!r}")
+    return int(number) if float(number).is_integer() else number
+
+def _normalize_dp(value):
+    """
+    Dimension; "8.dp", "8" and 8.0 become 8
+
+    Multi-value forms keep their shape with each value normalized:
+    {"start": "8.dp"} becomes {"start": 8}, the arguments of
+    padding(horizontal = 8.dp, vertical = 4.dp) become
+    {"horizontal": 8, "vertical": 4} and those of size(100.dp, 50.dp)
+    become [100, 50].
+    """
+    if isinstance(value, dict):
+        if not value:
+            raise SchemaError(f"expected a dp value like 8, got {value!r}")
+        return {str(name): _normalize_dp_value(argument) for name, argument in value.items()}
+    if isinstance(value, list):
+        if not value:
+            raise SchemaError(f"expected a dp value like 8, got {value!r}")
+        return [_normalize_dp_value(argument) for argument in value]
+    if isinstance(value, str) and ('=' in value or ',' in value):
+        arguments = [argument for argument in value.split(',') if argument.strip()]
+        named = [_NAMED_ARGUMENT_PATTERN.match(argument) for argument in arguments]
+        if arguments and all(named):
+            return {match.group(1): _normalize_dp_value(match.group(2)) for match in named}
+        if arguments and not any(named):
+            return [_normalize_dp_value(argument) for argument in arguments]
+        # Positional and named arguments mixed: keep the call arguments as written
+        return value.strip()
+    return _normalize_dp_value(value)
+
+def _normalize_flag(value):
+    """Argument-less modifier such as fillMaxWidth(): true"""
+    if value is True or value in ('true', 'True', '', {}) or value is None:
+        return True
+    if value is False or value in ('false', 'False'):
+        return False
+    raise SchemaError(f"expected true, got {value!r}")
+
+_NORMALIZERS = {
+    'type': _normalize_type,
+    'string': _normalize_string,
+    'action': _normalize_action,
+    'color': _normalize_color,
+    'dp': _normalize_dp,
+    'flag': _normalize_flag
+}
+
+class SchemaValidator:
+    """
+    Validate and normalize SDUI JSON in one pass
+
+    The schema is compiled once into a table mapping every known key to
+    its normalizer, so checking a node is one dictionary lookup per key.
+    Values are normalized where the intent is unambiguous ("8.dp" -> 8,
+    null -> "", "Color.Red" -> "Red", nested or string modifiers ->
+    flattened keys); anything else is reported with its JSON Pointer.
+    Unknown keys pass through unchanged.
+    """
+
+    def __init__(self, schema: dict = SDUI_SCHEMA):
+        """
+        Compile the schema
+
+        Args:
+            schema: Schema with required, properties and modifiers tables
+        """
+        self.required = {name: tuple(keys) for name, keys in schema['required'].items()}
+        self.modifiers = {
+            name: _NORMALIZERS[kind] for name, kind in schema['modifiers'].items()
+        }
+        self.normalizers = {
+            key: _NORMALIZERS[kind] for key, kind in schema['properties'].items() if kind != 'children'
+        }
+        self.normalizers.update({
+            f"modifier.{name}": normalizer for name, normalizer in self.modifiers.items()
+        })
+
+    def validate(self, output) -> dict:
+        """
+        Validate and normalize converted JSON
+
+        Args:
+            output: Parsed model output
+
+        Returns:
+            Dictionary with valid, the normalized output and errors, a
+            list of {"path", "message"} entries
+        """
+        errors = []
+        normalized = self._node(output, "", errors)
+        return {
+            'valid': not errors,
+            'output': normalized,
+            'errors': errors
+        }
+
+    def _node(self, node, path: str, errors: list):
+        """
+        Normalize one component node
+
+        Args:
+            node: Node to check
+            path: JSON Pointer of the node
+            errors: List receiving errors
+
+        Returns:
+            Normalized node
+        """
+        if not isinstance(node, dict):
+            errors.append({'path': path or "/", 'message': f"expected a component object, got {node!r}"})
+            return node
+
+        result = {}
+        for key, value in node.items():
+            key_path = f"{path}/{_escape(key)}"
+
+            if key == 'children':
+                result[key] = self._children(value, key_path, errors)
+            elif key == 'modifier':
+                self._modifier(value, key_path, result, errors)
+            else:
+                normalizer = self.normalizers.get(key)
+                if normalizer is None:
+                    result[key] = value
+                    continue
+                try:
+                    result[key] = normalizer(value)
+                except SchemaError as e:
+                    errors.append({'path': key_path, 'message': str(e)})
+                    result[key] = value
+
+        if 'type' not in result:
+            errors.append({'path': path or "/", 'message': 'missing "type"'})
+        elif isinstance(result['type'], str):
+            for key in self.required.get(result['type'], ()):
+                if key not in result:
+                    errors.append({'path': path or "/", 'message': f'{result["type"]} requires "{key}"'})
+
+        return result
+
+    def _children(self, children, path: str, errors: list) -> list:
+        """
+        Normalize a children list
+
+        Args:
+            children: List of nodes, a single node or null
+            path: JSON Pointer of the list
+            errors: List receiving errors
+
+        Returns:
+            Normalized list
+        """
+        if children is None:
+            return []
+        if isinstance(children, dict):
+            # A single child object instead of a list
+            return [self._node(children, path, errors)]
+        if not isinstance(children, list):
+            errors.append({'path': path, 'message': f"expected a list of components, got {children!r}"})
+            return children
+        return [self._node(child, f"{path}/{i}", errors) for i, child in enumerate(children)]
+
+    def _modifier(self, modifier, path: str, result: dict, errors: list):
+        """
+        Flatten a nested or string modifier into "modifier.<name>" keys
+
+        Args:
+            modifier: {"padding": "8.dp"} or "Modifier.padding(8.dp)"
+            path: JSON Pointer of the modifier
+            result: Node receiving the flattened keys
+            errors: List receiving errors
+        """
+        if isinstance(modifier, str):
+            modifier = {
+                name: (argument.strip() or True)
+                for name, argument in _MODIFIER_CALL_PATTERN.findall(modifier)
+            }
+        elif modifier is None:
+            return
+        elif not isinstance(modifier, dict):
+            errors.append({'path': path, 'message': f"expected modifier calls, got {modifier!r}"})
+            result['modifier'] = modifier
+            return
+
+        for name, value in modifier.items():
+            normalizer = self.modifiers.get(name)
+            if normalizer is None:
+                result[f"modifier.{name}"] = value
+                continue
+            try:
+                result[f"modifier.{name}"] = normalizer(value)
+            except SchemaError as e:
+                errors.append({'path': f"{path}/{_escape(name)}", 'message': str(e)})
+                result[f"modifier.{name}"] = value
+
+def format_errors(errors: list) -> str:
+    """
+    Render validation errors one per line, for logs and repair prompts
+
+    Args:
+        errors: Errors from SchemaValidator.validate
+
+    Returns:
+        Error report
+    """
+    return "\n".join(f"{error['path']}: {error['message']}" for error in errors)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shadow traffic: mirror conversions to an alternate converter for comparison
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class ShadowRunner:
+    """
+    Mirror a fraction of conversions to a shadow converter in the background
+
+    Shadow calls run on their own thread pool, never on the request path.
+    When more than max_pending mirrors are waiting, new ones are dropped
+    instead of queueing without bound. Each comparison is appended to a
+    JSONL log for offline analysis.
+    """
+
+    def __init__(self, shadow_converter, fraction: float = 0.1, log_path: str = "shadow_results.jsonl",
+                 max_workers: int = 2, max_pending: int = 100):
+        """
+        Initialize the shadow runner
+
+        Args:
+            shadow_converter: ComposeToJsonConverter under evaluation
+            fraction: Share of requests mirrored (0 to 1)
+            log_path: JSONL file receiving comparisons
+            max_workers: Concurrent shadow conversions
+            max_pending: Maximum queued mirrors before dropping
+        """
+        self.shadow_converter = shadow_converter
+        self.fraction = fraction
+        self.log_path = log_path
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.stats = {
+            'mirrored': 0,
+            'dropped': 0,
+            'completed': 0,
+            'matches': 0,
+            'primary_latency_ms': 0.0,
+            'shadow_latency_ms': 0.0
+        }
+
+    def maybe_mirror(self, compose_code: str, primary_result: dict, primary_latency_ms: float) -> bool:
+        """
+        Mirror a conversion with probability fraction
+
+        Returns immediately; the shadow conversion runs in the background.
+
+        Args:
+            compose_code: Converted Compose code
+            primary_result: Result returned to the user
+            primary_latency_ms: Latency of the primary conversion
+
+        Returns:
+            True if the request was mirrored
+        """
+        if self.fraction <= 0 or random.random() >= self.fraction:
+            return False
+
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.stats['dropped'] += 1
+                return False
+            self.pending += 1
+            self.stats['mirrored'] += 1
+
+        self.executor.submit(self._run, compose_code, primary_result, primary_latency_ms)
+        return True
+
+    def _run(self, compose_code: str, primary_result: dict, primary_latency_ms: float):
+        """
+        Run the shadow conversion and record the comparison
+
+        Args:
+            compose_code: Converted Compose code
+            primary_result: Result returned to the user
+            primary_latency_ms: Latency of the primary conversion
+        """
+        try:
+            start = time.perf_counter()
+            shadow_result = self.shadow_converter.convert_compose_to_json(compose_code)
+            shadow_latency_ms = (time.perf_counter() - start) * 1000
+
+            match = (
+                primary_result['success'] and shadow_result['success']
+                and primary_result['output'] == shadow_result['output']
+            )
+
+            record = {
+                "timestamp": time.time(),
+                "input": compose_code,
+                "primary": {
+                    "success": primary_result['success'],
+                    "output": primary_result.get('output'),
+                    "error": primary_result.get('error'),
+                    "latency_ms": round(primary_latency_ms, 2)
+                },
+                "shadow": {
+                    "provider": self.shadow_converter.provider.value,
+                    "model": self.shadow_converter.model_name,
+                    "few_shot_count": self.shadow_converter.few_shot_count,
+                    "success": shadow_result['success'],
+                    "output": shadow_result.get('output'),
+                    "error": shadow_result.get('error'),
+                    "latency_ms": round(shadow_latency_ms, 2)
+                },
+                "match": match
+            }
+
+            with self.lock:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.stats['completed'] += 1
+                self.stats['matches'] += int(match)
+                self.stats['primary_latency_ms'] += primary_latency_ms
+                self.stats['shadow_latency_ms'] += shadow_latency_ms
+
+        except Exception as e:
+            print(f"❌ Shadow conversion error: {e}")
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def get_stats(self) -> dict:
+        """
+        Get shadow comparison statistics
+
+        Returns:
+            Counts, match rate and average latencies
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            pending = self.pending
+
+        completed = stats['completed']
+        return {
+            "fraction": self.fraction,
+            "provider": self.shadow_converter.provider.value,
+            "model": self.shadow_converter.model_name,
+            "mirrored": stats['mirrored'],
+            "dropped": stats['dropped'],
+            "pending": pending,
+            "completed": completed,
+            "match_rate": stats['matches'] / completed if completed else None,
+            "avg_primary_latency_ms": stats['primary_latency_ms'] / completed if completed else None,
+            "avg_shadow_latency_ms": stats['shadow_latency_ms'] / completed if completed else None
+        }
+
+    def shutdown(self):
+        """
+        Stop accepting mirrors and wait for running ones
+        """
+        self.fraction = 0
+        self.executor.shutdown(wait=True)
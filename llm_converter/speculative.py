@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Speculative conversion: answer provisionally, verify with the model in the background
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .canonicalizer import canonical_key
+
+class SpeculativeRunner:
+    """
+    Return a provisional result at once and verify it with the model later
+
+    The provisional answer comes from the converter's template cache or
+    from an optional local converter, e.g. the subtrees a SubtreeMemoizer
+    has already converted. The model conversion then runs on
+    the runner's thread pool; its result replaces the cached entry and is
+    passed to on_verified with corrected set when it differs from what
+    the caller was given. Inputs without a provisional answer, and
+    requests arriving while max_pending verifications are waiting, are
+    converted synchronously as usual.
+    """
+
+    def __init__(self, local_convert_fn=None, max_workers: int = 4, max_pending: int = 100):
+        """
+        Initialize the runner
+
+        Args:
+            local_convert_fn: Optional function (converter, compose_code)
+                returning a result dictionary without a model call, e.g.
+                SubtreeMemoizer.convert_cached of the converter's namespace
+            max_workers: Concurrent verifications
+            max_pending: Maximum queued verifications before converting synchronously
+        """
+        self.local_convert_fn = local_convert_fn
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.stats = {
+            'provisional': 0,
+            'synchronous': 0,
+            'confirmed': 0,
+            'corrected': 0,
+            'failed': 0,
+            'verify_latency_ms': 0.0
+        }
+
+    def convert(self, converter, compose_code: str, on_verified=None, priority=None, deadline=None) -> dict:
+        """
+        Convert Compose code, provisionally if possible
+
+        Args:
+            converter: ComposeToJsonConverter verifying the result
+            compose_code: Jetpack Compose code
+            on_verified: Called with the verified result dictionary, which
+                has provisional False and corrected set
+            priority: Request class used by the scheduler
+            deadline: Absolute time.monotonic() deadline of a synchronous conversion
+
+        Returns:
+            Result dictionary; provisional is True if it is still being verified
+        """
+        cached = converter._get_cached_result(canonical_key(compose_code))
+        if cached is not None and not cached.get('template_hit'):
+            result = {**cached, 'input': compose_code, 'cached': True}
+            converter.log_request(compose_code, result)
+            return result
+
+        provisional = cached or self._lookup_provisional(converter, compose_code)
+
+        with self.lock:
+            speculate = provisional is not None and self.pending < self.max_pending
+            if speculate:
+                self.pending += 1
+                self.stats['provisional'] += 1
+            else:
+                self.stats['synchronous'] += 1
+
+        if not speculate:
+            return converter.convert_compose_to_json(compose_code, priority, deadline)
+
+        provisional = {**provisional, 'input': compose_code, 'provisional': True}
+        converter.log_request(compose_code, provisional)
+        print(f"💨 Provisional result: {compose_code}")
+        self.executor.submit(self._verify, converter, compose_code, provisional, on_verified, priority)
+        return provisional
+
+    def _lookup_provisional(self, converter, compose_code: str):
+        """
+        Get a result without a model call
+
+        Args:
+            converter: ComposeToJsonConverter
+            compose_code: Jetpack Compose code
+
+        Returns:
+            Result dictionary or None
+        """
+        templated = converter._lookup_template(compose_code)
+        if templated is not None:
+            return templated
+
+        if self.local_convert_fn is not None:
+            result = self.local_convert_fn(converter, compose_code)
+            if result and result.get('success'):
+                return result
+        return None
+
+    def _verify(self, converter, compose_code: str, provisional: dict, on_verified, priority):
+        """
+        Convert with the model and report whether the provisional result held
+
+        Args:
+            converter: ComposeToJsonConverter
+            compose_code: Jetpack Compose code
+            provisional: Result returned to the caller
+            on_verified: Callback receiving the verified result
+            priority: Request class used by the scheduler
+        """
+        try:
+            start = time.perf_counter()
+            result = converter.reconvert(compose_code, priority)
+            latency_ms = (time.perf_counter() - start) * 1000
+
+            corrected = result['success'] and result['output'] != provisional['output']
+            if corrected:
+                print(f"✏️ Provisional result corrected: {compose_code}")
+
+            with self.lock:
+                if not result['success']:
+                    self.stats['failed'] += 1
+                elif corrected:
+                    self.stats['corrected'] += 1
+                else:
+                    self.stats['confirmed'] += 1
+                self.stats['verify_latency_ms'] += latency_ms
+
+            if on_verified is not None:
+                on_verified({**result, 'input': compose_code, 'provisional': False, 'corrected': corrected})
+
+        except Exception as e:
+            print(f"❌ Verification error: {e}")
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def get_stats(self) -> dict:
+        """
+        Get speculation statistics
+
+        Returns:
+            Counts, how often provisional results held, and average verification latency
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            pending = self.pending
+
+        verified = stats['confirmed'] + stats['corrected']
+        return {
+            'provisional': stats['provisional'],
+            'synchronous': stats['synchronous'],
+            'pending': pending,
+            'confirmed': stats['confirmed'],
+            'corrected': stats['corrected'],
+            'failed': stats['failed'],
+            'agreement_rate': stats['confirmed'] / verified if verified else None,
+            'avg_verify_latency_ms': (
+                stats['verify_latency_ms'] / (verified + stats['failed'])
+                if verified + stats['failed'] else None
+            )
+        }
+
+    def shutdown(self):
+        """
+        Wait for running verifications
+        """
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Subtree-level memoization for large Compose trees
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+from .canonicalizer import canonical_key
+from .compose_parser import parse_calls
+
+class SubtreeConversionError(Exception):
+    """
+    Raised when a subtree cannot be converted
+    """
+
+    def __init__(self, message: str, error_code: str = None):
+        super().__init__(message)
+        self.error_code = error_code
+
+class SubtreeMemoizer:
+    """
+    Convert Compose trees subtree by subtree, reusing cached JSON fragments
+
+    A node whose trailing lambda holds only composable calls is converted
+    as an empty shell, and its children are converted (or looked up)
+    separately and stitched back in as "children". Every subtree is cached
+    by the hash of its canonical code, so repeated rows and list items
+    are converted once.
+    """
+
+    def __init__(self, converter, convert_fn=None, max_entries: int = 10000):
+        """
+        Initialize the memoizer
+
+        Args:
+            converter: ComposeToJsonConverter used for unseen subtrees
+            convert_fn: Optional replacement for convert_compose_to_json,
+                e.g. a local parser with the same result format
+            max_entries: Maximum number of cached subtrees
+        """
+        self.converter = converter
+        self.convert_fn = convert_fn or converter.convert_compose_to_json
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def subtree_key(self, code: str) -> str:
+        """
+        Hash a subtree by its canonical code
+
+        Args:
+            code: Compose code of the subtree
+
+        Returns:
+            Hex digest used as cache key
+        """
+        return canonical_key(code)
+
+    def _lookup(self, key: str):
+        """
+        Get a cached fragment
+
+        Args:
+            key: Subtree key
+
+        Returns:
+            Copy of the cached JSON or None
+        """
+        with self.lock:
+            if key not in self.cache:
+                return None
+            self.cache.move_to_end(key)
+            return copy.deepcopy(self.cache[key])
+
+    def _count(self, stat: str):
+        """
+        Increment a statistic; conversions run on many threads
+
+        Args:
+            stat: "hits" or "misses"
+        """
+        with self.lock:
+            self.stats[stat] += 1
+
+    def _store(self, key: str, output):
+        """
+        Cache a fragment
+
+        Args:
+            key: Subtree key
+            output: Converted JSON
+        """
+        with self.lock:
+            self.cache[key] = copy.deepcopy(output)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def _convert_code(self, code: str, counters: dict, options: dict):
+        """
+        Convert a code fragment as a whole, with caching
+
+        Args:
+            code: Compose code
+            counters: Per-call counters
+            options: Keyword arguments for convert_fn, or None to use
+                cached subtrees only
+
+        Returns:
+            Converted JSON
+        """
+        key = self.subtree_key(code)
+        cached = self._lookup(key)
+        if cached is not None:
+            counters['cached'] += 1
+            self._count('hits')
+            return cached
+        if options is None:
+            raise SubtreeConversionError(f"Subtree not memoized: {code}", 'not_cached')
+
+        counters['converted'] += 1
+        self._count('misses')
+        result = self.convert_fn(code, **options)
+        if not result['success']:
+            raise SubtreeConversionError(f"{result['error']} (in: {code})", result.get('error_code'))
+        if not result.get('cached'):
+            counters['model'] += 1
+
+        self._store(key, result['output'])
+        return result['output']
+
+    def _child_calls(self, call: dict):
+        """
+        Get the composable children of a call's trailing lambda
+
+        Args:
+            call: Call from parse_calls()
+
+        Returns:
+            List of child calls or None if the lambda is not plain content
+        """
+        if not call['content'] or not call['content'].strip():
+            return None
+
+        children = parse_calls(call['content'])
+        if not children:
+            return None
+
+        # Composables are PascalCase; anything else (if, items, LaunchedEffect
+        # bodies) is converted together with its parent
+        if not all(child['name'].split('.')[-1][:1].isupper() for child in children):
+            return None
+
+        return children
+
+    def _convert_call(self, call: dict, counters: dict, options: dict):
+        """
+        Convert one call, stitching cached children into its shell
+
+        Args:
+            call: Call from parse_calls()
+            counters: Per-call counters
+            options: Keyword arguments for convert_fn, or None to use
+                cached subtrees only
+
+        Returns:
+            Converted JSON
+        """
+        counters['total'] += 1
+        key = self.subtree_key(call['text'])
+        cached = self._lookup(key)
+        if cached is not None:
+            counters['cached'] += 1
+            self._count('hits')
+            return cached
+
+        children = self._child_calls(call)
+        if children is None:
+            return self._convert_code(call['text'], counters, options)
+
+        shell_args = f"({call['args']})" if call['args'] is not None else ""
+        shell = dict(self._convert_code(f"{call['name']}{shell_args} {{ }}", counters, options))
+        shell['children'] = [self._convert_call(child, counters, options) for child in children]
+
+        self._store(key, shell)
+        return shell
+
+    def _assemble(self, compose_code: str, counters: dict, options):
+        """
+        Convert Compose code subtree by subtree
+
+        Args:
+            compose_code: Jetpack Compose code
+            counters: Per-call counters
+            options: Keyword arguments for convert_fn, or None to use
+                cached subtrees only
+
+        Returns:
+            Converted JSON
+        """
+        calls = parse_calls(compose_code)
+        if calls and len(calls) == 1:
+            return self._convert_call(calls[0], counters, options)
+        counters['total'] += 1
+        return self._convert_code(compose_code, counters, options)
+
+    def convert(self, compose_code: str, **options) -> dict:
+        """
+        Convert Compose code, converting only unseen subtrees
+
+        Args:
+            compose_code: Jetpack Compose code
+            **options: Passed to convert_fn (e.g. priority, deadline)
+
+        Returns:
+            Result dictionary with subtree statistics; cached is True when
+            no subtree reached the model
+        """
+        # model: subtrees converted by the model, not the converter's caches
+        counters = {'total': 0, 'cached': 0, 'converted': 0, 'model': 0}
+
+        try:
+            output = self._assemble(compose_code, counters, options)
+            model = counters.pop('model')
+            print(f"✅ Subtrees: {counters['total']} total, {counters['cached']} cached, {counters['converted']} converted")
+            return {
+                'success': True,
+                'input': compose_code,
+                'output': output,
+                'cached': model == 0,
+                'subtrees': counters
+            }
+
+        except SubtreeConversionError as e:
+            counters.pop('model')
+            print(f"❌ Subtree conversion error: {e}")
+            result = {
+                'success': False,
+                'input': compose_code,
+                'error': str(e),
+                'subtrees': counters
+            }
+            if e.error_code:
+                result['error_code'] = e.error_code
+            return result
+
+    def convert_cached(self, compose_code: str) -> dict:
+        """
+        Assemble a conversion from cached subtrees only, without model calls
+
+        Args:
+            compose_code: Jetpack Compose code
+
+        Returns:
+            Result dictionary like convert(); success is False, with
+            error_code "not_cached", if a subtree was never converted
+        """
+        counters = {'total': 0, 'cached': 0, 'converted': 0, 'model': 0}
+        try:
+            output = self._assemble(compose_code, counters, None)
+        except SubtreeConversionError as e:
+            return {
+                'success': False,
+                'input': compose_code,
+                'error': str(e),
+                'error_code': e.error_code
+            }
+
+        counters.pop('model')
+        return {
+            'success': True,
+            'input': compose_code,
+            'output': output,
+            'cached': True,
+            'subtrees': counters
+        }
+
+    def seed(self, compose_code: str, output):
+        """
+        Cache the fragments of a known conversion
+
+        The code is decomposed like in convert() and each subtree is paired
+        with the matching part of output. Subtrees whose children do not
+        line up with output["children"] are cached as a whole only.
+
+        Args:
+            compose_code: Jetpack Compose code
+            output: Its converted JSON
+        """
+        calls = parse_calls(compose_code)
+        if calls and len(calls) == 1:
+            self._seed_call(calls[0], output)
+        else:
+            self._store(self.subtree_key(compose_code), output)
+
+    def _seed_call(self, call: dict, output):
+        """
+        Cache one call and, when aligned, its shell and children
+
+        Args:
+            call: Call from parse_calls()
+            output: Its converted JSON
+        """
+        self._store(self.subtree_key(call['text']), output)
+
+        children = self._child_calls(call)
+        if children is None or not isinstance(output, dict):
+            return
+        child_outputs = output.get('children')
+        if not isinstance(child_outputs, list) or len(child_outputs) != len(children):
+            return
+
+        shell_args = f"({call['args']})" if call['args'] is not None else ""
+        shell = {key: value for key, value in output.items() if key != 'children'}
+        self._store(self.subtree_key(f"{call['name']}{shell_args} {{ }}"), shell)
+
+        for child, child_output in zip(children, child_outputs):
+            self._seed_call(child, child_output)
+
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics
+
+        Returns:
+            Hits, misses and cache size
+        """
+        with self.lock:
+            return {**self.stats, 'cached_subtrees': len(self.cache)}
+
+    def clear(self):
+        """
+        Clear cached subtrees
+        """
+        with self.lock:
+            self.cache.clear()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Template cache: reuse conversions of inputs that differ only in literals
+"""
+
+import threading
+from collections import OrderedDict
+
+from .canonicalizer import parameterize, identifier_set
+
+class _Slot:
+    """
+    Placeholder for the literal at a position in the input
+    """
+
+    __slots__ = ('index',)
+
+    def __init__(self, index: int):
+        self.index = index
+
+class TemplateCache:
+    """
+    Cache converted JSON skeletons keyed by literal-free input structure
+
+    After a successful conversion, literal values in the output are
+    traced back to the string and number literals of the input and
+    replaced by slots. Another input with the same skeleton is answered
+    by filling the slots with its own literals, without a model call.
+
+    A template is only kept if it is unambiguous: literals of one kind
+    are distinct and differ from the input's identifiers, every literal
+    appears in the output as a whole value, no other output string
+    embeds a string literal, and filling the template with the
+    original literals reproduces the output exactly.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of templates
+        """
+        self.max_entries = max_entries
+        self.templates = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'learned': 0, 'rejected': 0}
+
+    def lookup(self, compose_code: str):
+        """
+        Answer an input from a template
+
+        Args:
+            compose_code: Jetpack Compose code
+
+        Returns:
+            Converted JSON or None if no template matches
+        """
+        skeleton_key, literals = parameterize(compose_code)
+        if not literals:
+            return None
+
+        with self.lock:
+            template = self.templates.get(skeleton_key)
+            if template is None:
+                self.stats['misses'] += 1
+                return None
+            self.templates.move_to_end(skeleton_key)
+            self.stats['hits'] += 1
+
+        return self._fill(template, [value for _, value in literals])
+
+    def learn(self, compose_code: str, output) -> bool:
+        """
+        Derive and store the template of a conversion
+
+        Args:
+            compose_code: Jetpack Compose code
+            output: Its converted JSON
+
+        Returns:
+            True if a verified template was stored
+        """
+        skeleton_key, literals = parameterize(compose_code)
+        if not literals:
+            return False
+
+        template = self._derive(output, literals, identifier_set(compose_code))
+        values = [value for _, value in literals]
+        if template is None or self._fill(template, values) != output:
+            with self.lock:
+                self.stats['rejected'] += 1
+            return False
+
+        with self.lock:
+            self.templates[skeleton_key] = template
+            self.templates.move_to_end(skeleton_key)
+            self.stats['learned'] += 1
+            while len(self.templates) > self.max_entries:
+                self.templates.popitem(last=False)
+        return True
+
+    def forget(self, compose_code: str):
+        """
+        Drop the template of an input's skeleton
+
+        Args:
+            compose_code: Jetpack Compose code
+        """
+        skeleton_key, _ = parameterize(compose_code)
+        with self.lock:
+            self.templates.pop(skeleton_key, None)
+
+    def _derive(self, output, literals: list, identifiers: frozenset):
+        """
+        Replace literal values in an output by slots
+
+        Args:
+            output: Converted JSON
+            literals: Literals from parameterize()
+            identifiers: Identifiers of the input
+
+        Returns:
+            Template, or None if the mapping is ambiguous
+        """
+        strings = {}
+        numbers = {}
+        for index, (kind, value) in enumerate(literals):
+            table = strings if kind == 'string' else numbers
+            # Two equal literals: no way to tell which one an output value came from
+            if value in table:
+                return None
+            # Text("Red", color = Color.Red): "Red" in the output is ambiguous
+            if kind == 'string' and value in identifiers:
+                return None
+            table[value] = index
+
+        used = set()
+
+        def walk(node):
+            if isinstance(node, dict):
+                result = {}
+                for key, value in node.items():
+                    if key in strings:
+                        raise ValueError(key)
+                    result[key] = walk(value)
+                return result
+            if isinstance(node, list):
+                return [walk(item) for item in node]
+            if isinstance(node, str):
+                if node in strings:
+                    used.add(strings[node])
+                    return _Slot(strings[node])
+                # A literal embedded in a larger string, like println("Hi"),
+                # cannot be swapped; short literals only count when quoted
+                if any(f'"{literal}"' in node or (len(literal) >= 3 and literal in node)
+                       for literal in strings):
+                    raise ValueError(node)
+                return node
+            if isinstance(node, (int, float)) and not isinstance(node, bool) and node in numbers:
+                used.add(numbers[node])
+                return _Slot(numbers[node])
+            return node
+
+        try:
+            template = walk(output)
+        except ValueError:
+            return None
+
+        # An unused literal may have been transformed beyond recognition
+        if len(used) != len(literals):
+            return None
+        return template
+
+    def _fill(self, template, values: list):
+        """
+        Substitute literals into a template
+
+        Args:
+            template: Template from _derive()
+            values: Literal values in source order
+
+        Returns:
+            Converted JSON
+        """
+        if isinstance(template, _Slot):
+            return values[template.index]
+        if isinstance(template, dict):
+            return {key: self._fill(value, values) for key, value in template.items()}
+        if isinstance(template, list):
+            return [self._fill(item, values) for item in template]
+        return template
+
+    def clear(self):
+        """
+        Remove all templates
+        """
+        with self.lock:
+            self.templates.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Get template cache statistics
+
+        Returns:
+            Counters and number of templates
+        """
+        with self.lock:
+            return {**self.stats, 'templates': len(self.templates)}
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tenants: API key identification, quotas and usage accounting
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Optional
+
+from .llm_base_converter import estimate_tokens
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,
+    cache_hits INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant, day)
+);
+"""
+
+class QuotaExceeded(Exception):
+    """
+    Raised when a tenant is over its request or token quota
+    """
+    pass
+
+def _hash_key(api_key: str) -> str:
+    """
+    Hash an API key for lookup
+
+    Args:
+        api_key: Tenant API key
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+def _today() -> str:
+    """
+    Get the current UTC day used for daily quotas
+
+    Returns:
+        Day as YYYY-MM-DD
+    """
+    return time.strftime('%Y-%m-%d', time.gmtime())
+
+class Tenant:
+    """
+    A team calling the API, with its limits
+
+    Set as a converter's quota: tokens are reserved right before each
+    model call and the call is charged to the tenant, so cache hits cost
+    nothing. Today's token use is kept in memory and reservations are
+    made under the registry lock, so concurrent calls cannot together
+    exceed tokens_per_day.
+    """
+
+    def __init__(self, registry, name: str, requests_per_minute: Optional[int] = None,
+                 tokens_per_day: Optional[int] = None):
+        """
+        Initialize the tenant
+
+        Args:
+            registry: Owning TenantRegistry
+            name: Tenant name, also its cache namespace
+            requests_per_minute: Request quota or None for unlimited
+            tokens_per_day: Prompt + output token quota or None for unlimited
+        """
+        self.registry = registry
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_day = tokens_per_day
+        self._recent_requests = deque()
+        # Tokens used and reserved on _tokens_day, loaded on first use each day
+        self._tokens_day = None
+        self._tokens_used = 0
+
+    def check_request(self):
+        """
+        Count a request against the per-minute quota
+
+        Raises:
+            QuotaExceeded: Too many requests in the last minute
+        """
+        with self.registry.lock:
+            now = time.monotonic()
+            while self._recent_requests and now - self._recent_requests[0] >= 60:
+                self._recent_requests.popleft()
+
+            if self.requests_per_minute is not None and len(self._recent_requests) >= self.requests_per_minute:
+                self.registry._add_usage(self.name, rejected=1)
+                raise QuotaExceeded(f"Tenant {self.name} is over {self.requests_per_minute} requests per minute")
+
+            self._recent_requests.append(now)
+
+    def _roll_day(self):
+        """
+        Load today's token use when the day changes
+        """
+        day = _today()
+        if self._tokens_day == day:
+            return
+        # Database first, then the registry lock, as in flush()
+        with self.registry._db_lock, self.registry.lock:
+            if self._tokens_day != day:
+                self._tokens_used = self.registry._get_tokens(self.name, day)
+                self._tokens_day = day
+
+    def check_tokens(self, prompt_tokens: int, output_tokens: int = 0):
+        """
+        Reserve the tokens of a model call in today's quota
+
+        The reservation is settled by record_call(), or returned with
+        release_tokens() if the call is not made.
+
+        Args:
+            prompt_tokens: Estimated prompt tokens of the call
+            output_tokens: Output token limit of the call
+
+        Raises:
+            QuotaExceeded: The call would exceed the daily quota
+        """
+        if self.tokens_per_day is None:
+            return
+
+        self._roll_day()
+        with self.registry.lock:
+            if self._tokens_used + prompt_tokens + output_tokens > self.tokens_per_day:
+                self.registry._add_usage(self.name, rejected=1)
+                raise QuotaExceeded(f"Tenant {self.name} is over {self.tokens_per_day} tokens per day")
+            self._tokens_used += prompt_tokens + output_tokens
+
+    def release_tokens(self, prompt_tokens: int, output_tokens: int = 0):
+        """
+        Return the reservation of a model call that was not made
+
+        Args:
+            prompt_tokens: Reserved prompt tokens
+            output_tokens: Reserved output tokens
+        """
+        if self.tokens_per_day is None:
+            return
+
+        with self.registry.lock:
+            if self._tokens_day == _today():
+                self._tokens_used -= prompt_tokens + output_tokens
+
+    def record_call(self, prompt_tokens: int, response: Optional[str], reserved_output_tokens: int = 0):
+        """
+        Account a model call
+
+        Args:
+            prompt_tokens: Estimated prompt tokens
+            response: Model response or None
+            reserved_output_tokens: Output tokens reserved by check_tokens(),
+                replaced by the actual ones
+        """
+        output_tokens = estimate_tokens(response or '')
+        with self.registry.lock:
+            if self.tokens_per_day is not None and self._tokens_day == _today():
+                self._tokens_used += output_tokens - reserved_output_tokens
+            self.registry._add_usage(
+                self.name,
+                calls=1,
+                prompt_tokens=prompt_tokens,
+                output_tokens=output_tokens
+            )
+
+    def record_request(self, result: dict, latency_ms: float):
+        """
+        Account a finished request
+
+        Args:
+            result: Converter result dictionary
+            latency_ms: Request latency
+        """
+        self.registry._add_usage(
+            self.name,
+            requests=1,
+            cache_hits=int(bool(result.get('cached'))),
+            latency_ms=latency_ms
+        )
+
+class TenantRegistry:
+    """
+    Tenants loaded from a JSON config, with usage in SQLite
+
+    The config maps tenant names to their key and limits:
+
+        {"mobile": {"api_key": "...", "requests_per_minute": 120,
+                    "tokens_per_day": 2000000}}
+
+    Usage counters are kept per tenant and UTC day, so daily quotas
+    survive restarts. Requests and calls only add to counters in memory;
+    a background thread writes them to SQLite every flush_interval
+    seconds, and reads and close() flush first.
+    """
+
+    def __init__(self, config_path: str, usage_db: str = "usage.sqlite3",
+                 flush_interval: float = 5.0):
+        """
+        Initialize the registry
+
+        Args:
+            config_path: JSON tenant config
+            usage_db: SQLite file receiving usage counters
+            flush_interval: Seconds between writes of usage counters
+        """
+        self.lock = threading.RLock()
+        self.tenants = {}
+        # (tenant, day) -> counter increments not written yet
+        self._pending = defaultdict(Counter)
+        # Serializes use of the database connection
+        self._db_lock = threading.Lock()
+
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        for name, settings in config.items():
+            tenant = Tenant(
+                self,
+                name,
+                requests_per_minute=settings.get('requests_per_minute'),
+                tokens_per_day=settings.get('tokens_per_day')
+            )
+            self.tenants[_hash_key(settings['api_key'])] = tenant
+
+        self.db = sqlite3.connect(usage_db, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+        self.flush_interval = flush_interval
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="usage-flush", daemon=True)
+        self._flusher.start()
+
+        print(f"✅ {len(self.tenants)} tenants loaded")
+
+    def identify(self, api_key: Optional[str]) -> Optional[Tenant]:
+        """
+        Find the tenant of an API key
+
+        Args:
+            api_key: Key sent by the client
+
+        Returns:
+            Tenant or None if unknown
+        """
+        if not api_key:
+            return None
+        return self.tenants.get(_hash_key(api_key))
+
+    def get_tenant(self, name: str) -> Optional[Tenant]:
+        """
+        Find a tenant by name
+
+        Args:
+            name: Tenant name
+
+        Returns:
+            Tenant or None if unknown
+        """
+        for tenant in self.tenants.values():
+            if tenant.name == name:
+                return tenant
+        return None
+
+    def _add_usage(self, tenant: str, **counters):
+        """
+        Add to today's usage counters of a tenant, in memory until the next flush
+
+        Args:
+            tenant: Tenant name
+            **counters: Column increments
+        """
+        with self.lock:
+            self._pending[(tenant, _today())].update(counters)
+
+    def _get_tokens(self, tenant: str, day: str) -> int:
+        """
+        Get the tokens a tenant used on a day, written or not
+
+        Called with _db_lock and lock held, so no flush runs in between.
+
+        Args:
+            tenant: Tenant name
+            day: Day as YYYY-MM-DD
+
+        Returns:
+            Prompt plus output tokens
+        """
+        row = self.db.execute(
+            "SELECT prompt_tokens + output_tokens FROM usage WHERE tenant = ? AND day = ?",
+            (tenant, day)
+        ).fetchone()
+        pending = self._pending.get((tenant, day), {})
+        return (row[0] if row else 0) + pending.get('prompt_tokens', 0) + pending.get('output_tokens', 0)
+
+    def flush(self):
+        """
+        Write usage counters accumulated in memory to SQLite
+        """
+        with self._db_lock:
+            with self.lock:
+                pending, self._pending = self._pending, defaultdict(Counter)
+            for (tenant, day), counters in pending.items():
+                columns = ', '.join(counters)
+                placeholders = ', '.join('?' for _ in counters)
+                updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in counters)
+                self.db.execute(
+                    f"INSERT INTO usage (tenant, day, {columns}) VALUES (?, ?, {placeholders}) "
+                    f"ON CONFLICT (tenant, day) DO UPDATE SET {updates}",
+                    (tenant, day, *counters.values())
+                )
+            self.db.commit()
+
+    def _flush_periodically(self):
+        """Flush usage counters until the registry is closed"""
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"❌ Error writing usage: {e}")
+
+    def get_usage(self, tenant: Optional[str] = None, since: Optional[str] = None) -> dict:
+        """
+        Get usage counters summed per tenant
+
+        Args:
+            tenant: Only this tenant
+            since: First day (YYYY-MM-DD) included
+
+        Returns:
+            Dictionary of tenant name to counters, with average latency
+        """
+        query = (
+            "SELECT tenant, SUM(requests) AS requests, SUM(calls) AS calls, "
+            "SUM(cache_hits) AS cache_hits, SUM(prompt_tokens) AS prompt_tokens, "
+            "SUM(output_tokens) AS output_tokens, SUM(latency_ms) AS latency_ms, "
+            "SUM(rejected) AS rejected FROM usage WHERE 1 = 1"
+        )
+        params = []
+        if tenant is not None:
+            query += " AND tenant = ?"
+            params.append(tenant)
+        if since is not None:
+            query += " AND day >= ?"
+            params.append(since)
+        query += " GROUP BY tenant"
+
+        self.flush()
+        with self._db_lock:
+            rows = self.db.execute(query, params).fetchall()
+
+        usage = {}
+        for row in rows:
+            counters = dict(row)
+            name = counters.pop('tenant')
+            latency_ms = counters.pop('latency_ms')
+            counters['avg_latency_ms'] = latency_ms / counters['requests'] if counters['requests'] else None
+            usage[name] = counters
+        return usage
+
+    def close(self):
+        """
+        Write pending usage and close the usage database
+        """
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        with self._db_lock:
+            self.db.close()
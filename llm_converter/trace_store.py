@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Append-only compressed store of model calls
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import zlib
+from typing import Iterator, Optional
+
+def prompt_fingerprint(prompt: str) -> str:
+    """
+    Fingerprint a prompt
+
+    Args:
+        prompt: Complete prompt
+
+    Returns:
+        Short hex digest
+    """
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+class TraceStore:
+    """
+    Record prompts and responses as compressed JSONL segments
+
+    Segments are named traces-000001.jsonl.gz (or .zst) and rotated after
+    segment_size records. Every closed segment gets a line in index.jsonl
+    with its time range and record count, so readers can skip segments
+    outside a time window.
+    """
+
+    def __init__(self, directory: str, segment_size: int = 10000,
+                 compression: str = "gzip", store_prompts: bool = True):
+        """
+        Initialize the trace store
+
+        Args:
+            directory: Directory holding segments and index
+            segment_size: Records per segment before rotation
+            compression: "gzip" or "zstd" (requires zstandard)
+            store_prompts: Keep full prompts (needed for replay)
+        """
+        if compression not in ("gzip", "zstd"):
+            raise ValueError(f"Unsupported compression: {compression}")
+
+        self.directory = directory
+        self.segment_size = segment_size
+        self.compression = compression
+        self.store_prompts = store_prompts
+        self.lock = threading.Lock()
+
+        self._raw_file = None
+        self._writer = None
+        self._segment_name = None
+        self._segment_info = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def index_path(self) -> str:
+        """Path of the segment index"""
+        return os.path.join(self.directory, "index.jsonl")
+
+    def _extension(self) -> str:
+        """Segment file extension"""
+        return ".jsonl.gz" if self.compression == "gzip" else ".jsonl.zst"
+
+    def _segment_names(self) -> list:
+        """
+        List segment files in order
+
+        Returns:
+            Sorted segment file names
+        """
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("traces-") and name.endswith((".jsonl.gz", ".jsonl.zst"))
+        )
+
+    def _open_segment(self):
+        """
+        Start a new segment after the last existing one
+        """
+        names = self._segment_names()
+        number = int(names[-1].split('-')[1].split('.')[0]) + 1 if names else 1
+        self._segment_name = f"traces-{number:06d}{self._extension()}"
+        self._segment_info = {"segment": self._segment_name, "count": 0, "first_ts": None, "last_ts": None}
+
+        path = os.path.join(self.directory, self._segment_name)
+        if self.compression == "gzip":
+            self._raw_file = None
+            self._writer = gzip.open(path, 'ab')
+        else:
+            import zstandard
+            self._raw_file = open(path, 'ab')
+            self._writer = zstandard.ZstdCompressor().stream_writer(self._raw_file)
+
+    def _close_segment(self):
+        """
+        Close the current segment and add it to the index
+        """
+        if self._writer is None:
+            return
+
+        self._writer.close()
+        if self._raw_file is not None:
+            self._raw_file.close()
+
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self._segment_info) + "\n")
+
+        self._writer = None
+        self._raw_file = None
+        self._segment_name = None
+        self._segment_info = None
+
+    def record(self, trace: dict):
+        """
+        Append a trace
+
+        Args:
+            trace: Dictionary with timestamp, provider, model, prompt,
+                input, response and latency_ms
+        """
+        trace = dict(trace)
+        prompt = trace.get('prompt') or ""
+        trace['prompt_fingerprint'] = prompt_fingerprint(prompt)
+        if not self.store_prompts:
+            trace.pop('prompt', None)
+
+        line = (json.dumps(trace, ensure_ascii=False) + "\n").encode('utf-8')
+
+        with self.lock:
+            if self._writer is None:
+                self._open_segment()
+
+            self._writer.write(line)
+            # Make the record readable without closing the segment
+            if self.compression == "gzip":
+                self._writer.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                import zstandard
+                self._writer.flush(zstandard.FLUSH_BLOCK)
+
+            info = self._segment_info
+            info['count'] += 1
+            timestamp = trace.get('timestamp')
+            if info['first_ts'] is None:
+                info['first_ts'] = timestamp
+            info['last_ts'] = timestamp
+
+            if info['count'] >= self.segment_size:
+                self._close_segment()
+
+    def read_index(self) -> dict:
+        """
+        Read the segment index
+
+        Returns:
+            Mapping of segment name to index entry
+        """
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return {entry['segment']: entry for entry in entries}
+
+    def _read_segment(self, name: str) -> Iterator[dict]:
+        """
+        Read the records of a segment
+
+        Args:
+            name: Segment file name
+
+        Yields:
+            Trace dictionaries
+        """
+        path = os.path.join(self.directory, name)
+        if name.endswith(".gz"):
+            f = gzip.open(path, 'rt', encoding='utf-8')
+        else:
+            import io
+            import zstandard
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+            f = io.TextIOWrapper(raw, encoding='utf-8')
+
+        with f:
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            except (EOFError, json.JSONDecodeError):
+                # Segment still being written or truncated by a crash
+                return
+
+    def iter_traces(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[dict]:
+        """
+        Iterate over recorded traces in append order
+
+        Args:
+            since: Only traces with timestamp >= since
+            until: Only traces with timestamp <= until
+
+        Yields:
+            Trace dictionaries
+        """
+        index = self.read_index()
+
+        for name in self._segment_names():
+            entry = index.get(name)
+            if entry and entry['count']:
+                if since is not None and entry['last_ts'] is not None and entry['last_ts'] < since:
+                    continue
+                if until is not None and entry['first_ts'] is not None and entry['first_ts'] > until:
+                    continue
+
+            for trace in self._read_segment(name):
+                timestamp = trace.get('timestamp', 0)
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp > until:
+                    continue
+                yield trace
+
+    def close(self):
+        """
+        Close the open segment
+        """
+        with self.lock:
+            self._close_segment()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tracing spans for conversions, compatible with OpenTelemetry
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+# Span of the current context; the scheduler runs calls in the submitter's
+# context, so provider spans nest under the conversion that queued them
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+# Active exporter; None disables tracing
+_exporter = None
+
+class RemoteParent:
+    """
+    Parent span received from a caller in a W3C traceparent header
+    """
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+def parse_traceparent(header: Optional[str]) -> Optional[RemoteParent]:
+    """
+    Parse a W3C traceparent header ("00-<trace id>-<span id>-<flags>")
+
+    Args:
+        header: Header value
+
+    Returns:
+        Remote parent, or None if the header is missing or invalid
+    """
+    if not header:
+        return None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return RemoteParent(parts[1], parts[2])
+
+class Span:
+    """
+    Timed operation with attributes
+
+    Use it as a context manager: entering makes it the parent of spans
+    started in the same context, leaving ends and exports it. An
+    exception leaving the span sets an error status.
+    """
+
+    recording = True
+
+    def __init__(self, name: str, attributes: Optional[dict] = None, parent=None):
+        """
+        Initialize the span
+
+        Args:
+            name: Operation name
+            attributes: Initial attributes
+            parent: Parent Span or RemoteParent (current span if None)
+        """
+        parent = parent or _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = "OK"
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict):
+        self.attributes.update(attributes)
+
+    def record_error(self, error):
+        self.status = "ERROR"
+        self.error = str(error)
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header pointing at this span"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_error(exc)
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(self)
+        return False
+
+    def to_dict(self) -> dict:
+        """
+        Get the span in the field names of the OTLP JSON encoding
+
+        Returns:
+            Span dictionary
+        """
+        span = {
+            "name": self.name,
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status
+        }
+        if self.error is not None:
+            span["error"] = self.error
+        return span
+
+class _NoopSpan:
+    """
+    Span returned while tracing is disabled; every method does nothing
+    """
+
+    recording = False
+    traceparent = None
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def set_attributes(self, attributes: dict):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+class _OtelSpan:
+    """
+    Span handed to the OpenTelemetry SDK
+    """
+
+    recording = True
+
+    def __init__(self, tracer, name: str, attributes: Optional[dict] = None, parent=None):
+        from opentelemetry import trace
+        context = None
+        if isinstance(parent, RemoteParent):
+            context = trace.set_span_in_context(trace.NonRecordingSpan(trace.SpanContext(
+                trace_id=int(parent.trace_id, 16),
+                span_id=int(parent.span_id, 16),
+                is_remote=True,
+                trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED)
+            )))
+        self._manager = tracer.start_as_current_span(name, context=context, attributes=_otel_attributes(attributes))
+        self._span = None
+
+    def set_attribute(self, key: str, value):
+        self._span.set_attributes(_otel_attributes({key: value}))
+
+    def set_attributes(self, attributes: dict):
+        self._span.set_attributes(_otel_attributes(attributes))
+
+    def record_error(self, error):
+        from opentelemetry.trace import Status, StatusCode
+        self._span.set_status(Status(StatusCode.ERROR, str(error)))
+
+    @property
+    def traceparent(self) -> str:
+        context = self._span.get_span_context()
+        return f"00-{context.trace_id:032x}-{context.span_id:016x}-01"
+
+    def __enter__(self):
+        self._span = self._manager.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._manager.__exit__(exc_type, exc, tb)
+
+def _otel_attributes(attributes: Optional[dict]) -> dict:
+    """
+    Drop None values, which OpenTelemetry attributes cannot hold
+
+    Args:
+        attributes: Attributes
+
+    Returns:
+        Attributes without None values
+    """
+    return {key: value for key, value in (attributes or {}).items() if value is not None}
+
+class _StreamExporter:
+    """
+    Write finished spans as JSON lines to a file or the console
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the exporter
+
+        Args:
+            path: JSONL file to append to; standard error if None
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self.lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self._file.flush()
+            else:
+                print(f"🔭 {line}", file=sys.stderr)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+class _OtelExporter:
+    """
+    Create spans with the OpenTelemetry SDK; its configured exporters send them
+    """
+
+    def __init__(self):
+        from opentelemetry import trace
+        self.tracer = trace.get_tracer("llm_converter")
+
+    def close(self):
+        pass
+
+def configure_tracing(exporter: Optional[str] = None, path: Optional[str] = None):
+    """
+    Enable or disable tracing
+
+    Exporters:
+        "console": one JSON line per span on standard error
+        "file": one JSON line per span appended to path
+        "otel": spans created with the installed OpenTelemetry SDK and
+            sent by the exporters configured for it (e.g. OTLP)
+
+    Spans use the OTLP JSON field names and W3C trace ids, so file output
+    can be loaded into OpenTelemetry tooling.
+
+    Args:
+        exporter: "console", "file", "otel", or None to disable
+        path: Output file of the "file" exporter
+    """
+    global _exporter
+
+    if exporter not in (None, "", "console", "file", "otel"):
+        raise ValueError(f"Unknown tracing exporter: {exporter}")
+    if exporter == "file" and not path:
+        raise ValueError("The file exporter needs a path")
+
+    previous = _exporter
+    if exporter == "console":
+        _exporter = _StreamExporter()
+    elif exporter == "file":
+        _exporter = _StreamExporter(path)
+    elif exporter == "otel":
+        _exporter = _OtelExporter()
+    else:
+        _exporter = None
+
+    if previous is not None:
+        previous.close()
+    if _exporter is not None:
+        print(f"✅ Tracing enabled: {exporter}{f' ({path})' if path else ''}")
+
+def tracing_enabled() -> bool:
+    return _exporter is not None
+
+def start_span(name: str, attributes: Optional[dict] = None, parent=None):
+    """
+    Start a span, to be used as a context manager
+
+    While tracing is disabled this returns a shared no-op span, so
+    instrumented code pays one global lookup. Check span.recording before
+    computing attributes that cost something.
+
+    Args:
+        name: Operation name
+        attributes: Initial attributes
+        parent: Parent Span or RemoteParent (current span if None)
+
+    Returns:
+        Span
+    """
+    exporter = _exporter
+    if exporter is None:
+        return NOOP_SPAN
+    if isinstance(exporter, _OtelExporter):
+        return _OtelSpan(exporter.tracer, name, attributes, parent)
+    return Span(name, attributes, parent)
+
+def current_span():
+    """
+    Get the span of the current context
+
+    Returns:
+        Current Span, or the no-op span outside spans or while disabled
+    """
+    if _exporter is None:
+        return NOOP_SPAN
+    if isinstance(_exporter, _OtelExporter):
+        from opentelemetry import trace
+        span = _OtelSpan.__new__(_OtelSpan)
+        span._span = trace.get_current_span()
+        return span
+    return _current_span.get() or NOOP_SPAN
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache warm-up: pinned dataset results, frequent inputs and startup snapshots
+"""
+
+import glob
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .canonicalizer import canonical_key
+from .scheduler import RequestPriority
+from .trace_store import TraceStore, prompt_fingerprint
+
+# Format of snapshot files; older formats are ignored
+SNAPSHOT_VERSION = 1
+
+def _configuration_id(converter) -> str:
+    """
+    Identify a converter configuration across cache generations
+
+    Converters differing in provider, model, output format or few-shot
+    settings (e.g. cascade tiers) run side by side, each with its own
+    snapshot; a new prompt or dataset starts a new generation of the
+    same configuration.
+
+    Args:
+        converter: ComposeToJsonConverter
+
+    Returns:
+        Short hex digest
+    """
+    return prompt_fingerprint("\n".join([
+        converter.provider.value,
+        converter.model_name,
+        converter.output_format,
+        str(converter.few_shot_count),
+        str(converter.adaptive_few_shot)
+    ]))
+
+def _snapshot_path(converter, directory: str) -> str:
+    """
+    Get the snapshot file of a converter's configuration and cache generation
+
+    Args:
+        converter: ComposeToJsonConverter
+        directory: Snapshot directory
+
+    Returns:
+        Path of the snapshot file
+    """
+    return os.path.join(directory, f"cache-{_configuration_id(converter)}-{converter.cache_fingerprint()}.json")
+
+def save_cache_snapshot(converter, directory: str, keep: int = 3) -> str:
+    """
+    Write the pinned and cached results of a converter
+
+    Each cache generation (prompt and model fingerprint, see
+    cache_fingerprint) has its own file, so workers on a new prompt or
+    model never load stale results. Results are written in recency order, so loading keeps the most
+    recently used ones when the cache is smaller. Only the newest keep
+    generations of the converter's configuration are kept; snapshots of
+    other configurations are left alone.
+
+    Args:
+        converter: ComposeToJsonConverter
+        directory: Snapshot directory
+        keep: Snapshot files of this configuration kept
+
+    Returns:
+        Path of the snapshot file
+    """
+    os.makedirs(directory, exist_ok=True)
+    fingerprint = converter.cache_fingerprint()
+    path = _snapshot_path(converter, directory)
+
+    with converter._cache_lock:
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "fingerprint": fingerprint,
+            "provider": converter.provider.value,
+            "model": converter.model_name,
+            "created_at": time.time(),
+            "pinned": dict(converter.pinned_results),
+            "results": list(converter.result_cache.items())
+        }
+
+    # Write then rename, so workers never read a partial snapshot
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(temporary, path)
+
+    pattern = os.path.join(directory, f"cache-{_configuration_id(converter)}-*.json")
+    snapshots = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+    for old in snapshots[keep:]:
+        os.remove(old)
+
+    print(f"💾 Cache snapshot: {path} ({len(snapshot['pinned'])} pinned, {len(snapshot['results'])} cached)")
+    return path
+
+def load_cache_snapshot(converter, directory: str, include_results: bool = True) -> int:
+    """
+    Load the snapshot of a converter's cache generation, if there is one
+
+    Args:
+        converter: ComposeToJsonConverter
+        directory: Snapshot directory
+        include_results: Also load cached traffic results, not only pinned
+            ones (off for converters of other cache namespaces)
+
+    Returns:
+        Number of loaded results
+    """
+    fingerprint = converter.cache_fingerprint()
+    path = _snapshot_path(converter, directory)
+    if not os.path.exists(path):
+        print(f"ℹ️ No cache snapshot for this prompt and model: {path}")
+        return 0
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading cache snapshot: {e}")
+        return 0
+
+    if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("fingerprint") != fingerprint:
+        print(f"⚠️ Ignoring cache snapshot of another generation: {path}")
+        return 0
+
+    results = snapshot["results"] if include_results else []
+    with converter._cache_lock:
+        converter.pinned_results.update(snapshot["pinned"])
+        for key, result in results:
+            converter.result_cache[key] = result
+            converter.result_cache.move_to_end(key)
+        while len(converter.result_cache) > converter.cache_size:
+            converter.result_cache.popitem(last=False)
+
+    print(f"✅ Cache snapshot loaded: {len(snapshot['pinned'])} pinned, {len(results)} cached")
+    return len(snapshot["pinned"]) + len(results)
+
+def top_trace_inputs(trace_dir: str, top_n: int, since: Optional[float] = None) -> list:
+    """
+    Find the most frequent inputs of recorded traffic
+
+    Requests are counted from the request log (the requests/ directory
+    of the trace directory), which has one record per request, cache
+    hits included. Without one, model call traces are counted once per
+    conversion: repairs and retries of a conversion share its id, and
+    calls outside a client conversion (speculative verification,
+    evaluation) are skipped. Inputs with the same canonical form are
+    counted together.
+
+    Args:
+        trace_dir: TraceStore directory
+        top_n: Number of inputs
+        since: Only traces after this Unix timestamp
+
+    Returns:
+        (input, count) pairs, most frequent first
+    """
+    request_dir = os.path.join(trace_dir, "requests")
+    from_requests = os.path.isdir(request_dir)
+    store = TraceStore(request_dir if from_requests else trace_dir)
+
+    counts = Counter()
+    inputs = {}
+    seen = set()
+    for trace in store.iter_traces(since):
+        compose_code = (trace.get('input') or '').strip()
+        if not compose_code:
+            continue
+        if not from_requests and 'conversion_id' in trace:
+            # Traces written before conversion ids have no field and count per call
+            conversion_id = trace['conversion_id']
+            if conversion_id is None or conversion_id in seen:
+                continue
+            seen.add(conversion_id)
+        key = canonical_key(compose_code)
+        counts[key] += 1
+        inputs.setdefault(key, compose_code)
+    return [(inputs[key], count) for key, count in counts.most_common(top_n)]
+
+def warm_cache(converter, snapshot_dir: str, seed_dataset: bool = True,
+               trace_dir: Optional[str] = None, top_n: int = 0, since: Optional[float] = None,
+               max_workers: int = 4, convert_fn=None) -> dict:
+    """
+    Warm a converter's cache and write a snapshot for new workers
+
+    The existing snapshot of the same generation is loaded first, so only
+    new inputs reach the model. Dataset examples are pinned as exact
+    matches; the top_n most frequent traced inputs are converted at bulk
+    priority.
+
+    Args:
+        converter: ComposeToJsonConverter
+        snapshot_dir: Snapshot directory
+        seed_dataset: Pin the training examples
+        trace_dir: TraceStore directory of recorded traffic
+        top_n: Frequent inputs to pre-convert
+        since: Only traces after this Unix timestamp
+        max_workers: Inputs converted concurrently
+        convert_fn: Function(code, priority=...) used instead of the converter
+
+    Returns:
+        Counts of loaded, pinned, converted, already cached and failed
+        inputs, the snapshot path and the cache generation
+    """
+    start = time.perf_counter()
+    summary = {'loaded': load_cache_snapshot(converter, snapshot_dir), 'pinned': 0, 'converted': 0, 'already_cached': 0, 'failed': 0}
+
+    if seed_dataset:
+        summary['pinned'] = converter.seed_exact_matches()
+
+    if trace_dir and top_n:
+        if top_n > converter.cache_size:
+            print(f"⚠️ Only the {converter.cache_size} most frequent of {top_n} inputs fit in the cache")
+        frequent = top_trace_inputs(trace_dir, top_n, since)
+        convert = convert_fn or converter.convert_compose_to_json
+        print(f"🔥 Pre-converting {len(frequent)} frequent inputs")
+
+        converter.ensure_model()
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = list(executor.map(
+                lambda item: convert(item[0], priority=RequestPriority.BULK),
+                frequent
+            ))
+        for result in results:
+            if not result['success']:
+                summary['failed'] += 1
+            else:
+                summary['already_cached' if result.get('cached') else 'converted'] += 1
+
+        # Most frequent last, so they are the last evicted
+        with converter._cache_lock:
+            for compose_code, _ in reversed(frequent):
+                key = canonical_key(compose_code)
+                if key in converter.result_cache:
+                    converter.result_cache.move_to_end(key)
+
+    summary['snapshot'] = save_cache_snapshot(converter, snapshot_dir)
+    summary['generation'] = converter.cache_fingerprint()
+    summary['elapsed_s'] = round(time.perf_counter() - start, 2)
+    return summary
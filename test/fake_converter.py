@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Converter answering from a local table instead of a model, for tests
+"""
+
+import json
+import os
+import sys
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import ComposeToJsonConverter
+from llm_converter.compose_parser import parse_calls
+
+def local_output(compose_code: str) -> dict:
+    """
+    Convert one call to {"type", "text"} like the model would
+
+    Args:
+        compose_code: Compose code
+
+    Returns:
+        SDUI JSON
+    """
+    calls = parse_calls(compose_code)
+    if not calls:
+        return {"type": "Unknown"}
+    output = {"type": calls[0]['name']}
+    if calls[0]['args']:
+        output['text'] = calls[0]['args'].strip('"')
+    return output
+
+class FakeConverter(ComposeToJsonConverter):
+    """
+    ComposeToJsonConverter whose model is a function of the input
+
+    responses maps an input to the raw model response (or to a list of
+    responses returned in turn); other inputs get their local_output as
+    a JSON code block. Every prompt is recorded in prompts.
+    """
+
+    def __init__(self, responses: dict = None, model_name: str = "fake"):
+        super().__init__("test-key", model_name, load_examples=False)
+        self.responses = dict(responses or {})
+        self.prompts = []
+        self.calls_lock = threading.Lock()
+
+    def _initialize_model(self):
+        self.model = object()
+
+    def _call_model(self, full_prompt, max_output_tokens=None):
+        with self.calls_lock:
+            self.prompts.append(full_prompt)
+        compose_code = full_prompt.rsplit('Input: ', 1)[1].split('\nOutput:', 1)[0]
+        response = self.responses.get(compose_code)
+        if isinstance(response, list):
+            response = response.pop(0) if len(response) > 1 else response[0]
+        if response is None:
+            response = "```json\n" + json.dumps(local_output(compose_code), ensure_ascii=False) + "\n```"
+        return response
+
+    @property
+    def calls(self) -> int:
+        with self.calls_lock:
+            return len(self.prompts)
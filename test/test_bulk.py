@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test bulk conversion to JSONL
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import iter_bulk_inputs, convert_bulk
+from llm_converter.bulk import read_completed
+
+SOURCE = '''
+@Composable
+fun Greeting() {
+    Text("Hi")
+}
+
+@Composable
+fun Greeting(name: String) {
+    Text(name)
+}
+
+@Preview
+@Composable
+fun GreetingPreview() {
+    Greeting()
+}
+'''
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_kotlin_tree_items():
+    """Each composable of a tree is an item; overloads get distinct ids"""
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "ui"))
+        os.makedirs(os.path.join(directory, "build"))
+        for folder in ("ui", "build"):
+            with open(os.path.join(directory, folder, "Screen.kt"), 'w', encoding='utf-8') as f:
+                f.write(SOURCE)
+        items = list(iter_bulk_inputs(directory))
+        assert [item['id'] for item in items] == ["ui/Screen.kt::Greeting", "ui/Screen.kt::Greeting#2"]
+        assert items[0]['input'].strip() == 'Text("Hi")'
+        assert len(list(iter_bulk_inputs(directory, skip_previews=False))) == 3
+
+def test_snippet_files():
+    """JSON arrays and JSONL records are read with their ids"""
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "snippets.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(['Text("a")', {"id": "b", "compose_code": 'Text("b")'}], f)
+        assert list(iter_bulk_inputs(json_path)) == [
+            {'id': "0", 'input': 'Text("a")'}, {'id': "b", 'input': 'Text("b")'}
+        ]
+
+        jsonl_path = os.path.join(directory, "snippets.jsonl")
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            f.write('{"input": "Text(\\"a\\")"}\n\n"Text(\\"b\\")"\n')
+        assert [item['id'] for item in iter_bulk_inputs(jsonl_path)] == ["0", "2"]
+
+def test_resume_skips_completed():
+    """A second run converts only what the first did not write"""
+    items = [{'id': str(i), 'input': f'Text("{i}")'} for i in range(5)]
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, "out.jsonl")
+        converter = FakeConverter()
+        summary = convert_bulk(converter, items[:3], output_path, max_workers=2)
+        assert summary['converted'] == 3
+
+        # A line cut short by an interrupted run
+        with open(output_path, 'a', encoding='utf-8') as f:
+            f.write('{"id": "3", "succ')
+        summary = convert_bulk(converter, items, output_path, max_workers=2)
+        assert (summary['converted'], summary['skipped']) == (2, 3)
+        assert sorted(record['id'] for record in read_records(output_path)) == ["0", "1", "2", "3", "4"]
+
+def test_retry_failed_drops_superseded_records():
+    """Each id keeps one record, the last, when failures are retried"""
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, "out.jsonl")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for record in ({"id": "a", "success": False}, {"id": "a", "success": True},
+                           {"id": "b", "success": True}, {"id": "b", "success": False},
+                           {"id": "c", "success": False}):
+                f.write(json.dumps(record) + "\n")
+
+        assert read_completed(output_path) == {"a", "b", "c"}
+        assert read_completed(output_path, retry_failed=True) == {"a"}
+        assert read_records(output_path) == [{"id": "a", "success": True}]
+
+        items = [{'id': item_id, 'input': f'Text("{item_id}")'} for item_id in "abc"]
+        summary = convert_bulk(FakeConverter(), items, output_path, retry_failed=True)
+        assert (summary['converted'], summary['skipped']) == (2, 1)
+        records = read_records(output_path)
+        assert sorted(record['id'] for record in records) == ["a", "b", "c"]
+        assert all(record['success'] for record in records)
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test the canonical form of Compose code
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter.canonicalizer import canonicalize, canonical_key, parameterize, score_complexity, tokenize
+
+def test_equivalent_forms():
+    """Whitespace, comments, trailing commas and first named arguments do not matter"""
+    a = 'Button(onClick = {}) { Text("Hi") }'
+    b = 'Button(onClick = { }) {\n    // label\n    Text(text = "Hi",)\n}'
+    assert canonical_key(a) == canonical_key(b)
+    assert canonical_key('Column { Text("a"); Text("b") }') == canonical_key('Column {\n Text("a")\n Text("b")\n}')
+
+def test_different_forms():
+    """Literals and other named arguments matter"""
+    assert canonical_key('Text("a")') != canonical_key('Text("b")')
+    assert canonical_key('Text(color = Red, text = "a")') != canonical_key('Text(text = "a", color = Red)')
+
+def test_operators_kept_apart():
+    """a - -b is not a--b, and a + +b is not a++b"""
+    assert canonical_key('Text(a - -b)') != canonical_key('Text(a--b)')
+    assert canonical_key('Text(a + +b)') != canonical_key('Text(a++b)')
+    assert canonical_key('Text(a - -b)') == canonical_key('Text(a- -b)')
+    assert ('punct', '--') in tokenize('i--')
+    assert ('punct', '..<') in tokenize('0..<n')
+    assert canonicalize('Text(a - -b)') == 'Text(a- -b)'
+
+def test_strings_and_comments():
+    """Brackets and comment markers inside strings are literal text"""
+    assert tokenize('Text("// not a comment { }")') == [
+        ('ident', 'Text'), ('punct', '('), ('string', '"// not a comment { }"'), ('punct', ')')
+    ]
+    assert tokenize("Text('x') /* gone */") == [('ident', 'Text'), ('punct', '('), ('char', "'x'"), ('punct', ')')]
+
+def test_numbers():
+    """8.dp is a number then member access, 1.5 a decimal"""
+    assert tokenize('8.dp')[:2] == [('number', '8'), ('punct', '.')]
+    assert tokenize('1.5f') == [('number', '1.5f')]
+
+def test_parameterize():
+    """Inputs differing only in literals share a skeleton"""
+    key_a, literals_a = parameterize('Text("Hi", fontSize = 12)')
+    key_b, literals_b = parameterize('Text(text = "Bye", fontSize = 14)')
+    assert key_a == key_b
+    assert literals_a == [('string', 'Hi'), ('number', 12)]
+    assert literals_b == [('string', 'Bye'), ('number', 14)]
+    # Escapes, templates and empty strings stay in the skeleton
+    assert parameterize('Text("$name")')[1] == []
+    assert parameterize('Text("")')[0] != parameterize('Text("a")')[0]
+
+def test_score_complexity():
+    """Composables, nesting and modifiers add up"""
+    score = score_complexity('Column(modifier = Modifier.padding(8.dp).fillMaxWidth()) { Row { Text("a") } }')
+    assert score == {'composables': 3, 'depth': 2, 'modifiers': 2, 'score': 6}
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test model cascade escalation
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import ModelCascade
+
+VALID = '```json\n{"type": "Text", "text": "a"}\n```'
+
+def test_cheap_tier_answers():
+    """Valid output of the first tier is not escalated"""
+    cheap, strong = FakeConverter(model_name="cheap"), FakeConverter(model_name="strong")
+    cascade = ModelCascade([cheap, strong], costs=[1.0, 10.0])
+    result = cascade.convert('Text("a")')
+    assert result['success'] and (result['model'], result['cascade_tier']) == ("cheap", 0)
+    assert strong.calls == 0
+    stats = cascade.get_stats()
+    assert stats['escalation_rate'] == 0.0 and stats['tiers'][0]['resolved_share'] == 1.0
+    assert stats['avg_cost'] > 0
+
+def test_failure_escalated_and_cached_in_first_tier():
+    """A failed tier escalates; the next identical request stops at the first tier"""
+    cheap = FakeConverter({'Text("a")': ['not json']}, model_name="cheap")
+    strong = FakeConverter(model_name="strong")
+    cascade = ModelCascade([cheap, strong])
+    result = cascade.convert('Text("a")')
+    assert result['success'] and (result['model'], result['cascade_tier']) == ("strong", 1)
+
+    cheap_calls = cheap.calls
+    again = cascade.convert('Text("a")')
+    assert again['cached'] and again['cascade_tier'] == 1
+    assert cheap.calls == cheap_calls and strong.calls == 1
+    assert cascade.get_stats()['escalation_rate'] == 0.5
+
+def test_repaired_output_escalated_with_fallback():
+    """Repaired output escalates but is kept if no stronger tier succeeds"""
+    cheap = FakeConverter({'Text("a")': ['not json', VALID]}, model_name="cheap")
+    strong = FakeConverter({'Text("a")': ['not json']}, model_name="strong")
+    cascade = ModelCascade([cheap, strong])
+    result = cascade.convert('Text("a")')
+    assert strong.calls > 0
+    assert result['success'] and result['model'] == "cheap" and result['repair_attempts'] == 1
+
+    cheap = FakeConverter({'Text("a")': ['not json', VALID]}, model_name="cheap")
+    cascade = ModelCascade([cheap, FakeConverter(model_name="strong")], escalate_on_repair=False)
+    assert cascade.convert('Text("a")')['cascade_tier'] == 0
+
+def test_unserved_request_not_escalated():
+    """A passed deadline is returned as is, without trying other tiers"""
+    cheap, strong = FakeConverter(model_name="cheap"), FakeConverter(model_name="strong")
+    cascade = ModelCascade([cheap, strong])
+    result = cascade.convert('Text("a")', deadline=time.monotonic() - 1)
+    assert result['error_code'] == 'deadline_exceeded'
+    assert cheap.calls == strong.calls == 0
+    assert cascade.get_stats()['tiers'][1]['attempts'] == 0
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
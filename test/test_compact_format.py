@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test the compact output format
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import compact_output, expand_output, CompactFormatError
+
+SCREEN = {
+    "type": "Column",
+    "modifier.padding": 16,
+    "children": [
+        {"type": "Text", "text": "Hi"},
+        {"type": "Button", "text": "Go", "onClick": "submit", "children": []},
+        {"type": "Image", "src": "logo", "t": "literal t", "@x": 1, "!y": 2},
+        {"type": "Spacer"}
+    ]
+}
+
+def test_round_trip():
+    """Expanding a compacted component gives it back"""
+    compact = compact_output(SCREEN)
+    assert compact[0] == "Column"
+    assert compact[2][0] == ["Text", "Hi"]
+    assert compact[2][1] == ["Button", {"t": "Go", "c": "submit"}, []]
+    assert compact[2][3] == ["Spacer"]
+    assert expand_output(compact) == SCREEN
+
+def test_escaped_keys():
+    """Keys that look like short forms are escaped"""
+    image = compact_output(SCREEN)[2][2][1]
+    assert image == {"s": "logo", "!t": "literal t", "!@x": 1, "!!y": 2}
+
+def test_invalid_compact_output():
+    """Values that are not compact components raise CompactFormatError"""
+    for value in ({"type": "Text"}, [], [1], ["Text", "a", [], "extra"], ["Row", [{"type": "Text"}]]):
+        try:
+            expand_output(value)
+            assert False, f"expected CompactFormatError for {value!r}"
+        except CompactFormatError:
+            pass
+    try:
+        compact_output({"type": "Row", "children": "none"})
+        assert False, "expected CompactFormatError"
+    except CompactFormatError:
+        pass
+
+def test_converter_expands_compact_responses():
+    """A compact-format converter returns SDUI JSON"""
+    converter = FakeConverter({'Text("a")': '["Text", "a"]', 'Row { }': '{"type": "Row"}'})
+    converter.set_output_format("compact")
+    result = converter.convert_compose_to_json('Text("a")')
+    assert result['success'] and result['output'] == {"type": "Text", "text": "a"}
+    assert "Output format (compact):" in converter.prompts[0]
+
+    result = converter.convert_compose_to_json('Row { }')
+    assert not result['success']
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
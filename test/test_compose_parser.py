@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test splitting Kotlin files into composables and whole-file conversion
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import ComposeFileConverter, split_composables
+from llm_converter.compose_parser import find_matching, parse_calls
+
+SOURCE = '''
+package com.example.ui
+
+import androidx.compose.runtime.Composable
+
+@Composable
+fun Greeting(name: String) {
+    Text("Hello $name { not a brace")
+}
+
+/* @Composable fun Commented() { Text("no") } */
+
+@Composable
+private fun Card(title: String = "}") = Column { Text(title) }
+
+@Preview(showBackground = true)
+@Composable
+fun GreetingPreview() { Greeting("preview") }
+
+fun helper(): Int { return 1 }
+
+@Composable
+fun <T> List<T>.Items(render: (T) -> Unit) { Column { } }
+
+@Composable
+fun String?.Label() { Text(this ?: "") }
+
+@Composable
+fun <K, V> Map<K, List<V>>.Groups() { Row { } }
+
+@Composable
+fun Item(text: String) { Text(text) }
+
+@Composable
+fun Item(count: Int) { Text("$count") }
+
+class Screen {
+    val x = 1
+}
+'''
+
+def test_split_composables():
+    """Top-level composables are found with their bodies and lines"""
+    units = split_composables(SOURCE)
+    assert [unit['name'] for unit in units] == [
+        "Greeting", "Card", "GreetingPreview", "Items", "Label", "Groups", "Item", "Item"
+    ]
+    greeting = units[0]
+    assert greeting['parameters'] == "name: String"
+    assert greeting['body'] == 'Text("Hello $name { not a brace")'
+    assert greeting['line'] == 7
+    assert units[1]['body'] == "Column { Text(title) }"
+    assert units[2]['annotations'] == ["Preview", "Composable"]
+
+def test_generic_receivers():
+    """Generic and nullable extension receivers are matched"""
+    units = {unit['name']: unit for unit in split_composables(SOURCE)}
+    assert units["Items"]['parameters'] == "render: (T) -> Unit"
+    assert units["Label"]['body'] == 'Text(this ?: "")'
+    assert units["Groups"]['body'] == "Row { }"
+
+def test_parse_calls():
+    """Calls with arguments and trailing lambdas; other statements are rejected"""
+    calls = parse_calls('Text("a, )") ; Button(onClick = { }) { Text("b") }\nSpacer()')
+    assert [call['name'] for call in calls] == ["Text", "Button", "Spacer"]
+    assert calls[0]['args'] == '"a, )"'
+    assert calls[1]['content'].strip() == 'Text("b")'
+    assert calls[2]['text'] == "Spacer()"
+    assert parse_calls('val x = 1') is None
+    assert parse_calls('Text') is None
+    assert find_matching('{ "}" /* } */ }', 0) == 14
+
+def test_overloads_kept():
+    """Overloads are keyed Name, Name#2 in file order; previews are skipped"""
+    file_converter = ComposeFileConverter(FakeConverter(), max_workers=3)
+    result = file_converter.convert_file(SOURCE, "Main")
+    composables = result['output']['composables']
+    assert "GreetingPreview" not in composables
+    assert composables["Item"] == {"type": "Text", "text": "text"}
+    assert composables["Item#2"] == {"type": "Text", "text": "$count"}
+    assert list(composables)[:2] == ["Greeting", "Card"]
+
+def test_no_composables():
+    """Files without composables fail"""
+    result = ComposeFileConverter(FakeConverter()).convert_file("fun main() {}")
+    assert not result['success']
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test the converter pool
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import ConverterPool, LLMProvider
+
+EXAMPLES = [{"input": 'Text("a")', "output": {"type": "Text", "text": "a"}}]
+
+def make_pool(directory, **kwargs):
+    dataset_file = os.path.join(directory, "dataset.json")
+    with open(dataset_file, 'w', encoding='utf-8') as f:
+        json.dump(EXAMPLES, f)
+    return ConverterPool(dataset_file=dataset_file, **kwargs)
+
+def test_reuse_per_configuration():
+    """One converter per configuration, shared between calls"""
+    with tempfile.TemporaryDirectory() as directory:
+        pool = make_pool(directory)
+        first = pool.get("key", "model-a", LLMProvider.OPENAI)
+        assert pool.get("key", "model-a", LLMProvider.OPENAI) is first
+        assert pool.get("other-key", "model-a", LLMProvider.OPENAI) is not first
+        assert pool.get("key", "model-a", LLMProvider.OPENAI, few_shot_count=2) is not first
+        assert pool.get("key", "model-a", LLMProvider.OPENAI, namespace="t1") is not first
+
+        stats = pool.get_stats()
+        assert (stats['created'], stats['reused'], stats['size']) == (4, 1, 4)
+        assert "key" not in json.dumps(stats)
+
+def test_examples_shared():
+    """New converters share the first converter's examples and index"""
+    with tempfile.TemporaryDirectory() as directory:
+        pool = make_pool(directory)
+        first = pool.get("key", "model-a", LLMProvider.OPENAI)
+        second = pool.get("key", "model-b", LLMProvider.OPENAI)
+        assert list(first.training_examples) == EXAMPLES
+        assert second.training_examples is first.training_examples
+        assert second._example_index is first._example_index
+
+def test_least_recently_used_evicted():
+    """The least recently used converter goes beyond max_converters"""
+    with tempfile.TemporaryDirectory() as directory:
+        pool = make_pool(directory, max_converters=2)
+        a = pool.get("key", "a", LLMProvider.OPENAI)
+        pool.get("key", "b", LLMProvider.OPENAI)
+        assert pool.get("key", "a", LLMProvider.OPENAI) is a
+        pool.get("key", "c", LLMProvider.OPENAI)
+        assert [c['model'] for c in pool.get_stats()['converters']] == ["a", "c"]
+        assert pool.get_stats()['evicted'] == 1
+
+def test_quota_set_on_creation():
+    """The tenant charged is set when the converter is created"""
+    with tempfile.TemporaryDirectory() as directory:
+        pool = make_pool(directory)
+        tenant = object()
+        converter = pool.get("key", "a", LLMProvider.OPENAI, namespace="t1", quota=tenant)
+        assert converter.quota is tenant
+        assert pool.get("key", "a", LLMProvider.OPENAI, namespace="t1", quota=tenant) is converter
+        assert pool.get("key", "a", LLMProvider.OPENAI).quota is None
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test the memory-mapped dataset store and few-shot retrieval index
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import DatasetStore, ExampleIndex, convert_json_dataset
+
+EXAMPLES = [
+    {"input": 'Text("a")', "output": {"type": "Text", "text": "a"}},
+    {"input": 'Button(onClick = { login() }) { Text("Login") }', "output": {"type": "Button", "onClick": "login"}},
+    {"input": 'Column { Text("x") Text("y") }', "output": {"type": "Column"}},
+    {"input": 'Row { Image(painter = p, contentDescription = null) }', "output": {"type": "Row"}}
+]
+
+def write_jsonl(path, examples):
+    """Write examples one per line"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for example in examples:
+            f.write(json.dumps(example, ensure_ascii=False) + "\n")
+
+def test_read_records():
+    """Records are read by position, slice and iteration"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dataset.jsonl")
+        source = os.path.join(directory, "dataset.json")
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump(EXAMPLES, f)
+        assert convert_json_dataset(source, path) == len(EXAMPLES)
+
+        store = DatasetStore(path)
+        assert len(store) == len(EXAMPLES)
+        assert store[1] == EXAMPLES[1]
+        assert store[-1] == EXAMPLES[-1]
+        assert store[1:3] == EXAMPLES[1:3]
+        assert list(store) == EXAMPLES
+        store.close()
+
+def test_stale_index_same_size():
+    """An in-place rewrite of the same size rebuilds the index"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dataset.jsonl")
+        write_jsonl(path, [{"input": "A", "output": "xxxx"}, {"input": "B", "output": "y"}])
+        DatasetStore.build_index(path)
+        stat = os.stat(path)
+
+        # Same total size, different line lengths, same mtime
+        write_jsonl(path, [{"input": "A", "output": "x"}, {"input": "B", "output": "yyyy"}])
+        assert os.path.getsize(path) == stat.st_size
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        store = DatasetStore(path)
+        assert store[1] == {"input": "B", "output": "yyyy"}
+        store.close()
+
+def test_example_index_ranking():
+    """Same canonical form first, then identifier overlap, then dataset order"""
+    index = ExampleIndex(EXAMPLES)
+    assert len(index) == len(EXAMPLES)
+    assert index.top('Text(text = "a")', 1) == [0]
+    assert index.top('Column { Text("z") }', 2) == [2, 0]
+    # Examples sharing nothing fill the remaining places
+    assert index.top('Spacer()', 3) == [0, 1, 2]
+    # Held-out examples are never returned
+    assert 3 not in index.top('Row { Image(painter = p, contentDescription = null) }', 4, pool_size=3)
+    assert index.top('Text("a")', 0) == []
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test few-shot example count and selection
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+
+EXAMPLES = [
+    {"input": 'Text("one")', "output": {"type": "Text", "text": "one"}},
+    {"input": 'Button(onClick = {}) { Text("go") }', "output": {"type": "Button", "text": "go"}},
+    {"input": 'Column { Text("a") Text("b") }', "output": {"type": "Column"}},
+    {"input": 'Row { Icon(Icons.Add) }', "output": {"type": "Row"}},
+    {"input": 'Text("two")', "output": {"type": "Text", "text": "two"}},
+    {"input": 'Spacer(modifier = Modifier.height(8.dp))', "output": {"type": "Spacer"}},
+]
+
+def make_converter():
+    converter = FakeConverter()
+    converter.training_examples = list(EXAMPLES)
+    converter._index_training_examples()
+    return converter
+
+def test_fixed_count():
+    """Without adaptive few-shot every input gets few_shot_count"""
+    converter = make_converter()
+    converter.few_shot_count = 3
+    assert converter.choose_few_shot_count('Text("x")') == 3
+    assert converter.choose_few_shot_count('Column { Row { Text("x") Text("y") } }') == 3
+
+def test_adaptive_count_grows_and_clamps():
+    """A single Text gets the minimum, nested inputs more, up to the maximum"""
+    converter = make_converter()
+    converter.set_adaptive_few_shot(True, min_count=1, max_count=4)
+    assert converter.choose_few_shot_count('Text("x")') == 1
+    assert converter.choose_few_shot_count('Column { Text("x") Text("y") }') == 3
+    assert converter.choose_few_shot_count('Column { Row { Text("x") Text("y") Text("z") } }') == 4
+
+def test_same_form_ranked_first():
+    """Examples with the input's canonical form come first"""
+    converter = make_converter()
+    converter.few_shot_count = 2
+    selected = converter.select_few_shot_examples('Text("three")')
+    assert [example['input'] for example in selected] == ['Text("one")', 'Text("two")']
+    prompt = converter.create_few_shot_prompt('Text("three")')
+    assert prompt.count("Example ") == 2 and prompt.endswith('Input: Text("three")\nOutput:')
+
+def test_held_out_never_selected():
+    """Held-out examples stay out of the prompt"""
+    converter = make_converter()
+    converter.few_shot_count = 6
+    converter.held_out_count = 2
+    selected = converter.select_few_shot_examples('Text("three")')
+    assert len(selected) == 4
+    assert all(example in EXAMPLES[:4] for example in selected)
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
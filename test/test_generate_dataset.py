@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test synthetic dataset generation
+"""
+
+import json
+import os
+import sys
+import tempfile
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'datasets'))
+from generate_dataset import generate_example, generate_synthetic
+from llm_converter import DatasetStore, SchemaValidator
+from llm_converter.canonicalizer import canonical_key
+
+def test_examples_deterministic_and_valid():
+    """Examples depend only on seed and index and pass the schema"""
+    validator = SchemaValidator()
+    for index in range(200):
+        example = generate_example(7, index)
+        assert example == generate_example(7, index)
+        result = validator.validate(example['output'])
+        assert result['valid'], (example, result['errors'])
+    assert generate_example(7, 0) != generate_example(8, 0)
+
+def test_synthetic_count_is_unique():
+    """--synthetic N writes N unique examples after the curated ones"""
+    curated = [{"input": 'Text("curated")', "output": {"type": "Text", "text": "curated"}}] * 2
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.jsonl")
+        written = generate_synthetic(path, 300, seed=3, chunk_size=50, processes=2,
+                                     max_depth=1, seed_examples=curated)
+        assert written == 301
+
+        store = DatasetStore(path)
+        keys = [canonical_key(example['input']) for example in store]
+        assert len(store) == 301 and len(set(keys)) == 301
+        assert store[0] == curated[0]
+        store.close()
+
+        # The same seed writes the same file
+        again = os.path.join(directory, "again.jsonl")
+        generate_synthetic(again, 300, seed=3, chunk_size=50, processes=2, max_depth=1, seed_examples=curated)
+        with open(path, encoding='utf-8') as a, open(again, encoding='utf-8') as b:
+            assert a.read() == b.read()
+
+        with open(path, encoding='utf-8') as f:
+            assert all(json.loads(line)['input'] for line in f)
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test background conversion jobs
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import JobManager
+
+def convert(compose_code, owner):
+    """Succeed for everything but "bad" inputs"""
+    if compose_code == "bad":
+        return {'success': False, 'error': 'cannot convert'}
+    return {'success': True, 'output': {"type": compose_code, "owner": owner}}
+
+def test_results_and_progress():
+    """Items are converted by the workers and paged in order"""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = JobManager(os.path.join(directory, "jobs.sqlite3"), convert, max_workers=2)
+        manager.start()
+        job_id = manager.submit(["Text", "bad", "Row"], owner="x")
+        deadline = time.time() + 10
+        while manager.get_job(job_id)['status'] != 'completed' and time.time() < deadline:
+            time.sleep(0.01)
+
+        job = manager.get_job(job_id)
+        assert (job['completed'], job['failed'], job['progress']) == (2, 1, 1.0)
+        items = manager.get_results(job_id, offset=1, limit=5)
+        assert [item['position'] for item in items] == [1, 2]
+        assert items[0]['status'] == 'failed' and items[0]['error'] == 'cannot convert'
+        assert items[1]['output'] == {"type": "Row", "owner": "x"}
+        assert manager.cancel(job_id) is False
+        assert manager.get_job("unknown") is None
+        manager.close()
+
+def test_owners_take_turns():
+    """A small job is not stuck behind another owner's large one"""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = JobManager(os.path.join(directory, "jobs.sqlite3"), convert)
+        big = manager.submit([f"big{i}" for i in range(5)], owner="big")
+        time.sleep(0.01)
+        small = manager.submit(["small0", "small1"], owner="small")
+
+        claimed = [manager._claim() for _ in range(7)]
+        assert [item[1] for item in claimed] == ["big", "small", "big", "small", "big", "big", "big"]
+        assert [item[2] for item in claimed if item[0] == big] == [0, 1, 2, 3, 4]
+        assert [item[2] for item in claimed if item[0] == small] == [0, 1]
+        manager.db.close()
+
+def test_new_owner_served_first():
+    """An owner never served goes before owners already served"""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = JobManager(os.path.join(directory, "jobs.sqlite3"), convert)
+        manager.submit(["a0", "a1", "a2"], owner="a")
+        assert manager._claim()[1] == "a"
+        manager.submit(["b0"], owner="b")
+        assert manager._claim()[1] == "b"
+        assert manager._claim()[1] == "a"
+        manager.db.close()
+
+def test_resume_skips_cancelled_jobs():
+    """Restarts reset running items and count only claimable ones"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jobs.sqlite3")
+        manager = JobManager(path, convert)
+        live = manager.submit(["a", "b", "c"], owner="x")
+        cancelled = manager.submit(["d", "e"], owner="y")
+        manager._claim()
+        manager._claim()
+        manager.cancel(cancelled)
+        manager.db.close()
+
+        manager = JobManager(path, convert, max_workers=1)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            manager.start()
+            deadline = time.time() + 10
+            while manager.get_job(live)['status'] != 'completed' and time.time() < deadline:
+                time.sleep(0.01)
+        manager.close()
+        assert "Resuming 3 pending job items (1 interrupted)" in output.getvalue()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test early stop of streamed model output at the end of the JSON
+"""
+
+import os
+import sys
+import types
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import ComposeToJsonConverter, GeminiConverter, OpenAIConverter
+from llm_converter.llm_base_converter import JsonCompletionScanner, is_truncated_json
+
+def scan(chunks):
+    """Feed chunks; return (chunk index, end) of the first complete value"""
+    scanner = JsonCompletionScanner()
+    for i, chunk in enumerate(chunks):
+        end = scanner.feed(chunk)
+        if end is not None:
+            return i, end
+    return None
+
+def test_scanner_skips_fence():
+    """Text before the first bracket is skipped"""
+    assert scan(['```json\n{"type": "Text"}\n```']) == (0, len('```json\n{"type": "Text"}'))
+
+def test_scanner_strings_and_nesting():
+    """Brackets and escaped quotes inside strings do not count"""
+    text = '{"text": "a } \\" ] {", "children": [{"type": "Row"}]} trailing'
+    assert scan([text]) == (0, len(text) - len(' trailing'))
+
+def test_scanner_across_chunks():
+    """Values split over chunks end in the right chunk"""
+    assert scan(['[{"a"', ': "}"', '}', ']', 'tail']) == (3, 1)
+    # An escaped quote split from its backslash
+    assert scan(['{"a": ', '"\\', '""}', '}']) == (2, 3)
+
+def test_truncated():
+    """An opened value that never closes is truncated"""
+    assert is_truncated_json('```json\n{"type": "Column", "children": [')
+    assert not is_truncated_json('{"type": "Text"}')
+    assert not is_truncated_json('no json here')
+    assert not is_truncated_json(None)
+
+def test_output_budget():
+    """The output limit follows the input size, up to max_output_tokens"""
+    converter = ComposeToJsonConverter("test-key", "fake", load_examples=False)
+    converter.training_examples = [{"input": 'Text("a")', "output": {"type": "Text", "text": "a"}}]
+    small = converter.estimate_output_budget('Text("a")')
+    large = converter.estimate_output_budget('Column { ' + 'Text("a") ' * 50 + '}')
+    assert 64 < small < large
+    assert converter.estimate_output_budget('Text("a") ' * 10000) == converter.max_output_tokens
+
+class FakeCall:
+    """Streamed chunks with the cancel() of a gRPC call"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.read = 0
+        self.cancelled = False
+
+    def __iter__(self):
+        for text in self.texts:
+            self.read += 1
+            yield types.SimpleNamespace(text=text)
+
+    def cancel(self):
+        self.cancelled = True
+
+def test_gemini_stream_cancelled():
+    """Gemini stops reading at the end of the JSON and cancels the call"""
+    call = FakeCall(['```json\n{"type": ', '"Text"}', '\n```', 'more', 'more'])
+
+    class Response:
+        _iterator = call
+
+        def __iter__(self):
+            return iter(call)
+
+    converter = GeminiConverter("test-key")
+    converter.model = types.SimpleNamespace(generate_content=lambda *args, **kwargs: Response())
+    assert converter._call_model("prompt") == '```json\n{"type": "Text"}'
+    assert call.read == 2
+    assert call.cancelled
+
+def test_legacy_openai_stream_closed():
+    """openai<1.0 streams are generators, closed after the JSON"""
+    state = {'read': 0, 'closed': False}
+
+    def create(**kwargs):
+        try:
+            for text in ['{"type": "Text"', ', "text": "a"}', ' extra']:
+                state['read'] += 1
+                yield {'choices': [{'delta': {'content': text}}]}
+        finally:
+            state['closed'] = True
+
+    converter = OpenAIConverter("test-key")
+    converter.model = types.ModuleType('openai')
+    converter.model.ChatCompletion = types.SimpleNamespace(create=create)
+    assert converter._call_model("prompt") == '{"type": "Text", "text": "a"}'
+    assert state == {'read': 2, 'closed': True}
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test JSON Patch generation and application
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import make_patch, apply_patch
+
+def check(old, new):
+    """Patch old into new and compare the JSON encodings"""
+    patch = make_patch(old, new)
+    patched = apply_patch(old, patch)
+    assert repr(patched) == repr(new), (patch, patched, new)
+    return patch
+
+def test_dict_changes():
+    """Added, removed and changed keys"""
+    patch = check({"type": "Text", "text": "Hi", "color": "Red"}, {"type": "Text", "text": "Bye", "modifier.padding": 8})
+    assert {"op": "remove", "path": "/color"} in patch
+    assert {"op": "replace", "path": "/text", "value": "Bye"} in patch
+    assert {"op": "add", "path": "/modifier.padding", "value": 8} in patch
+
+def test_list_insertions():
+    """Children inserted and removed in the middle of a list"""
+    a = {"type": "Text", "text": "a"}
+    b = {"type": "Text", "text": "b"}
+    c = {"type": "Text", "text": "c"}
+    patch = check({"type": "Column", "children": [a, b, c]}, {"type": "Column", "children": [a, c, b, a]})
+    assert len(patch) <= 3
+
+    check([1, 2, 3, 4], [0, 2, 4, 5, 6])
+    check([[1], [2]], [[1, 2], [2], []])
+
+def test_type_changes():
+    """true vs 1, false vs 0 and 1 vs 1.0 are changes"""
+    assert check({"enabled": 1}, {"enabled": True}) == [{"op": "replace", "path": "/enabled", "value": True}]
+    assert check({"enabled": False}, {"enabled": 0}) != []
+    assert check({"modifier.size": 1}, {"modifier.size": 1.0}) != []
+    assert check([1, 0], [True, False]) != []
+    assert check({"a": [1, {"b": 2}]}, {"a": [1, {"b": 2}]}) == []
+
+def test_escaped_keys():
+    """Keys with / and ~ are escaped in pointers"""
+    check({"a/b": 1, "c~d": 2}, {"a/b": 3})
+
+def test_root_replace():
+    """Values of different kinds are replaced whole"""
+    assert check({"type": "Text"}, ["Text"]) == [{"op": "replace", "path": "", "value": ["Text"]}]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
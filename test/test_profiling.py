@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test profiling sessions
+"""
+
+import marshal
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import (
+    ConversionScheduler,
+    ProfileSession,
+    start_profiling,
+    stop_profiling,
+    get_profiling_session,
+    profile_section,
+    set_request_session,
+    reset_request_session
+)
+
+def busy(seconds):
+    """Spin the CPU for a while"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_request_session_follows_scheduled_calls():
+    """A request's session profiles its model calls on scheduler workers"""
+    session = ProfileSession("cprofile")
+    converter = FakeConverter()
+    converter.scheduler = ConversionScheduler(max_concurrent=1)
+    token = set_request_session(session)
+    try:
+        converter.convert_compose_to_json('Text("a")')
+    finally:
+        reset_request_session(token)
+    session.stop()
+
+    functions = {(os.path.basename(filename), name) for filename, _, name in session.get_stats().stats}
+    assert ("fake_converter.py", "_call_model") in functions
+    assert ("compose_to_json_converter.py", "_convert_uncached") in functions
+    assert "function calls" in session.report("text")
+    assert isinstance(marshal.loads(session.report("pstats")), dict)
+    # Profiled again after the session stopped: nothing is added
+    sections = session.get_summary()['profiled_sections']
+    with profile_section(session):
+        busy(0.001)
+    assert session.get_summary()['profiled_sections'] == sections
+
+def test_nested_sections_one_profile():
+    """Nested sections of a thread make a single profile"""
+    session = ProfileSession("cprofile")
+    with session.section():
+        with session.section():
+            busy(0.001)
+    assert session.get_summary()['profiled_sections'] == 1
+
+def test_sampling_collapsed_stacks():
+    """Sampling records the stacks of threads inside sections"""
+    session = ProfileSession("sampling", interval=0.001)
+    with session.section():
+        busy(0.1)
+    session.stop()
+    stacks = session.report("collapsed")
+    assert "busy (test_profiling.py" in stacks
+    assert session.samples > 0
+    try:
+        session.report("pstats")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+def test_global_session_limits():
+    """The process-wide session stops after max_requests or duration"""
+    session = start_profiling("cprofile", max_requests=2)
+    try:
+        assert get_profiling_session() is session
+        session.count_request()
+        assert session.active
+        session.count_request()
+        assert not session.active
+        assert profile_section().__class__.__name__ == "_NoSection"
+
+        session = start_profiling("cprofile", duration=0.01)
+        time.sleep(0.02)
+        assert not session.active
+    finally:
+        stop_profiling()
+    try:
+        ProfileSession("perf")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
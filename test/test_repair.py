@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test targeted repair prompts and full retries
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+
+VALID = '```json\n{"type": "Text", "text": "a"}\n```'
+
+def test_invalid_json_repaired():
+    """Invalid JSON is sent back with its error, without examples"""
+    converter = FakeConverter({'Text("a")': ['{"type": "Text", "text": "a",}', VALID]})
+    converter.training_examples = [{"input": 'Text("x")', "output": {"type": "Text", "text": "x"}}]
+    result = converter.convert_compose_to_json('Text("a")')
+    assert result['success'] and result['output'] == {"type": "Text", "text": "a"}
+    assert (result['repair_attempts'], result['full_retries']) == (1, 0)
+
+    repair_prompt = converter.prompts[1]
+    assert repair_prompt.startswith("The JSON below")
+    assert "Example" not in repair_prompt
+    assert 'Output: {"type": "Text", "text": "a",}' in repair_prompt
+    assert repair_prompt.endswith("Corrected output:")
+    assert converter.get_recovery_stats()['repair']['success_rate'] == 1.0
+
+def test_schema_error_repaired():
+    """Schema errors are repaired like parse errors"""
+    converter = FakeConverter({'Text("a")': ['{"type": "Text"}', VALID]})
+    result = converter.convert_compose_to_json('Text("a")')
+    assert result['success'] and result['repair_attempts'] == 1
+    assert 'Text requires "text"' in converter.prompts[1]
+
+def test_full_retry_after_repairs():
+    """Failed repairs fall back to the full prompt"""
+    converter = FakeConverter({'Text("a")': ['not json'] * 3 + [VALID]})
+    result = converter.convert_compose_to_json('Text("a")')
+    assert result['success']
+    assert (result['repair_attempts'], result['full_retries']) == (2, 1)
+    assert converter.prompts[3] == converter.prompts[0]
+    stats = converter.get_recovery_stats()
+    assert stats['repair']['attempts'] == 2 and stats['full_retry']['successes'] == 1
+
+def test_truncated_output_skips_repair():
+    """Output cut off by the budget goes straight to a full retry"""
+    converter = FakeConverter({'Text("a")': ['{"type": "Text", "te', VALID]})
+    result = converter.convert_compose_to_json('Text("a")')
+    assert result['success']
+    assert (result['repair_attempts'], result['full_retries']) == (0, 1)
+
+def test_gives_up():
+    """A model that never answers validly fails after every attempt"""
+    converter = FakeConverter({'Text("a")': ['not json']})
+    result = converter.convert_compose_to_json('Text("a")')
+    assert not result['success']
+    assert converter.calls == 1 + converter.max_repair_attempts + converter.max_full_retries
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test priority and deadline scheduling
+"""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import ConversionScheduler, RequestPriority, DeadlineExceeded, SchedulerOverloaded
+
+def block_worker(scheduler):
+    """Occupy the only worker until the returned event is set"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(10)
+
+    future = scheduler.submit(blocker)
+    assert started.wait(10)
+    return release, future
+
+def test_priority_then_deadline_order():
+    """Queued calls run by priority, then earliest deadline, then arrival"""
+    scheduler = ConversionScheduler(max_concurrent=1)
+    release, blocker = block_worker(scheduler)
+    order = []
+    later = time.monotonic() + 60
+    futures = [
+        scheduler.submit(order.append, "bulk", priority=RequestPriority.BULK),
+        scheduler.submit(order.append, "default"),
+        scheduler.submit(order.append, "default-late", deadline=later + 1),
+        scheduler.submit(order.append, "default-early", deadline=later),
+        scheduler.submit(order.append, "interactive", priority=RequestPriority.INTERACTIVE),
+    ]
+    release.set()
+    for future in [blocker] + futures:
+        future.result(10)
+    assert order == ["interactive", "default-early", "default-late", "default", "bulk"]
+
+def test_expired_while_queued_not_called():
+    """Work whose deadline passed in the queue never reaches the model"""
+    scheduler = ConversionScheduler(max_concurrent=1)
+    release, _ = block_worker(scheduler)
+    called = []
+    future = scheduler.submit(called.append, "late", deadline=time.monotonic() + 0.01)
+    time.sleep(0.05)
+    release.set()
+    try:
+        future.result(10)
+        assert False, "expected DeadlineExceeded"
+    except DeadlineExceeded:
+        pass
+    assert called == []
+    assert scheduler.get_stats()['expired'] == 1
+
+def test_run_times_out():
+    """run raises DeadlineExceeded when the call outlasts the deadline"""
+    scheduler = ConversionScheduler(max_concurrent=1)
+    try:
+        scheduler.run(time.sleep, 0.5, deadline=time.monotonic() + 0.05)
+        assert False, "expected DeadlineExceeded"
+    except DeadlineExceeded:
+        pass
+    assert scheduler.get_stats()['timed_out'] == 1
+
+    try:
+        scheduler.run(time.sleep, 0, deadline=time.monotonic() - 1)
+        assert False, "expected DeadlineExceeded"
+    except DeadlineExceeded:
+        pass
+
+def test_overload_rejected():
+    """A full queue rejects new calls"""
+    scheduler = ConversionScheduler(max_concurrent=1, max_queue=1)
+    release, _ = block_worker(scheduler)
+    scheduler.submit(time.sleep, 0)
+    try:
+        scheduler.submit(time.sleep, 0)
+        assert False, "expected SchedulerOverloaded"
+    except SchedulerOverloaded:
+        pass
+    assert scheduler.get_stats()['rejected'] == 1
+    release.set()
+
+def test_context_carried_to_worker():
+    """Calls see the submitter's context variables"""
+    variable = contextvars.ContextVar("variable", default=None)
+    scheduler = ConversionScheduler(max_concurrent=1)
+    token = variable.set("caller")
+    try:
+        assert scheduler.run(variable.get) == "caller"
+    finally:
+        variable.reset(token)
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
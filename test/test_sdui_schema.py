@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test SDUI schema validation and normalization
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import SchemaValidator
+
+validator = SchemaValidator()
+
+def test_scalar_dp():
+    """"8.dp", "8" and 8.0 become 8"""
+    for value in ("8.dp", "8", 8.0, 8):
+        result = validator.validate({"type": "Box", "modifier.padding": value})
+        assert result['valid'], result
+        assert result['output']['modifier.padding'] == 8
+
+def test_named_dp_object():
+    """{"padding": {"start": 8}} keeps its arguments"""
+    result = validator.validate({"type": "Box", "modifier": {"padding": {"start": "8.dp", "top": 4}}})
+    assert result['valid'], result
+    assert result['output'] == {"type": "Box", "modifier.padding": {"start": 8, "top": 4}}
+
+def test_named_dp_string_modifier():
+    """Named arguments of string modifiers become objects"""
+    result = validator.validate({
+        "type": "Box",
+        "modifier": "Modifier.padding(horizontal = 8.dp, vertical = 4.dp).size(width = 100.dp, height = 50.dp)"
+    })
+    assert result['valid'], result
+    assert result['output']['modifier.padding'] == {"horizontal": 8, "vertical": 4}
+    assert result['output']['modifier.size'] == {"width": 100, "height": 50}
+
+def test_positional_dp_arguments():
+    """size(100.dp, 50.dp) becomes [100, 50]"""
+    result = validator.validate({"type": "Box", "modifier": "Modifier.size(100.dp, 50.dp).fillMaxWidth()"})
+    assert result['valid'], result
+    assert result['output']['modifier.size'] == [100, 50]
+    assert result['output']['modifier.fillMaxWidth'] is True
+
+def test_invalid_dp_reported():
+    """Values that are not dimensions are still errors"""
+    result = validator.validate({"type": "Box", "modifier": {"padding": {"start": "wide"}}})
+    assert not result['valid']
+    assert result['errors'][0]['path'] == "/modifier/padding"
+
+    result = validator.validate({"type": "Box", "modifier.height": True})
+    assert not result['valid']
+
+def test_required_properties():
+    """Text needs text, and nulls become empty strings"""
+    result = validator.validate({"type": "Column", "children": [{"type": "Text"}, {"type": "Text", "text": None}]})
+    assert not result['valid']
+    assert result['errors'] == [{'path': "/children/0", 'message': 'Text requires "text"'}]
+    assert result['output']['children'][1]['text'] == ""
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
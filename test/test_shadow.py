@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test shadow traffic mirroring
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import ShadowRunner
+
+def test_mirror_and_compare():
+    """Mirrored conversions are logged with whether they matched"""
+    shadow = FakeConverter({'Button("b")': '```json\n{"type": "Button", "text": "B"}\n```'}, model_name="shadow")
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "shadow.jsonl")
+        runner = ShadowRunner(shadow, fraction=1.0, log_path=log_path)
+        for name, text in (("Text", "a"), ("Button", "b")):
+            primary = {"success": True, "output": {"type": name, "text": text}}
+            assert runner.maybe_mirror(f'{name}("{text}")', primary, 10.0)
+        runner.shutdown()
+
+        with open(log_path, encoding='utf-8') as f:
+            records = {record['input']: record for record in map(json.loads, f)}
+        assert records['Text("a")']['match'] is True
+        assert records['Button("b")']['match'] is False
+        assert records['Button("b")']['shadow']['model'] == "shadow"
+
+        stats = runner.get_stats()
+        assert stats['mirrored'] == stats['completed'] == 2
+        assert stats['match_rate'] == 0.5
+        assert stats['pending'] == 0
+
+def test_fraction_zero_never_mirrors():
+    """fraction 0 leaves the shadow converter untouched"""
+    shadow = FakeConverter()
+    runner = ShadowRunner(shadow, fraction=0, log_path=os.devnull)
+    assert not runner.maybe_mirror('Text("a")', {"success": True, "output": {}}, 1.0)
+    runner.shutdown()
+    assert shadow.calls == 0
+
+def test_drops_when_pending_full():
+    """Mirrors beyond max_pending are dropped, not queued"""
+    release = threading.Event()
+
+    class BlockedConverter(FakeConverter):
+        def _call_model(self, full_prompt, max_output_tokens=None):
+            release.wait(10)
+            return super()._call_model(full_prompt, max_output_tokens)
+
+    with tempfile.TemporaryDirectory() as directory:
+        runner = ShadowRunner(BlockedConverter(), fraction=1.0, log_path=os.path.join(directory, "shadow.jsonl"),
+                              max_workers=1, max_pending=2)
+        primary = {"success": True, "output": {"type": "Text", "text": "a"}}
+        mirrored = [runner.maybe_mirror(f'Text("{i}")', primary, 1.0) for i in range(4)]
+        assert mirrored == [True, True, False, False]
+        assert runner.get_stats()['dropped'] == 2
+        release.set()
+        runner.shutdown()
+        assert runner.get_stats()['completed'] == 2
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test speculative results and their background verification
+"""
+
+import json
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import SpeculativeRunner, SubtreeMemoizer
+
+def run_speculative(runner, converter, compose_code):
+    """Convert speculatively and wait for the verification"""
+    verified = threading.Event()
+    results = []
+
+    def on_verified(result):
+        results.append(result)
+        verified.set()
+
+    result = runner.convert(converter, compose_code, on_verified=on_verified)
+    if result.get('provisional'):
+        assert verified.wait(10)
+    return result, results
+
+def test_synchronous_without_answer():
+    """Inputs without a provisional answer are converted at once"""
+    converter = FakeConverter()
+    runner = SpeculativeRunner()
+    result, verified = run_speculative(runner, converter, 'Text("a")')
+    assert result['success'] and not result.get('provisional')
+    assert result['output'] == {"type": "Text", "text": "a"}
+    assert verified == []
+    runner.shutdown()
+
+def test_memoized_subtrees_answer():
+    """Subtrees a memoizer has converted answer provisionally"""
+    converter = FakeConverter()
+    memoizer = SubtreeMemoizer(converter)
+    memoizer.convert('Column { Text("a") Text("b") }')
+    calls = converter.calls
+
+    runner = SpeculativeRunner(local_convert_fn=lambda request_converter, code: memoizer.convert_cached(code))
+    result, verified = run_speculative(runner, converter, 'Column { Text("b") Text("a") }')
+    assert result['provisional'] is True
+    assert result['output']['children'] == [{"type": "Text", "text": "b"}, {"type": "Text", "text": "a"}]
+    assert converter.calls == calls + 1
+    assert verified[0]['provisional'] is False
+    # The fake model converts the whole Column as a childless Column
+    assert verified[0]['corrected'] is True
+    assert runner.get_stats()['corrected'] == 1
+    runner.shutdown()
+
+def test_unmemoized_subtree_converted_synchronously():
+    """A subtree never converted means no provisional answer"""
+    converter = FakeConverter()
+    memoizer = SubtreeMemoizer(converter)
+    memoizer.convert('Text("a")')
+    assert memoizer.convert_cached('Column { Text("a") Text("c") }')['error_code'] == 'not_cached'
+
+    runner = SpeculativeRunner(local_convert_fn=lambda request_converter, code: memoizer.convert_cached(code))
+    result, _ = run_speculative(runner, converter, 'Column { Text("a") Text("c") }')
+    assert not result.get('provisional')
+    runner.shutdown()
+
+def test_template_answer_confirmed():
+    """Template hits are provisional and confirmed by the model"""
+    converter = FakeConverter({'Text("b")': "```json\n" + json.dumps({"type": "Text", "text": "b"}) + "\n```"})
+    converter.convert_compose_to_json('Text("a")')
+    runner = SpeculativeRunner()
+    result, verified = run_speculative(runner, converter, 'Text("b")')
+    assert result['provisional'] is True
+    assert verified[0]['corrected'] is False
+    assert runner.get_stats()['agreement_rate'] == 1.0
+    runner.shutdown()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
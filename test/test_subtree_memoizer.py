@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test subtree memoization with a local stand-in for the model
+"""
+
+import os
+import sys
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import SubtreeMemoizer
+from llm_converter.compose_parser import parse_calls
+
+def local_convert(code, **options):
+    """Convert one call to {"type", "text"} like the model would"""
+    calls = parse_calls(code)
+    if not calls:
+        return {'success': False, 'input': code, 'error': 'not a call'}
+    output = {"type": calls[0]['name']}
+    if calls[0]['args']:
+        output['text'] = calls[0]['args'].strip('"')
+    return {'success': True, 'input': code, 'output': output}
+
+def test_children_stitched():
+    """Containers are converted as shells with their children stitched in"""
+    memoizer = SubtreeMemoizer(None, convert_fn=local_convert)
+    result = memoizer.convert('Column { Text("a") Text("b") }')
+    assert result['success']
+    assert result['output'] == {"type": "Column", "children": [{"type": "Text", "text": "a"}, {"type": "Text", "text": "b"}]}
+    assert result['subtrees'] == {'total': 3, 'cached': 0, 'converted': 3}
+    assert result['cached'] is False
+
+def test_cached_when_no_model_call():
+    """Results assembled from cached subtrees are cache hits"""
+    memoizer = SubtreeMemoizer(None, convert_fn=local_convert)
+    memoizer.convert('Column { Text("a") Text("b") }')
+
+    result = memoizer.convert('Row { Text("b") Text("a") }')
+    assert result['cached'] is False
+    assert result['subtrees']['cached'] == 2
+
+    result = memoizer.convert('Column { Text("a") Text("b") }')
+    assert result['cached'] is True
+
+    # Converter cache hits do not reach the model either
+    memoizer = SubtreeMemoizer(None, convert_fn=lambda code, **options: {**local_convert(code), 'cached': True})
+    assert memoizer.convert('Column { Text("a") }')['cached'] is True
+
+def test_seed():
+    """Seeded conversions answer their subtrees"""
+    memoizer = SubtreeMemoizer(None, convert_fn=local_convert)
+    memoizer.seed('Column { Text("x") }', {"type": "Column", "children": [{"type": "Text", "text": "seeded"}]})
+    result = memoizer.convert('Box { Text("x") }')
+    assert result['output']['children'] == [{"type": "Text", "text": "seeded"}]
+
+def test_failure():
+    """A failing subtree fails the conversion with its error code"""
+    def failing(code, **options):
+        return {'success': False, 'input': code, 'error': 'quota', 'error_code': 'quota_exceeded'}
+    result = SubtreeMemoizer(None, convert_fn=failing).convert('Column { Text("a") }')
+    assert not result['success']
+    assert result['error_code'] == 'quota_exceeded'
+    assert 'model' not in result['subtrees']
+
+def test_stats_across_threads():
+    """Hit and miss counts are not lost under concurrency"""
+    memoizer = SubtreeMemoizer(None, convert_fn=local_convert)
+    memoizer.convert('Text("a")')
+
+    def run():
+        for _ in range(500):
+            memoizer.convert('Text("a")')
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert memoizer.get_stats() == {'hits': 4000, 'misses': 1, 'cached_subtrees': 1}
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test the literal-parameterized template cache
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from llm_converter import TemplateCache
+
+def test_literals_substituted():
+    """Inputs differing only in literals reuse the learned skeleton"""
+    cache = TemplateCache()
+    assert cache.learn('Text("Hi", fontSize = 14.sp)', {"type": "Text", "text": "Hi", "fontSize": 14})
+    assert cache.lookup('Text("Bye", fontSize = 20.sp)') == {"type": "Text", "text": "Bye", "fontSize": 20}
+    assert cache.lookup('Button("Bye", fontSize = 20.sp)') is None
+    assert cache.get_stats() == {'hits': 1, 'misses': 1, 'learned': 1, 'rejected': 0, 'templates': 1}
+
+def test_no_literals_not_cached():
+    """Inputs without literals are left to the result cache"""
+    cache = TemplateCache()
+    assert not cache.learn('Divider()', {"type": "Divider"})
+    assert cache.lookup('Divider()') is None
+
+def test_ambiguous_templates_rejected():
+    """Templates whose slots could be filled wrongly are never kept"""
+    cache = TemplateCache()
+    # Equal literals
+    assert not cache.learn('Row { Text("a") Text("a") }',
+                           {"type": "Row", "children": [{"type": "Text", "text": "a"}] * 2})
+    # Literal equal to an identifier
+    assert not cache.learn('Text("Red", color = Color.Red)', {"type": "Text", "text": "Red", "color": "Red"})
+    # Literal embedded in a larger string
+    assert not cache.learn('Button(onClick = { log("Hello") }) { Text("Go") }',
+                           {"type": "Button", "text": "Go", "onClick": 'log("Hello")'})
+    # Literal transformed by the model
+    assert not cache.learn('Text("hello")', {"type": "Text", "text": "HELLO"})
+    assert cache.get_stats()['rejected'] == 4
+
+def test_booleans_not_numbers():
+    """True in the output is not the literal 1"""
+    cache = TemplateCache()
+    assert not cache.learn('Text("a", maxLines = 1)', {"type": "Text", "text": "a", "softWrap": True})
+
+def test_eviction_and_forget():
+    """Least recently used templates go beyond max_entries"""
+    cache = TemplateCache(max_entries=1)
+    cache.learn('Text("a")', {"type": "Text", "text": "a"})
+    cache.learn('Button("a")', {"type": "Button", "text": "a"})
+    assert cache.lookup('Text("b")') is None
+    assert cache.lookup('Button("b")') == {"type": "Button", "text": "b"}
+    cache.forget('Button("c")')
+    assert cache.lookup('Button("b")') is None
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
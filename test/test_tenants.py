@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test tenant quotas and usage accounting
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import TenantRegistry, QuotaExceeded
+
+CONFIG = {
+    "mobile": {"api_key": "mobile-key", "requests_per_minute": 2},
+    "web": {"api_key": "web-key", "tokens_per_day": 100}
+}
+
+def make_registry(directory, **kwargs):
+    config_path = os.path.join(directory, "tenants.json")
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(CONFIG, f)
+    return TenantRegistry(config_path, os.path.join(directory, "usage.sqlite3"), **kwargs)
+
+def test_identify():
+    """Tenants are found by key and by name"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = make_registry(directory)
+        assert registry.identify("mobile-key").name == "mobile"
+        assert registry.identify("unknown") is None and registry.identify(None) is None
+        assert registry.get_tenant("web") is registry.identify("web-key")
+        registry.close()
+
+def test_requests_per_minute():
+    """Requests beyond the per-minute quota are rejected and counted"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = make_registry(directory)
+        tenant = registry.get_tenant("mobile")
+        tenant.check_request()
+        tenant.check_request()
+        try:
+            tenant.check_request()
+            assert False, "expected QuotaExceeded"
+        except QuotaExceeded:
+            pass
+        assert registry.get_usage("mobile")["mobile"]['rejected'] == 1
+        registry.close()
+
+def test_reservation_settled_and_released():
+    """Reservations count at once, are refunded or settled to the actual use"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = make_registry(directory)
+        tenant = registry.get_tenant("web")
+        tenant.check_tokens(40, 50)
+        try:
+            tenant.check_tokens(10, 5)
+            assert False, "expected QuotaExceeded"
+        except QuotaExceeded:
+            pass
+
+        tenant.release_tokens(40, 50)
+        tenant.check_tokens(40, 50)
+        # The response uses 1 of the 50 reserved output tokens
+        tenant.record_call(40, "abc", reserved_output_tokens=50)
+        assert tenant._tokens_used == 41
+        tenant.check_tokens(50, 9)
+        registry.close()
+
+def test_concurrent_reservations_never_overshoot():
+    """Concurrent calls together stay within the daily quota"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = make_registry(directory)
+        tenant = registry.get_tenant("web")
+        accepted = []
+        barrier = threading.Barrier(20)
+
+        def reserve():
+            barrier.wait()
+            try:
+                tenant.check_tokens(10)
+                accepted.append(1)
+            except QuotaExceeded:
+                pass
+
+        threads = [threading.Thread(target=reserve) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(accepted) == 10
+        assert tenant._tokens_used == 100
+        registry.close()
+
+def test_usage_survives_restart():
+    """Daily token use is reloaded from the usage database"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = make_registry(directory, flush_interval=0.01)
+        tenant = registry.get_tenant("web")
+        tenant.check_tokens(60)
+        tenant.record_call(60, "")
+        tenant.record_request({'cached': True}, 12.0)
+        registry.close()
+
+        registry = make_registry(directory)
+        usage = registry.get_usage("web")["web"]
+        assert (usage['calls'], usage['requests'], usage['cache_hits']) == (1, 1, 1)
+        assert usage['prompt_tokens'] == 60 and usage['avg_latency_ms'] == 12.0
+        try:
+            registry.get_tenant("web").check_tokens(41)
+            assert False, "expected QuotaExceeded"
+        except QuotaExceeded:
+            pass
+        registry.close()
+
+def test_converter_charges_only_model_calls():
+    """A converter with a quota charges model calls, not cache hits"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = make_registry(directory)
+        converter = FakeConverter()
+        converter.quota = registry.get_tenant("mobile")
+        converter.convert_compose_to_json('Text("a")')
+        converter.convert_compose_to_json('Text("a")')
+        assert registry.get_usage("mobile")["mobile"]['calls'] == 1
+
+        converter = FakeConverter()
+        converter.quota = registry.get_tenant("web")
+        converter.max_output_tokens = 1000
+        result = converter.convert_compose_to_json('Column { Text("a") }')
+        assert not result['success'] and result['error_code'] == 'quota_exceeded'
+        assert converter.calls == 0
+        assert registry.get_tenant("web")._tokens_used == 0
+        registry.close()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
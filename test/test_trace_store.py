@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test the compressed trace store and replay of recorded model calls
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import TraceStore, replay_traces, summarize_replay
+
+def test_segments_and_index():
+    """Segments rotate after segment_size records and are indexed"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TraceStore(directory, segment_size=2)
+        for i in range(5):
+            store.record({"timestamp": 100.0 + i, "input": f"Text(\"{i}\")", "prompt": f"p{i}", "response": "r"})
+
+        # The open segment is readable before it is closed
+        assert [trace['input'] for trace in store.iter_traces()][-1] == 'Text("4")'
+        store.close()
+
+        index = store.read_index()
+        assert [entry['count'] for entry in index.values()] == [2, 2, 1]
+        assert index['traces-000002.jsonl.gz']['first_ts'] == 102.0
+
+        traces = list(TraceStore(directory).iter_traces(since=101.5, until=103.0))
+        assert [trace['timestamp'] for trace in traces] == [102.0, 103.0]
+        assert traces[0]['prompt_fingerprint'] and traces[0]['prompt'] == "p2"
+
+def test_prompts_dropped():
+    """store_prompts=False keeps only the fingerprint"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TraceStore(directory, store_prompts=False)
+        store.record({"timestamp": 1.0, "input": "x", "prompt": "secret"})
+        store.close()
+        trace = next(store.iter_traces())
+        assert 'prompt' not in trace and trace['prompt_fingerprint']
+
+def test_converter_records_and_replays():
+    """Model calls are traced and replay against the same prompts"""
+    with tempfile.TemporaryDirectory() as directory:
+        converter = FakeConverter()
+        converter.trace_store = TraceStore(directory)
+        converter.convert_compose_to_json('Text("a")')
+        converter.convert_compose_to_json('Row { Text("b") }')
+        converter.trace_store.close()
+
+        traces = list(TraceStore(directory).iter_traces())
+        assert [trace['input'] for trace in traces] == ['Text("a")', 'Row { Text("b") }']
+        assert all(trace['conversion_id'] for trace in traces)
+
+        results = replay_traces(traces, converter=FakeConverter(), speed=0)
+        summary = summarize_replay(results)
+        assert summary['count'] == 2
+        assert summary['errors'] == 0
+        assert summary['same_response'] == 2
+
+def test_replay_needs_one_target():
+    """Exactly one of converter or url"""
+    try:
+        replay_traces([], converter=None, url=None)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
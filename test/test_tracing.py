@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test tracing spans and their propagation
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import (
+    ConversionScheduler,
+    configure_tracing,
+    tracing_enabled,
+    start_span,
+    current_span,
+    parse_traceparent
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+HEADER = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+def test_parse_traceparent():
+    """Valid headers give the remote parent; others are ignored"""
+    parent = parse_traceparent(HEADER)
+    assert (parent.trace_id, parent.span_id) == (TRACE_ID, "00f067aa0ba902b7")
+    for header in (None, "", "00-abc-def-01", f"00-{'0' * 32}-00f067aa0ba902b7-01", f"00-{'g' * 32}-00f067aa0ba902b7-01"):
+        assert parse_traceparent(header) is None
+
+def test_disabled_is_noop():
+    """Without an exporter spans record nothing"""
+    configure_tracing(None)
+    assert not tracing_enabled()
+    with start_span("anything", {"a": 1}) as span:
+        assert not span.recording
+        span.set_attribute("b", 2)
+    assert current_span().traceparent is None
+
+def test_spans_nest_across_scheduler():
+    """Provider spans run on scheduler workers and still nest under the request"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "spans.jsonl")
+        configure_tracing("file", path)
+        try:
+            converter = FakeConverter()
+            converter.scheduler = ConversionScheduler(max_concurrent=1)
+            with start_span("api.request", parent=parse_traceparent(HEADER)) as request_span:
+                assert current_span() is request_span
+                converter.convert_compose_to_json('Text("a")')
+                converter.convert_compose_to_json('Text("a")')
+        finally:
+            configure_tracing(None)
+
+        with open(path, encoding='utf-8') as f:
+            spans = [json.loads(line) for line in f]
+
+    assert all(span['traceId'] == TRACE_ID for span in spans)
+    by_id = {span['spanId']: span for span in spans}
+
+    def ancestry(span):
+        names = []
+        while span is not None:
+            names.append(span['name'])
+            span = by_id.get(span['parentSpanId'])
+        return names
+
+    provider = [span for span in spans if span['name'] == "provider.call"]
+    assert len(provider) == 1
+    assert ancestry(provider[0]) == ["provider.call", "converter.model_call", "converter.convert", "api.request"]
+    assert by_id[request_span.span_id]['parentSpanId'] == "00f067aa0ba902b7"
+
+    converts = [span for span in spans if span['name'] == "converter.convert"]
+    assert [span['attributes']['cache_hit'] for span in converts] == [False, True]
+
+def test_error_status():
+    """An exception leaving a span marks it as failed"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "spans.jsonl")
+        configure_tracing("file", path)
+        try:
+            with start_span("failing"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        finally:
+            configure_tracing(None)
+
+        with open(path, encoding='utf-8') as f:
+            span = json.loads(f.readline())
+    assert (span['status'], span['error']) == ("ERROR", "boom")
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Test cache warm-up and snapshots
+"""
+
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_converter import FakeConverter
+from llm_converter import TraceStore, warm_cache, save_cache_snapshot, load_cache_snapshot, top_trace_inputs
+
+EXAMPLES = [{"input": 'Text("pinned")', "output": {"type": "Text", "text": "pinned"}}]
+
+def make_converter(model_name="fake"):
+    converter = FakeConverter(model_name=model_name)
+    converter.training_examples = list(EXAMPLES)
+    return converter
+
+def test_snapshot_round_trip():
+    """A new worker of the same generation starts with the cache"""
+    with tempfile.TemporaryDirectory() as directory:
+        converter = make_converter()
+        converter.seed_exact_matches()
+        converter.convert_compose_to_json('Column { Text("a") }')
+        save_cache_snapshot(converter, directory)
+
+        worker = make_converter()
+        assert load_cache_snapshot(worker, directory) == 2
+        assert worker.convert_compose_to_json('Column { Text("a") }')['cached']
+        assert worker.convert_compose_to_json('Text("pinned")')['cached']
+        assert worker.calls == 0
+
+        # Another namespace gets the pinned results only
+        tenant_worker = make_converter()
+        assert load_cache_snapshot(tenant_worker, directory, include_results=False) == 1
+
+        # Another model or prompt is another generation
+        assert load_cache_snapshot(make_converter("other"), directory) == 0
+        changed = make_converter()
+        changed.training_examples = [{"input": 'Text("new")', "output": {"type": "Text", "text": "new"}}]
+        assert load_cache_snapshot(changed, directory) == 0
+
+def test_old_generations_pruned():
+    """Only the newest generations of a configuration are kept"""
+    with tempfile.TemporaryDirectory() as directory:
+        other = save_cache_snapshot(make_converter("other"), directory)
+        paths = []
+        for i in range(4):
+            converter = make_converter()
+            converter.training_examples = [{"input": f'Text("{i}")', "output": {"type": "Text", "text": str(i)}}]
+            paths.append(save_cache_snapshot(converter, directory, keep=2))
+            time.sleep(0.01)
+        assert sorted(os.listdir(directory)) == sorted(os.path.basename(path) for path in paths[2:] + [other])
+
+def test_top_inputs_from_request_log():
+    """The request log counts every request, cache hits included"""
+    with tempfile.TemporaryDirectory() as directory:
+        log = TraceStore(os.path.join(directory, "requests"))
+        converter = make_converter()
+        converter.request_log = log
+        for code in ['Text("a")', 'Text( "a" )', 'Text("a")', 'Row { }']:
+            converter.convert_compose_to_json(code)
+        log.close()
+        assert top_trace_inputs(directory, 5) == [('Text("a")', 3), ('Row { }', 1)]
+
+def test_top_inputs_from_call_traces():
+    """Without a request log, calls count once per conversion"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TraceStore(directory)
+        for trace in ({"input": 'Text("a")', "conversion_id": "1"},
+                      {"input": 'Text("a")', "conversion_id": "1"},
+                      {"input": 'Text("a")', "conversion_id": "2"},
+                      {"input": 'Row { }', "conversion_id": None},
+                      {"input": 'Row { }'}):
+            store.record({"timestamp": time.time(), **trace})
+        store.close()
+        assert top_trace_inputs(directory, 5) == [('Text("a")', 2), ('Row { }', 1)]
+
+def test_warm_cache():
+    """Warm-up pins the dataset, pre-converts frequent inputs and keeps pins on clear"""
+    with tempfile.TemporaryDirectory() as directory:
+        trace_dir = os.path.join(directory, "traces")
+        log = TraceStore(os.path.join(trace_dir, "requests"))
+        for code in ['Column { Text("a") }'] * 2 + ['Row { }']:
+            log.record({"timestamp": time.time(), "input": code})
+        log.close()
+
+        converter = make_converter()
+        snapshot_dir = os.path.join(directory, "snapshots")
+        summary = warm_cache(converter, snapshot_dir, trace_dir=trace_dir, top_n=2)
+        assert (summary['pinned'], summary['converted'], summary['failed']) == (1, 2, 0)
+        assert os.path.exists(summary['snapshot'])
+
+        # A second run loads the snapshot and calls no model
+        again = make_converter()
+        summary = warm_cache(again, snapshot_dir, trace_dir=trace_dir, top_n=2)
+        assert summary['already_cached'] == 2 and again.calls == 0
+
+        again.clear_cache()
+        assert again.convert_compose_to_json('Text("pinned")')['cached']
+        assert not again.convert_compose_to_json('Row { }').get('cached')
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")